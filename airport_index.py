@@ -0,0 +1,155 @@
+"""
+Airport Index
+Origin airports keyed by IATA code, built once at import: O(1) city lookups for the
+extraction endpoints and a pre-serialized /airports payload with a content ETag, so
+serving the list is a dict lookup and a bytes write.
+
+AirportSearchIndex backs /airports/search autocomplete over every airport we know
+(origins plus the gazetteer): a sorted term list searched with bisect, where terms are
+IATA codes, cities, airport names, aliases and every word-suffix of those ("shivaji
+maharaj ..."), so a prefix lookup is two binary searches plus a short scan.
+"""
+import re
+import json
+import hashlib
+import unicodedata
+from bisect import bisect_left
+
+from iata_extractor import INDIAN_AIRPORTS
+from gazetteer import DESTINATIONS, AIRPORT_NAMES, airport_traffic
+
+# Default and maximum number of suggestions per search
+SEARCH_DEFAULT_LIMIT = 8
+SEARCH_MAX_LIMIT = 25
+
+# Rank of the field a search term came from (lower ranks first)
+MATCH_CODE_EXACT, MATCH_CODE, MATCH_CITY, MATCH_ALIAS, MATCH_NAME, MATCH_CITY_WORD, MATCH_NAME_WORD = range(7)
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+class AirportIndex:
+    """Immutable view of an airport table ({code: {"city", "name", "country"?}})"""
+    def __init__(self, airports, default_country="India"):
+        entries = [
+            {
+                "iata": code.strip().upper(),
+                "city": data["city"],
+                "name": data.get("name") or data["city"],
+                "country": data.get("country", default_country),
+            }
+            for code, data in airports.items()
+            if len(code.strip()) == 3
+        ]
+        # Same order as the dropdown list: by city
+        self.airports = sorted(entries, key=lambda a: (a["city"], a["iata"]))
+        self.by_code = {a["iata"]: a for a in self.airports}
+        self.payload = json.dumps(self.airports, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha1(self.payload).hexdigest()[:20] + '"'
+
+    def get(self, code):
+        return self.by_code.get((code or "").strip().upper())
+
+    def city_for(self, code):
+        """City of an airport code ("" when unknown)"""
+        airport = self.get(code)
+        return airport["city"] if airport else ""
+
+    def etag_matches(self, if_none_match):
+        """True when an If-None-Match header value names the current payload"""
+        return etag_matches(if_none_match, self.etag)
+
+def etag_matches(if_none_match, etag):
+    """True when an If-None-Match header value lists `etag` (weak or strong), or is *"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+def normalize_search_text(text):
+    """Lowercase, accents stripped, punctuation folded to single spaces ("Gökçen" -> "gokcen")"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD_RE.sub(" ", ascii_text.lower()).strip()
+
+def _word_suffixes(text):
+    """"new delhi" -> ["delhi"]: every later word start, for mid-name prefix matches"""
+    words = text.split()
+    return [" ".join(words[i:]) for i in range(1, len(words))]
+
+def search_airport_table():
+    """Every known airport as {code: {"city", "name", "country", "aliases"}}; origin names win"""
+    table = {}
+    for code, (city, country, aliases) in DESTINATIONS.items():
+        table[code] = {"city": city, "name": city, "country": country, "aliases": list(aliases)}
+    for code, names in AIRPORT_NAMES.items():
+        if code in table:
+            # "London" x4 is no use in a picker: name the airport ("Heathrow") where we know it
+            table[code]["name"] = names[0].title()
+            table[code]["aliases"].extend(names)
+    for code, data in INDIAN_AIRPORTS.items():
+        entry = table.setdefault(code, {"city": data["city"], "country": "India", "aliases": []})
+        entry["name"] = data["name"]
+    return table
+
+class AirportSearchIndex:
+    """Ranked prefix search over IATA codes, cities, airport names and aliases"""
+    def __init__(self, table):
+        self.airports = []
+        self._fragments = []                                # pre-serialized JSON per airport
+        terms = {}
+        for code in sorted(table):
+            data = table[code]
+            airport = {"iata": code, "city": data["city"], "name": data.get("name") or data["city"],
+                       "country": data["country"]}
+            idx = len(self.airports)
+            self.airports.append(airport)
+            self._fragments.append(json.dumps(airport, separators=(",", ":")).encode("utf-8"))
+
+            city = normalize_search_text(airport["city"])
+            name = normalize_search_text(airport["name"])
+            fields = [(code.lower(), MATCH_CODE), (city, MATCH_CITY), (name, MATCH_NAME)]
+            aliases = [normalize_search_text(alias) for alias in data.get("aliases", [])]
+            fields += [(alias, MATCH_ALIAS) for alias in aliases]
+            fields += [(suffix, MATCH_CITY_WORD) for suffix in _word_suffixes(city)]
+            fields += [(suffix, MATCH_NAME_WORD) for text in [name] + aliases for suffix in _word_suffixes(text)]
+            for term, rank in fields:
+                if term and rank < terms.get((term, idx), MATCH_NAME_WORD + 1):
+                    terms[(term, idx)] = rank
+
+        # Parallel sorted arrays: bisect on _terms, read (airport, rank) from _hits
+        ordered = sorted(terms.items())
+        self._terms = [term for (term, _), _ in ordered]
+        self._hits = [(idx, rank) for (_, idx), rank in ordered]
+        self._traffic = [airport_traffic(a["iata"]) for a in self.airports]
+        self.etag = '"' + hashlib.sha1(b"\n".join(self._fragments)).hexdigest()[:20] + '"'
+
+    def search(self, query, limit=SEARCH_DEFAULT_LIMIT):
+        """
+        Airports matching `query` as a prefix, best first: exact IATA code, code prefix,
+        city, alias, airport name, then later words of the city or name. Ties go to
+        the busier airport.
+        """
+        q = normalize_search_text(query)
+        if not q:
+            return []
+        best = {}
+        start = bisect_left(self._terms, q)
+        end = bisect_left(self._terms, q + "\x7f", start)
+        for term, (idx, rank) in zip(self._terms[start:end], self._hits[start:end]):
+            if rank == MATCH_CODE and term == q:
+                rank = MATCH_CODE_EXACT
+            if rank < best.get(idx, MATCH_NAME_WORD + 1):
+                best[idx] = rank
+        ranked = sorted(best, key=lambda idx: (best[idx], -self._traffic[idx], self.airports[idx]["city"]))
+        return ranked[:max(1, min(limit, SEARCH_MAX_LIMIT))]
+
+    def search_airports(self, query, limit=SEARCH_DEFAULT_LIMIT):
+        """search() as airport dicts"""
+        return [self.airports[idx] for idx in self.search(query, limit)]
+
+    def search_payload(self, query, limit=SEARCH_DEFAULT_LIMIT):
+        """search() as a JSON array (bytes) joined from pre-serialized airports"""
+        return b"[" + b",".join(self._fragments[idx] for idx in self.search(query, limit)) + b"]"
+
+airport_index = AirportIndex(INDIAN_AIRPORTS)
+airport_search = AirportSearchIndex(search_airport_table())
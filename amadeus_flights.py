@@ -3,10 +3,17 @@ Amadeus Flight Search Integration
 Search real-time flights using origin/destination IATA codes
 """
 import os
+import copy
+import heapq
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from fx_rates import convert_search_result
+
 load_dotenv()
 
 AMADEUS_CLIENT_ID = os.getenv("AMADEUS_CLIENT_ID")
@@ -16,12 +23,33 @@ AMADEUS_CLIENT_SECRET = os.getenv("AMADEUS_CLIENT_SECRET")
 AMADEUS_AUTH_URL = "https://test.api.amadeus.com/v1/security/oauth2/token"
 AMADEUS_FLIGHT_SEARCH_URL = "https://test.api.amadeus.com/v2/shopping/flight-offers"
 
+# Searches are cached in a single source currency and converted locally,
+# so a currency switch is a cache hit instead of a new upstream search
+SEARCH_SOURCE_CURRENCY = os.getenv("SEARCH_SOURCE_CURRENCY", "INR")
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "256"))
+
+# One-way offers fetched per leg when building mix-and-match round trips
+MIX_AND_MATCH_LEG_RESULTS = int(os.getenv("MIX_AND_MATCH_LEG_RESULTS", "50"))
+
+# Destination airports searched concurrently for one multi-airport search
+MULTI_DESTINATION_MAX = int(os.getenv("MULTI_DESTINATION_MAX", "6"))
+
+# Fan-out threads shared by all searches: one pool for destinations, one for mix-and-match
+# legs (legs never wait on other tasks, so a full destination pool cannot deadlock them).
+# Their queues are bounded by the API's flight search pool admission.
+SEARCH_FANOUT_WORKERS = int(os.getenv("SEARCH_FANOUT_WORKERS", "12"))
+destination_executor = ThreadPoolExecutor(max_workers=SEARCH_FANOUT_WORKERS, thread_name_prefix="amadeus-dest")
+leg_executor = ThreadPoolExecutor(max_workers=SEARCH_FANOUT_WORKERS, thread_name_prefix="amadeus-leg")
+
 class AmadeusFlightSearch:
     def __init__(self):
         self.client_id = AMADEUS_CLIENT_ID
         self.client_secret = AMADEUS_CLIENT_SECRET
         self.access_token = None
         self.token_expiry = None
+        self._search_cache = {}
+        self._search_cache_lock = threading.Lock()
     
     def get_access_token(self):
         """Get or refresh Amadeus access token"""
@@ -70,24 +98,203 @@ class AmadeusFlightSearch:
             non_stop (bool): If True, only return direct flights (no layovers)
         
         Returns:
-            dict: Flight search results with parsed offers
+            dict: Flight search results with parsed offers. When `currency` differs from
+            SEARCH_SOURCE_CURRENCY, prices are converted locally and `price_converted` is True.
+        """
+        departure_date = _format_date(departure_date)
+        return_date = _format_date(return_date) if return_date else None
+        currency = (currency or SEARCH_SOURCE_CURRENCY).upper()
+
+        search_args = (origin, destination, departure_date, return_date,
+                       adults, max_results, travel_class, bool(non_stop))
+
+        # Search (or reuse) in the source currency, then convert locally
+        source_result = self._cached_search(search_args, SEARCH_SOURCE_CURRENCY)
+        result = convert_search_result(source_result, currency)
+        if result is not None:
+            return result
+
+        # No FX rate for this currency: ask Amadeus to price it directly
+        result = copy.deepcopy(self._cached_search(search_args, currency))
+        result['price_converted'] = False
+        return result
+
+    def search_mix_and_match(self, origin, destination, departure_date, return_date,
+                             adults=1, max_results=10, currency="INR", travel_class=None,
+                             non_stop=False, max_stops=None, max_layover_minutes=None,
+                             sort_by="price"):
+        """
+        Build round trips from two independent one-way searches
+        
+        The outbound and return one-way searches run concurrently, then the
+        top `max_results` pairs by total price (or total duration) are produced
+        with a heap-based k-best join, without building the full cross product.
+        
+        Args:
+            max_stops (int|None): Maximum stops allowed on each leg
+            max_layover_minutes (int|None): Longest layover allowed on each leg
+            sort_by (str): "price" or "duration"
+        
+        Returns:
+            dict: Same shape as search_flights(), with `mix_and_match` set and each
+            combined offer carrying a `combination` block with the two offer ids
+        """
+        if sort_by not in ("price", "duration"):
+            raise ValueError(f"Unsupported sort_by: {sort_by}")
+        if non_stop:
+            max_stops = 0
+
+        leg_args = dict(adults=adults, max_results=MIX_AND_MATCH_LEG_RESULTS, currency=currency,
+                        travel_class=travel_class, non_stop=non_stop)
+        outbound_future = leg_executor.submit(self.search_flights, origin, destination, departure_date, **leg_args)
+        return_future = leg_executor.submit(self.search_flights, destination, origin, return_date, **leg_args)
+        outbound_result = outbound_future.result()
+        return_result = return_future.result()
+
+        def leg_ok(flight):
+            return flight and journey_within_limits(flight['outbound'], max_stops, max_layover_minutes)
+
+        outbound_legs = [f for f in outbound_result.get('flights', []) if leg_ok(f)]
+        return_legs = [f for f in return_result.get('flights', []) if leg_ok(f)]
+
+        if sort_by == "price":
+            leg_key = lambda f: (offer_price_value(f), parse_duration_minutes(f['outbound'].get('duration')))
+        else:
+            leg_key = lambda f: (parse_duration_minutes(f['outbound'].get('duration')), offer_price_value(f))
+
+        def connects(out_flight, ret_flight):
+            # The return leg must leave after the outbound leg has landed
+            arrival = out_flight['outbound']['arrival'].get('time')
+            departure = ret_flight['outbound']['departure'].get('time')
+            return not arrival or not departure or departure > arrival
+
+        pairs = k_best_pairs(outbound_legs, return_legs, max_results, key=leg_key, is_valid=connects)
+        flights = [combine_one_way_offers(out_flight, ret_flight) for out_flight, ret_flight in pairs]
+        carriers, aircraft = build_lookup_tables(flights)
+
+        result = {
+            'success': True,
+            'origin': origin,
+            'destination': destination,
+            'total_offers': len(flights),
+            'flights': flights,
+            'carriers': carriers,
+            'aircraft': aircraft,
+            'price_currency': outbound_result.get('price_currency'),
+            'price_converted': outbound_result.get('price_converted', False),
+            'mix_and_match': True,
+            'sort_by': sort_by,
+            'legs_considered': {'outbound': len(outbound_legs), 'return': len(return_legs)}
+        }
+        if outbound_result.get('fx'):
+            result['fx'] = outbound_result['fx']
+        if not flights:
+            result['message'] = 'No one-way combinations match the selected dates and filters.'
+        return result
+
+    def search_destinations(self, origin, destinations, departure_date, return_date=None,
+                            max_results=10, mix_and_match=False, **search_args):
+        """
+        Search several destination airports (a metro area, country or region) concurrently
+        and merge their offers cheapest first (shortest first with sort_by="duration")
+
+        Args:
+            destinations (list): Destination IATA codes, best candidate first
+            mix_and_match (bool): Build each destination's round trips from one-way legs
+            **search_args: Passed through to search_flights() / search_mix_and_match()
+
+        Returns:
+            dict: Same shape as search_flights(), with `destinations` listing the airports
+            searched, `destination_errors` for the ones that failed, and each offer carrying
+            its `destination` (offer ids are prefixed with it to stay unique)
         """
+        destinations = list(dict.fromkeys(code.upper() for code in destinations if code))[:MULTI_DESTINATION_MAX]
+        if not destinations:
+            raise ValueError("No destinations to search")
+
+        # Stop / layover limits and sort order only apply to mix-and-match legs
+        leg_args = {key: search_args.pop(key) for key in ('max_stops', 'max_layover_minutes', 'sort_by')
+                    if key in search_args}
+
+        def search_one(destination):
+            if mix_and_match and return_date:
+                return self.search_mix_and_match(origin, destination, departure_date, return_date,
+                                                 max_results=max_results, **search_args, **leg_args)
+            return self.search_flights(origin, destination, departure_date, return_date,
+                                       max_results=max_results, **search_args)
+
+        futures = [(destination, destination_executor.submit(search_one, destination)) for destination in destinations]
+        results, errors = {}, {}
+        for destination, future in futures:
+            try:
+                results[destination] = future.result()
+            except Exception as e:
+                errors[destination] = str(e)
+        if not results:
+            raise Exception(f"Flight search failed for all destinations: {errors}")
+
+        flights = [
+            {**flight, 'id': f"{destination}:{flight.get('id')}", 'destination': destination}
+            for destination, result in results.items()
+            for flight in result.get('flights', [])
+        ]
+        sort_by = leg_args.get('sort_by', 'price')
+        flights.sort(key=lambda flight: offer_sort_key(flight, sort_by))
+        flights = flights[:max_results]
+        carriers, aircraft = build_lookup_tables(flights)
+
+        first = results[next(d for d in destinations if d in results)]
+        result = {
+            'success': True,
+            'origin': origin,
+            'destination': destinations[0],
+            'destinations': destinations,
+            'total_offers': len(flights),
+            'flights': flights,
+            'carriers': carriers,
+            'aircraft': aircraft,
+            'price_currency': first.get('price_currency'),
+            'price_converted': first.get('price_converted', False),
+            'destination_errors': errors
+        }
+        if first.get('fx'):
+            result['fx'] = first['fx']
+        if mix_and_match and return_date:
+            result['mix_and_match'] = True
+        if not flights:
+            result['message'] = 'No flights found for any of the destination airports.'
+        return result
+
+    def _cached_search(self, search_args, currency):
+        """Return a cached parsed search for (search_args, currency), searching upstream on a miss"""
+        key = search_args + (currency,)
+        now = time.monotonic()
+        with self._search_cache_lock:
+            entry = self._search_cache.get(key)
+            if entry and now - entry[0] < SEARCH_CACHE_TTL_SECONDS:
+                return entry[1]
+
+        result = self._search_upstream(*search_args, currency=currency)
+
+        with self._search_cache_lock:
+            if len(self._search_cache) >= SEARCH_CACHE_MAX_ENTRIES:
+                # Drop expired entries first, then the oldest one
+                expired = [k for k, (ts, _) in self._search_cache.items() if now - ts >= SEARCH_CACHE_TTL_SECONDS]
+                for k in expired:
+                    del self._search_cache[k]
+                if len(self._search_cache) >= SEARCH_CACHE_MAX_ENTRIES:
+                    oldest = min(self._search_cache, key=lambda k: self._search_cache[k][0])
+                    del self._search_cache[oldest]
+            self._search_cache[key] = (time.monotonic(), result)
+        return result
+
+    def _search_upstream(self, origin, destination, departure_date, return_date,
+                         adults, max_results, travel_class, non_stop, currency):
+        """Call the Amadeus flight offers API and parse the results"""
         try:
             # Get access token
             token = self.get_access_token()
             
-            # Format dates
-            if isinstance(departure_date, datetime):
-                departure_date = departure_date.strftime("%Y-%m-%d")
-            elif hasattr(departure_date, 'strftime'):
-                departure_date = departure_date.strftime("%Y-%m-%d")
-            
-            if return_date:
-                if isinstance(return_date, datetime):
-                    return_date = return_date.strftime("%Y-%m-%d")
-                elif hasattr(return_date, 'strftime'):
-                    return_date = return_date.strftime("%Y-%m-%d")
-            
             # Build request parameters
             params = {
                 'originLocationCode': origin,
@@ -123,7 +330,7 @@ class AmadeusFlightSearch:
             data = response.json()
             
             # Parse results
-            return self._parse_flight_offers(data, origin, destination)
+            return self._parse_flight_offers(data, origin, destination, currency, limit=max(10, max_results))
             
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 400:
@@ -134,7 +341,7 @@ class AmadeusFlightSearch:
         except Exception as e:
             raise Exception(f"Flight search failed: {str(e)}")
     
-    def _parse_flight_offers(self, data, origin, destination):
+    def _parse_flight_offers(self, data, origin, destination, currency=None, limit=10):
         """Parse Amadeus flight offers response"""
         offers = data.get('data', [])
         
@@ -145,25 +352,34 @@ class AmadeusFlightSearch:
                 'destination': destination,
                 'total_offers': 0,
                 'flights': [],
+                'carriers': {},
+                'aircraft': {},
+                'price_currency': currency,
                 'message': 'No flights found for the selected route and dates.'
             }
         
         parsed_flights = []
         
-        for offer in offers[:10]:  # Limit to 10 offers
+        for offer in offers[:limit]:
             try:
                 flight_info = self._parse_single_offer(offer)
                 parsed_flights.append(flight_info)
             except Exception as e:
                 # Skip offers that fail to parse
                 continue
-        
+
+        # Names/booking URLs once per code instead of once per card/segment
+        carriers, aircraft = build_lookup_tables(parsed_flights)
+
         return {
             'success': True,
             'origin': origin,
             'destination': destination,
             'total_offers': len(offers),
             'flights': parsed_flights,
+            'carriers': carriers,
+            'aircraft': aircraft,
+            'price_currency': currency,
             'currency': data.get('dictionaries', {}).get('currencies', {})
         }
     
@@ -298,8 +514,177 @@ class AmadeusFlightSearch:
                     'segments': return_segments_details
                 }
         
+        flight_info['metrics'] = offer_metrics(flight_info)
         return flight_info
 
+def _format_date(value):
+    """Format a date/datetime as YYYY-MM-DD, leaving strings untouched"""
+    if hasattr(value, 'strftime'):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+def parse_duration_minutes(duration_str):
+    """Convert ISO 8601 duration to minutes (e.g., PT5H30M -> 330, P1DT2H -> 1560)"""
+    if not duration_str:
+        return 0
+    minutes = 0
+    number = ''
+    in_time = False
+    for ch in duration_str:
+        if ch.isdigit():
+            number += ch
+            continue
+        if ch == 'T':
+            in_time = True
+        elif number:
+            value = int(number)
+            if ch == 'D':
+                minutes += value * 1440
+            elif ch == 'H' and in_time:
+                minutes += value * 60
+            elif ch == 'M' and in_time:
+                minutes += value
+        number = ''
+    return minutes
+
+def offer_price_value(flight):
+    """Numeric total price of a parsed offer"""
+    try:
+        return float(flight['price']['total'])
+    except (KeyError, TypeError, ValueError):
+        return float('inf')
+
+def offer_sort_key(flight, sort_by="price"):
+    """Merge order for offers: (price, total duration), or (total duration, price) when sorting by duration"""
+    journeys = [flight['outbound']] + ([flight['return']] if flight.get('return') else [])
+    duration = sum(parse_duration_minutes(j.get('duration')) for j in journeys)
+    if sort_by == "duration":
+        return (duration, offer_price_value(flight))
+    return (offer_price_value(flight), duration)
+
+def offer_metrics(flight):
+    """
+    Precomputed numeric fields used for ranking a parsed offer:
+    price, total duration (minutes, both directions), total stops and
+    outbound departure time (minutes after local midnight)
+    """
+    journeys = [flight['outbound']] + ([flight['return']] if flight.get('return') else [])
+    departure_minutes = None
+    try:
+        departs = datetime.fromisoformat(flight['outbound']['departure']['time'])
+        departure_minutes = departs.hour * 60 + departs.minute
+    except (KeyError, TypeError, ValueError):
+        pass
+    price = offer_price_value(flight)
+    return {
+        'price': price if price != float('inf') else None,
+        'duration_minutes': sum(parse_duration_minutes(j.get('duration')) for j in journeys),
+        'stops': sum(j.get('stops', 0) for j in journeys),
+        'departure_minutes': departure_minutes
+    }
+
+def journey_layover_minutes(journey):
+    """Layover durations (minutes) between consecutive segments of a parsed journey"""
+    layovers = []
+    segments = journey.get('segments', [])
+    for prev_seg, next_seg in zip(segments, segments[1:]):
+        try:
+            landed = datetime.fromisoformat(prev_seg['arrival']['time'])
+            departs = datetime.fromisoformat(next_seg['departure']['time'])
+            layovers.append(int((departs - landed).total_seconds() // 60))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return layovers
+
+def journey_within_limits(journey, max_stops=None, max_layover_minutes=None):
+    """Check a parsed journey against stop and layover limits"""
+    if max_stops is not None and journey.get('stops', 0) > max_stops:
+        return False
+    if max_layover_minutes is not None:
+        if any(layover > max_layover_minutes for layover in journey_layover_minutes(journey)):
+            return False
+    return True
+
+def k_best_pairs(left, right, k, key, is_valid=None):
+    """
+    Return up to k (left_item, right_item) pairs with the smallest key(left) + key(right)
+    
+    Both lists are sorted by key once and pairs are expanded lazily from a heap,
+    so only O(k) candidate pairs are examined instead of len(left) * len(right).
+    Keys may be numbers or tuples (summed element-wise, compared lexicographically).
+    Pairs rejected by `is_valid` are skipped without stopping the expansion.
+    """
+    if k <= 0 or not left or not right:
+        return []
+
+    left = sorted(left, key=key)
+    right = sorted(right, key=key)
+    left_keys = [key(item) for item in left]
+    right_keys = [key(item) for item in right]
+
+    def pair_key(i, j):
+        a, b = left_keys[i], right_keys[j]
+        if isinstance(a, tuple):
+            return tuple(x + y for x, y in zip(a, b))
+        return a + b
+
+    heap = [(pair_key(0, 0), 0, 0)]
+    seen = {(0, 0)}
+    pairs = []
+
+    while heap and len(pairs) < k:
+        _, i, j = heapq.heappop(heap)
+        if is_valid is None or is_valid(left[i], right[j]):
+            pairs.append((left[i], right[j]))
+        for ni, nj in ((i + 1, j), (i, j + 1)):
+            if ni < len(left) and nj < len(right) and (ni, nj) not in seen:
+                seen.add((ni, nj))
+                heapq.heappush(heap, (pair_key(ni, nj), ni, nj))
+
+    return pairs
+
+def combine_one_way_offers(outbound_flight, return_flight):
+    """Merge two parsed one-way offers into a single round-trip offer"""
+    out_price = outbound_flight['price']
+    ret_price = return_flight['price']
+
+    def add_amounts(a, b):
+        try:
+            return f"{float(a) + float(b):.2f}"
+        except (TypeError, ValueError):
+            return None
+
+    seats = [f.get('seats_available') for f in (outbound_flight, return_flight)]
+    numeric_seats = [seat for seat in seats if isinstance(seat, int)]
+
+    combined = {
+        'id': f"{outbound_flight.get('id')}+{return_flight.get('id')}",
+        'price': {
+            'total': add_amounts(out_price.get('total'), ret_price.get('total')),
+            'currency': out_price.get('currency'),
+            'base': add_amounts(out_price.get('base'), ret_price.get('base')),
+            'fees': (out_price.get('fees') or []) + (ret_price.get('fees') or []),
+            'grand_total': add_amounts(out_price.get('grand_total'), ret_price.get('grand_total'))
+        },
+        'outbound': outbound_flight['outbound'],
+        'return': return_flight['outbound'],
+        'seats_available': min(numeric_seats) if numeric_seats else 'N/A',
+        'instant_ticketing': bool(outbound_flight.get('instant_ticketing') or return_flight.get('instant_ticketing')),
+        'validating_airline': outbound_flight.get('validating_airline', 'N/A'),
+        'combination': {
+            'type': 'mix_and_match',
+            'separate_tickets': True,
+            'outbound_offer_id': outbound_flight.get('id'),
+            'return_offer_id': return_flight.get('id'),
+            'outbound_price': out_price.get('total'),
+            'return_price': ret_price.get('total'),
+            'outbound_validating_airline': outbound_flight.get('validating_airline'),
+            'return_validating_airline': return_flight.get('validating_airline')
+        }
+    }
+    combined['metrics'] = offer_metrics(combined)
+    return combined
+
 def format_duration(duration_str):
     """Convert ISO 8601 duration to readable format (e.g., PT5H30M -> 5h 30m)"""
     if not duration_str:
@@ -335,198 +720,243 @@ def format_datetime(dt_str):
     except:
         return dt_str
 
+# Carrier and aircraft lookup tables (built once at import)
+AIRLINE_NAMES = {
+    # Indian Carriers
+    'AI': 'Air India',
+    'UK': 'Vistara',
+    '6E': 'IndiGo',
+    'SG': 'SpiceJet',
+    'G8': 'Go First',
+    'I5': 'AirAsia India',
+    '9W': 'Jet Airways',
+    # Middle East
+    'EK': 'Emirates',
+    'QR': 'Qatar Airways',
+    'EY': 'Etihad Airways',
+    'WY': 'Oman Air',
+    'GF': 'Gulf Air',
+    # Asian Airlines
+    'UL': 'SriLankan Airlines',
+    'SQ': 'Singapore Airlines',
+    'TG': 'Thai Airways',
+    'CX': 'Cathay Pacific',
+    'MH': 'Malaysia Airlines',
+    'VJ': 'VietJet Air',
+    'BL': 'Jetstar Pacific',
+    'VN': 'Vietnam Airlines',
+    'TR': 'Scoot',
+    '3K': 'Jetstar Asia',
+    'AK': 'AirAsia',
+    'D7': 'AirAsia X',
+    'FD': 'Thai AirAsia',
+    'NH': 'All Nippon Airways',
+    'JL': 'Japan Airlines',
+    'OZ': 'Asiana Airlines',
+    'KE': 'Korean Air',
+    # European Airlines
+    'BA': 'British Airways',
+    'LH': 'Lufthansa',
+    'AF': 'Air France',
+    'KL': 'KLM',
+    'EI': 'Aer Lingus',
+    'VS': 'Virgin Atlantic',
+    'IB': 'Iberia',
+    'AZ': 'ITA Airways',
+    'LX': 'Swiss International',
+    'OS': 'Austrian Airlines',
+    'SN': 'Brussels Airlines',
+    # American Airlines
+    'AA': 'American Airlines',
+    'UA': 'United Airlines',
+    'DL': 'Delta Air Lines',
+    'AC': 'Air Canada',
+    'WS': 'WestJet',
+    # Oceania
+    'QF': 'Qantas',
+    'VA': 'Virgin Australia',
+    'NZ': 'Air New Zealand',
+    # Others
+    'HR': 'Hahn Air',
+    'LY': 'El Al',
+    'MS': 'EgyptAir',
+    'SA': 'South African Airways',
+    'ET': 'Ethiopian Airlines',
+    'KQ': 'Kenya Airways'
+}
+
+AIRLINE_WEBSITES = {
+    # Indian Carriers
+    'AI': 'https://www.airindia.com',
+    'UK': 'https://www.airvistara.com',
+    '6E': 'https://www.goindigo.in',
+    'SG': 'https://www.spicejet.com',
+    'G8': 'https://www.flygofirst.com',
+    'I5': 'https://www.airasia.com/en/gb',
+    # Middle East
+    'EK': 'https://www.emirates.com',
+    'QR': 'https://www.qatarairways.com',
+    'EY': 'https://www.etihad.com',
+    'WY': 'https://www.omanair.com',
+    'GF': 'https://www.gulfair.com',
+    # Asian Airlines
+    'UL': 'https://www.srilankan.com',
+    'SQ': 'https://www.singaporeair.com',
+    'TG': 'https://www.thaiairways.com',
+    'CX': 'https://www.cathaypacific.com',
+    'MH': 'https://www.malaysiaairlines.com',
+    'VJ': 'https://www.vietjetair.com',
+    'VN': 'https://www.vietnamairlines.com',
+    'TR': 'https://www.flyscoot.com',
+    '3K': 'https://www.jetstar.com',
+    'AK': 'https://www.airasia.com',
+    'NH': 'https://www.ana.co.jp',
+    'JL': 'https://www.jal.co.jp',
+    'KE': 'https://www.koreanair.com',
+    # European Airlines
+    'BA': 'https://www.britishairways.com',
+    'LH': 'https://www.lufthansa.com',
+    'AF': 'https://www.airfrance.com',
+    'KL': 'https://www.klm.com',
+    'VS': 'https://www.virginatlantic.com',
+    'IB': 'https://www.iberia.com',
+    'LX': 'https://www.swiss.com',
+    # American Airlines
+    'AA': 'https://www.aa.com',
+    'UA': 'https://www.united.com',
+    'DL': 'https://www.delta.com',
+    'AC': 'https://www.aircanada.com',
+    # Oceania
+    'QF': 'https://www.qantas.com',
+    'NZ': 'https://www.airnewzealand.com'
+}
+
+AIRCRAFT_NAMES = {
+    # Airbus A320 Family
+    '318': 'Airbus A318',
+    '319': 'Airbus A319',
+    '320': 'Airbus A320',
+    '321': 'Airbus A321',
+    '32A': 'Airbus A320 (Sharklets)',
+    '32B': 'Airbus A321 (Sharklets)',
+    '32N': 'Airbus A320neo',
+    '32Q': 'Airbus A321neo',
+    # Airbus A330 Family
+    '330': 'Airbus A330',
+    '332': 'Airbus A330-200',
+    '333': 'Airbus A330-300',
+    '338': 'Airbus A330-800neo',
+    '339': 'Airbus A330-900neo',
+    # Airbus A340 Family
+    '342': 'Airbus A340-200',
+    '343': 'Airbus A340-300',
+    '345': 'Airbus A340-500',
+    '346': 'Airbus A340-600',
+    # Airbus A350 Family
+    '350': 'Airbus A350',
+    '351': 'Airbus A350-1000',
+    '359': 'Airbus A350-900',
+    # Airbus A380
+    '388': 'Airbus A380-800',
+    '380': 'Airbus A380',
+    # Boeing 737 Family
+    '733': 'Boeing 737-300',
+    '734': 'Boeing 737-400',
+    '735': 'Boeing 737-500',
+    '736': 'Boeing 737-600',
+    '737': 'Boeing 737-700',
+    '738': 'Boeing 737-800',
+    '739': 'Boeing 737-900',
+    '73H': 'Boeing 737-800',
+    '73J': 'Boeing 737-900',
+    '7M8': 'Boeing 737 MAX 8',
+    '7M9': 'Boeing 737 MAX 9',
+    # Boeing 747
+    '744': 'Boeing 747-400',
+    '747': 'Boeing 747',
+    '748': 'Boeing 747-8',
+    # Boeing 757
+    '752': 'Boeing 757-200',
+    '753': 'Boeing 757-300',
+    # Boeing 767
+    '762': 'Boeing 767-200',
+    '763': 'Boeing 767-300',
+    '764': 'Boeing 767-400',
+    # Boeing 777 Family
+    '772': 'Boeing 777-200',
+    '77L': 'Boeing 777-200LR',
+    '773': 'Boeing 777-300',
+    '77W': 'Boeing 777-300ER',
+    '777': 'Boeing 777',
+    # Boeing 787 Dreamliner
+    '787': 'Boeing 787',
+    '788': 'Boeing 787-8',
+    '789': 'Boeing 787-9',
+    '78J': 'Boeing 787-10',
+    # Regional Jets
+    'E75': 'Embraer E175',
+    'E90': 'Embraer E190',
+    'E95': 'Embraer E195',
+    'CR9': 'Bombardier CRJ-900',
+    'CRJ': 'Bombardier CRJ',
+    # Turboprops
+    'AT7': 'ATR 72',
+    'AT5': 'ATR 42',
+    'DH4': 'Dash 8-400'
+}
+
 def get_airline_name(carrier_code):
     """Get airline name from carrier code"""
-    airlines = {
-        # Indian Carriers
-        'AI': 'Air India',
-        'UK': 'Vistara',
-        '6E': 'IndiGo',
-        'SG': 'SpiceJet',
-        'G8': 'Go First',
-        'I5': 'AirAsia India',
-        '9W': 'Jet Airways',
-        # Middle East
-        'EK': 'Emirates',
-        'QR': 'Qatar Airways',
-        'EY': 'Etihad Airways',
-        'WY': 'Oman Air',
-        'GF': 'Gulf Air',
-        # Asian Airlines
-        'UL': 'SriLankan Airlines',
-        'SQ': 'Singapore Airlines',
-        'TG': 'Thai Airways',
-        'CX': 'Cathay Pacific',
-        'MH': 'Malaysia Airlines',
-        'VJ': 'VietJet Air',
-        'BL': 'Jetstar Pacific',
-        'VN': 'Vietnam Airlines',
-        'TR': 'Scoot',
-        '3K': 'Jetstar Asia',
-        'AK': 'AirAsia',
-        'D7': 'AirAsia X',
-        'FD': 'Thai AirAsia',
-        'NH': 'All Nippon Airways',
-        'JL': 'Japan Airlines',
-        'OZ': 'Asiana Airlines',
-        'KE': 'Korean Air',
-        # European Airlines
-        'BA': 'British Airways',
-        'LH': 'Lufthansa',
-        'AF': 'Air France',
-        'KL': 'KLM',
-        'EI': 'Aer Lingus',
-        'VS': 'Virgin Atlantic',
-        'IB': 'Iberia',
-        'AZ': 'ITA Airways',
-        'LX': 'Swiss International',
-        'OS': 'Austrian Airlines',
-        'SN': 'Brussels Airlines',
-        # American Airlines
-        'AA': 'American Airlines',
-        'UA': 'United Airlines',
-        'DL': 'Delta Air Lines',
-        'AC': 'Air Canada',
-        'WS': 'WestJet',
-        # Oceania
-        'QF': 'Qantas',
-        'VA': 'Virgin Australia',
-        'NZ': 'Air New Zealand',
-        # Others
-        'HR': 'Hahn Air',
-        'LY': 'El Al',
-        'MS': 'EgyptAir',
-        'SA': 'South African Airways',
-        'ET': 'Ethiopian Airlines',
-        'KQ': 'Kenya Airways'
-    }
-    return airlines.get(carrier_code, carrier_code)
+    return AIRLINE_NAMES.get(carrier_code, carrier_code)
 
 def get_airline_website(carrier_code):
     """Get airline booking website URL from carrier code"""
-    websites = {
-        # Indian Carriers
-        'AI': 'https://www.airindia.com',
-        'UK': 'https://www.airvistara.com',
-        '6E': 'https://www.goindigo.in',
-        'SG': 'https://www.spicejet.com',
-        'G8': 'https://www.flygofirst.com',
-        'I5': 'https://www.airasia.com/en/gb',
-        # Middle East
-        'EK': 'https://www.emirates.com',
-        'QR': 'https://www.qatarairways.com',
-        'EY': 'https://www.etihad.com',
-        'WY': 'https://www.omanair.com',
-        'GF': 'https://www.gulfair.com',
-        # Asian Airlines
-        'UL': 'https://www.srilankan.com',
-        'SQ': 'https://www.singaporeair.com',
-        'TG': 'https://www.thaiairways.com',
-        'CX': 'https://www.cathaypacific.com',
-        'MH': 'https://www.malaysiaairlines.com',
-        'VJ': 'https://www.vietjetair.com',
-        'VN': 'https://www.vietnamairlines.com',
-        'TR': 'https://www.flyscoot.com',
-        '3K': 'https://www.jetstar.com',
-        'AK': 'https://www.airasia.com',
-        'NH': 'https://www.ana.co.jp',
-        'JL': 'https://www.jal.co.jp',
-        'KE': 'https://www.koreanair.com',
-        # European Airlines
-        'BA': 'https://www.britishairways.com',
-        'LH': 'https://www.lufthansa.com',
-        'AF': 'https://www.airfrance.com',
-        'KL': 'https://www.klm.com',
-        'VS': 'https://www.virginatlantic.com',
-        'IB': 'https://www.iberia.com',
-        'LX': 'https://www.swiss.com',
-        # American Airlines
-        'AA': 'https://www.aa.com',
-        'UA': 'https://www.united.com',
-        'DL': 'https://www.delta.com',
-        'AC': 'https://www.aircanada.com',
-        # Oceania
-        'QF': 'https://www.qantas.com',
-        'NZ': 'https://www.airnewzealand.com'
-    }
-    return websites.get(carrier_code, None)
+    return AIRLINE_WEBSITES.get(carrier_code, None)
 
 def get_aircraft_name(aircraft_code):
     """Get aircraft name from code"""
-    aircraft = {
-        # Airbus A320 Family
-        '318': 'Airbus A318',
-        '319': 'Airbus A319',
-        '320': 'Airbus A320',
-        '321': 'Airbus A321',
-        '32A': 'Airbus A320 (Sharklets)',
-        '32B': 'Airbus A321 (Sharklets)',
-        '32N': 'Airbus A320neo',
-        '32Q': 'Airbus A321neo',
-        # Airbus A330 Family
-        '330': 'Airbus A330',
-        '332': 'Airbus A330-200',
-        '333': 'Airbus A330-300',
-        '338': 'Airbus A330-800neo',
-        '339': 'Airbus A330-900neo',
-        # Airbus A340 Family
-        '342': 'Airbus A340-200',
-        '343': 'Airbus A340-300',
-        '345': 'Airbus A340-500',
-        '346': 'Airbus A340-600',
-        # Airbus A350 Family
-        '350': 'Airbus A350',
-        '351': 'Airbus A350-1000',
-        '359': 'Airbus A350-900',
-        # Airbus A380
-        '388': 'Airbus A380-800',
-        '380': 'Airbus A380',
-        # Boeing 737 Family
-        '733': 'Boeing 737-300',
-        '734': 'Boeing 737-400',
-        '735': 'Boeing 737-500',
-        '736': 'Boeing 737-600',
-        '737': 'Boeing 737-700',
-        '738': 'Boeing 737-800',
-        '739': 'Boeing 737-900',
-        '73H': 'Boeing 737-800',
-        '73J': 'Boeing 737-900',
-        '7M8': 'Boeing 737 MAX 8',
-        '7M9': 'Boeing 737 MAX 9',
-        # Boeing 747
-        '744': 'Boeing 747-400',
-        '747': 'Boeing 747',
-        '748': 'Boeing 747-8',
-        # Boeing 757
-        '752': 'Boeing 757-200',
-        '753': 'Boeing 757-300',
-        # Boeing 767
-        '762': 'Boeing 767-200',
-        '763': 'Boeing 767-300',
-        '764': 'Boeing 767-400',
-        # Boeing 777 Family
-        '772': 'Boeing 777-200',
-        '77L': 'Boeing 777-200LR',
-        '773': 'Boeing 777-300',
-        '77W': 'Boeing 777-300ER',
-        '777': 'Boeing 777',
-        # Boeing 787 Dreamliner
-        '787': 'Boeing 787',
-        '788': 'Boeing 787-8',
-        '789': 'Boeing 787-9',
-        '78J': 'Boeing 787-10',
-        # Regional Jets
-        'E75': 'Embraer E175',
-        'E90': 'Embraer E190',
-        'E95': 'Embraer E195',
-        'CR9': 'Bombardier CRJ-900',
-        'CRJ': 'Bombardier CRJ',
-        # Turboprops
-        'AT7': 'ATR 72',
-        'AT5': 'ATR 42',
-        'DH4': 'Dash 8-400'
+    return AIRCRAFT_NAMES.get(aircraft_code, aircraft_code if aircraft_code else 'N/A')
+
+def get_airline_info(carrier_code):
+    """Get name, booking website and direct-booking flag for a carrier code"""
+    airline_website = get_airline_website(carrier_code)
+    return {
+        'carrier_code': carrier_code,
+        'airline_name': get_airline_name(carrier_code),
+        'website': airline_website,
+        'has_direct_booking': airline_website is not None
     }
-    return aircraft.get(aircraft_code, aircraft_code if aircraft_code else 'N/A')
+
+def build_lookup_tables(flights):
+    """
+    Build deduplicated carrier/aircraft lookup tables for a list of parsed flights
+    (codes are uppercased, so "ai" and "AI" share one entry)
+    Returns: (carriers, aircraft) where
+        carriers = {carrier_code: get_airline_info(carrier_code)}
+        aircraft = {aircraft_code: aircraft_name}
+    """
+    carrier_codes = set()
+    aircraft_codes = set()
+
+    for flight in flights:
+        if not flight:
+            continue
+        if flight.get('validating_airline') and flight['validating_airline'] != 'N/A':
+            carrier_codes.add(flight['validating_airline'].upper())
+        for journey_key in ('outbound', 'return'):
+            journey = flight.get(journey_key)
+            if not journey:
+                continue
+            for seg in journey.get('segments', []):
+                for code in (seg.get('carrier'), seg.get('operating_carrier')):
+                    if code:
+                        carrier_codes.add(code.upper())
+                if seg.get('aircraft'):
+                    aircraft_codes.add(seg['aircraft'].upper())
+
+    carriers = {code: get_airline_info(code) for code in sorted(carrier_codes)}
+    aircraft = {code: get_aircraft_name(code) for code in sorted(aircraft_codes)}
+    return carriers, aircraft
 
 # Test function
 if __name__ == "__main__":
@@ -4,21 +4,40 @@ FastAPI wrapper for existing Python backend logic
 Exposes endpoints for Next.js frontend
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Literal
 from datetime import datetime, timedelta
+import asyncio
+import contextvars
+import functools
 import os
 from dotenv import load_dotenv
 
 # Import existing backend modules
-from core import get_trip_dates
-from iata_extractor import extract_iata_from_query, get_indian_airports_list
-from amadeus_flights import AmadeusFlightSearch, get_airline_name, get_airline_website
+from core import MODEL_CANDIDATES as DURATION_MODEL_CANDIDATES, DURATION_GENERATION_CONFIG
+from trip_extractor import MODEL_CANDIDATES as TRIP_MODEL_CANDIDATES, TRIP_GENERATION_CONFIG
+from iata_extractor import MODEL_CANDIDATES as IATA_MODEL_CANDIDATES, IATA_GENERATION_CONFIG
+from llm_client import init_models, model_health, model_registry, llm_pool
+from prompts import PROMPT_STYLE, prompt_sizes
+from llm_metrics import llm_metrics, request_trace
+from query_cache import query_cache
+from local_extractor import path_stats, fast_extract_trip, fast_extract_iata, fast_get_trip_dates, fast_extract_trips
+from flight_ranking import attach_ranking
+from worker_pools import worker_pools, Overloaded
+from airport_index import airport_index, airport_search, etag_matches, SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+from amadeus_flights import AmadeusFlightSearch, get_airline_info as lookup_airline_info, build_lookup_tables, journey_within_limits
 
 load_dotenv()
 
+# Configure Gemini once and pre-build the model handles both extractors reuse
+gemini_configured = init_models(warm_specs=[
+    (IATA_MODEL_CANDIDATES, IATA_GENERATION_CONFIG),
+    (DURATION_MODEL_CANDIDATES, DURATION_GENERATION_CONFIG),
+    (TRIP_MODEL_CANDIDATES, TRIP_GENERATION_CONFIG),
+])
+
 # Initialize FastAPI
 app = FastAPI(
     title="FlightAI API",
@@ -48,6 +67,35 @@ if amadeus_client_id and amadeus_client_secret:
 else:
     amadeus_searcher = None
 
+# Extraction runs off the event loop on a bounded pool.
+# EXTRACTION_MODE=combined (default) uses one model call for destination + duration;
+# EXTRACTION_MODE=split runs the two separate extractors concurrently.
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "combined")
+
+# One bounded pool per blocking dependency (Gemini extraction, Amadeus search).
+# Once a pool's workers and queue slots are all taken, new requests get a fast
+# 503 with Retry-After instead of waiting behind everyone else. Extraction is also
+# refused while the LLM call pool is full, abandoned calls included.
+extraction_pool = worker_pools.create(
+    "extract",
+    max_workers=int(os.getenv("EXTRACTION_WORKERS", "8")),
+    max_queue=int(os.getenv("EXTRACTION_MAX_QUEUE", "32")),
+    upstream=[llm_pool]
+)
+flight_search_pool = worker_pools.create(
+    "amadeus",
+    max_workers=int(os.getenv("FLIGHT_SEARCH_WORKERS", "8")),
+    max_queue=int(os.getenv("FLIGHT_SEARCH_MAX_QUEUE", "16"))
+)
+
+# Upper bound on queries accepted by /extract-trips
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "100"))
+
+# Carrier names/websites are static tables, so clients may cache them for a day
+AIRLINE_INFO_CACHE_CONTROL = "public, max-age=86400"
+# The airport list only changes with a deploy; clients revalidate hourly with its ETag
+AIRPORTS_CACHE_CONTROL = "public, max-age=3600"
+
 
 # ==================== REQUEST/RESPONSE MODELS ====================
 
@@ -62,13 +110,29 @@ class TripExtractionResponse(BaseModel):
     origin_city: str
     destination_iata: Optional[str]
     destination_city: Optional[str]
+    destination_iatas: List[str] = []
     iata_confidence: str
     duration_days: int
     departure_date: str
     return_date: str
     model_used: str
     used_fallback: bool
+    answered_by: str = "llm"
     error: Optional[str]
+    llm_trace: List[Dict] = []
+
+class TripBatchRequest(BaseModel):
+    origin_iata: str
+    user_queries: List[str]
+    fallback_days: int = 7
+
+class TripBatchResponse(BaseModel):
+    results: List[TripExtractionResponse]
+    queries: int
+    unique_queries: int
+    llm_calls: int
+    answered_by: Dict[str, int]
+    llm_trace: List[Dict] = []
 
 class FlightSearchRequest(BaseModel):
     origin: str
@@ -81,6 +145,11 @@ class FlightSearchRequest(BaseModel):
     travel_class: Optional[str] = None
     non_stop: bool = False
     max_stops: Optional[int] = None
+    max_layover_minutes: Optional[int] = None
+    mix_and_match: bool = False
+    sort_by: Literal["price", "duration"] = "price"
+    # Extra destination airports searched together with `destination` (e.g. destination_iatas)
+    destinations: Optional[List[str]] = None
 
 class AirportInfo(BaseModel):
     iata: str
@@ -89,6 +158,64 @@ class AirportInfo(BaseModel):
     country: str = "India"
 
 
+# ==================== HELPERS ====================
+
+def lookup_origin_city(origin_iata):
+    """City name for an origin airport code from the airport index"""
+    return airport_index.city_for(origin_iata)
+
+def run_in_context(pool, fn, *args):
+    """
+    Run fn(*args) on a worker pool, keeping the caller's context (the LLM request trace)
+    in the worker. Raises a 503 with Retry-After when the pool is full.
+    """
+    try:
+        future = pool.submit(functools.partial(contextvars.copy_context().run, fn, *args))
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy ({e.pool} queue full), retry in {e.retry_after}s",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return asyncio.wrap_future(future)
+
+def trip_extraction_response(origin_iata, origin_city, trip_result, fallback_days):
+    """TripExtractionResponse for one extractor result"""
+    if not trip_result.get('iata_code'):
+        return TripExtractionResponse(
+            success=False,
+            origin_iata=origin_iata,
+            origin_city="",
+            destination_iata=None,
+            destination_city=None,
+            iata_confidence="low",
+            duration_days=fallback_days,
+            departure_date="",
+            return_date="",
+            model_used="none",
+            used_fallback=True,
+            answered_by=trip_result.get('answered_by', 'fallback'),
+            error="Could not extract destination from query"
+        )
+    
+    return TripExtractionResponse(
+        success=True,
+        origin_iata=origin_iata,
+        origin_city=origin_city,
+        destination_iata=trip_result.get('iata_code'),
+        destination_iatas=trip_result.get('iata_codes', []),
+        destination_city=trip_result.get('destination_city'),
+        iata_confidence=trip_result.get('confidence', 'low'),
+        duration_days=trip_result.get('duration_days', fallback_days),
+        departure_date=trip_result['departure_date'].strftime('%Y-%m-%d'),
+        return_date=trip_result['return_date'].strftime('%Y-%m-%d'),
+        model_used=trip_result.get('model_used') or 'none',
+        used_fallback=trip_result.get('used_fallback', True),
+        answered_by=trip_result.get('answered_by', 'llm'),
+        error=trip_result.get('error')
+    )
+
+
 # ==================== API ENDPOINTS ====================
 
 @app.get("/")
@@ -101,64 +228,36 @@ async def root():
         "endpoints": [
             "/airports",
             "/extract-trip",
+            "/extract-trips",
             "/search-flights",
-            "/airline-info/{code}"
+            "/airline-info?codes=AI,EK",
+            "/airline-info/{code}",
+            "/metrics"
         ]
     }
 
 @app.get("/airports", response_model=List[AirportInfo])
-async def get_airports():
-    """Get list of available Indian airports"""
-    try:
-        airports_raw = get_indian_airports_list()
-        airport_list = []
-        
-        # airports_raw is a list of dicts: [{"code": "BOM", "label": "Mumbai (BOM) - Airport Name"}, ...]
-        for airport_dict in airports_raw:
-            try:
-                iata_code = airport_dict.get("code", "").strip().upper()
-                label = airport_dict.get("label", "")
-                
-                # Validate IATA code
-                if not iata_code or len(iata_code) != 3:
-                    continue
-                
-                # Parse label: "Mumbai (BOM) - Chhatrapati Shivaji..."
-                # Extract city (before first parenthesis) and airport name (after dash)
-                if " - " in label:
-                    city_part = label.split(" - ")[0]
-                    name_part = label.split(" - ")[1] if len(label.split(" - ")) > 1 else ""
-                    
-                    # Remove IATA code from city part if present
-                    if "(" in city_part:
-                        city_name = city_part.split("(")[0].strip()
-                    else:
-                        city_name = city_part.strip()
-                    
-                    full_name = name_part.strip() if name_part else city_name
-                else:
-                    # Fallback if no dash
-                    city_name = label.split("(")[0].strip() if "(" in label else label
-                    full_name = city_name
-                
-                airport_list.append(AirportInfo(
-                    iata=iata_code,
-                    city=city_name,
-                    name=full_name,
-                    country="India"
-                ))
-                
-            except Exception as parse_error:
-                print(f"WARNING: Could not parse airport: {airport_dict} - {parse_error}")
-                continue
-        
-        return airport_list
-        
-    except Exception as e:
-        import traceback
-        print(f"CRITICAL ERROR in get_airports: {str(e)}")
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Error fetching airports: {str(e)}")
+async def get_airports(request: Request):
+    """Get list of available Indian airports (pre-serialized; 304 when the client's ETag matches)"""
+    headers = {"ETag": airport_index.etag, "Cache-Control": AIRPORTS_CACHE_CONTROL}
+    if airport_index.etag_matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=airport_index.payload, media_type="application/json", headers=headers)
+
+@app.get("/airports/search", response_model=List[AirportInfo])
+async def search_airports(
+    request: Request,
+    q: str = Query(..., max_length=64),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT)
+):
+    """
+    Airport autocomplete: prefix match on IATA code, city, airport name or alias, best first.
+    Answers depend only on the URL and the airport data, so they are cacheable per query.
+    """
+    headers = {"ETag": airport_search.etag, "Cache-Control": AIRPORTS_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), airport_search.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=airport_search.search_payload(q, limit), media_type="application/json", headers=headers)
 
 @app.post("/extract-trip", response_model=TripExtractionResponse)
 async def extract_trip_details(request: TripExtractionRequest):
@@ -167,76 +266,115 @@ async def extract_trip_details(request: TripExtractionRequest):
     Uses AI to extract destination and duration
     """
     try:
-        # Extract IATA code
-        iata_result = extract_iata_from_query(request.user_query)
-        
-        if not iata_result or not iata_result.get('iata_code'):
-            return TripExtractionResponse(
-                success=False,
-                origin_iata=request.origin_iata,
-                origin_city="",
-                destination_iata=None,
-                destination_city=None,
-                iata_confidence="low",
-                duration_days=request.fallback_days,
-                departure_date="",
-                return_date="",
-                model_used="none",
-                used_fallback=True,
-                error="Could not extract destination from query"
-            )
-        
-        # Extract duration and dates
-        duration_result = get_trip_dates(
-            request.origin_iata,
-            request.user_query,
-            fallback_days=request.fallback_days
-        )
+        with request_trace() as trace:
+            if EXTRACTION_MODE == "split":
+                # Destination and duration extractors run concurrently; latency is the slower of the two
+                iata_future = run_in_context(extraction_pool, fast_extract_iata, request.user_query, request.origin_iata)
+                try:
+                    duration_future = run_in_context(
+                        extraction_pool, fast_get_trip_dates, request.origin_iata, request.user_query, request.fallback_days
+                    )
+                except HTTPException:
+                    iata_future.cancel()
+                    raise
+                origin_city = lookup_origin_city(request.origin_iata)
+                iata_result, duration_result = await asyncio.gather(iata_future, duration_future)
+                trip_result = {
+                    **duration_result,
+                    'destination_city': iata_result.get('destination_city'),
+                    'iata_code': iata_result.get('iata_code'),
+                    'iata_codes': iata_result.get('iata_codes') or ([iata_result['iata_code']] if iata_result.get('iata_code') else []),
+                    'confidence': iata_result.get('confidence', 'low'),
+                    'answered_by': f"{iata_result['answered_by']}+{duration_result['answered_by']}",
+                    'error': duration_result.get('error') or iata_result.get('error')
+                }
+            else:
+                # Destination and duration from the local matcher or a single model call, off the event loop
+                trip_future = run_in_context(
+                    extraction_pool, fast_extract_trip, request.origin_iata, request.user_query, request.fallback_days
+                )
+                origin_city = lookup_origin_city(request.origin_iata)
+                trip_result = await trip_future
         
-        # Get origin city from airports list
-        airports = get_indian_airports_list()
-        origin_city = ""
-        for airport_dict in airports:
-            if airport_dict.get("code") == request.origin_iata:
-                # Extract city from label: "Mumbai (BOM) - Airport Name"
-                label = airport_dict.get("label", "")
-                if "(" in label:
-                    origin_city = label.split("(")[0].strip()
-                else:
-                    origin_city = label.split(" - ")[0].strip() if " - " in label else label
-                break
-        
-        return TripExtractionResponse(
-            success=True,
-            origin_iata=request.origin_iata,
-            origin_city=origin_city,
-            destination_iata=iata_result.get('iata_code'),
-            destination_city=iata_result.get('destination_city'),
-            iata_confidence=iata_result.get('confidence', 'low'),
-            duration_days=duration_result.get('duration_days', request.fallback_days),
-            departure_date=duration_result.get('departure_date').strftime('%Y-%m-%d') if duration_result.get('departure_date') else "",
-            return_date=duration_result.get('return_date').strftime('%Y-%m-%d') if duration_result.get('return_date') else "",
-            model_used=duration_result.get('model_used', 'none'),
-            used_fallback=duration_result.get('used_fallback', True),
-            error=duration_result.get('error')
-        )
+        response = trip_extraction_response(request.origin_iata, origin_city, trip_result, request.fallback_days)
+        response.llm_trace = list(trace)
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting trip: {str(e)}")
 
-@app.post("/search-flights")
-async def search_flights(request: FlightSearchRequest):
+@app.post("/extract-trips", response_model=TripBatchResponse)
+async def extract_trips_batch_details(request: TripBatchRequest):
     """
-    Search for real-time flight offers
-    Connects to Amadeus API
+    Extract trip details for a list of queries (results in request order).
+    Duplicates are answered once; local and cached answers skip the model and
+    the rest share multi-query prompts.
     """
+    if len(request.user_queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
     try:
-        if not amadeus_searcher:
-            raise HTTPException(
-                status_code=503,
-                detail="Flight search service unavailable. Check Amadeus credentials."
+        with request_trace() as trace:
+            batch_future = run_in_context(
+                extraction_pool, fast_extract_trips, request.origin_iata, request.user_queries, request.fallback_days
             )
+            origin_city = lookup_origin_city(request.origin_iata)
+            results, summary = await batch_future
         
+        return TripBatchResponse(
+            results=[trip_extraction_response(request.origin_iata, origin_city, r, request.fallback_days) for r in results],
+            llm_trace=list(trace),
+            **summary
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error extracting trips: {str(e)}")
+
+def run_flight_search(request):
+    """Amadeus search for one FlightSearchRequest (blocking; runs on the flight search pool)"""
+    # Several destination airports (metro area, country or region): search them concurrently
+    destinations = list(dict.fromkeys([request.destination] + (request.destinations or [])))
+    if len(destinations) > 1:
+        result = amadeus_searcher.search_destinations(
+            origin=request.origin,
+            destinations=destinations,
+            departure_date=request.departure_date,
+            return_date=request.return_date,
+            max_results=request.max_results,
+            mix_and_match=request.mix_and_match,
+            adults=request.adults,
+            currency=request.currency,
+            travel_class=request.travel_class,
+            non_stop=request.non_stop,
+            max_stops=request.max_stops,
+            max_layover_minutes=request.max_layover_minutes,
+            sort_by=request.sort_by
+        )
+        if result.get('mix_and_match'):
+            return attach_ranking(result)
+    
+    # Mix-and-match: pair two one-way searches instead of one round-trip search
+    elif request.mix_and_match and request.return_date:
+        result = amadeus_searcher.search_mix_and_match(
+            origin=request.origin,
+            destination=request.destination,
+            departure_date=request.departure_date,
+            return_date=request.return_date,
+            adults=request.adults,
+            max_results=request.max_results,
+            currency=request.currency,
+            travel_class=request.travel_class,
+            non_stop=request.non_stop,
+            max_stops=request.max_stops,
+            max_layover_minutes=request.max_layover_minutes,
+            sort_by=request.sort_by
+        )
+        return attach_ranking(result)
+    
+    else:
         # Call Amadeus search
         result = amadeus_searcher.search_flights(
             origin=request.origin,
@@ -249,42 +387,75 @@ async def search_flights(request: FlightSearchRequest):
             travel_class=request.travel_class,
             non_stop=request.non_stop
         )
+    
+    # Apply client-side max stops / layover filters if specified
+    if (request.max_stops is not None or request.max_layover_minutes is not None) and result.get('success') and result.get('flights'):
+        filtered_flights = []
+        for flight in result['flights']:
+            journeys = [flight['outbound']] + ([flight['return']] if flight.get('return') else [])
+            if all(journey_within_limits(j, request.max_stops, request.max_layover_minutes) for j in journeys):
+                filtered_flights.append(flight)
         
-        # Apply client-side max stops filter if specified
-        if request.max_stops is not None and result.get('success') and result.get('flights'):
-            filtered_flights = []
-            for flight in result['flights']:
-                outbound_stops = flight['outbound']['stops']
-                return_stops = flight.get('return', {}).get('stops', 0)
-                
-                if outbound_stops <= request.max_stops and return_stops <= request.max_stops:
-                    filtered_flights.append(flight)
-            
-            result['flights'] = filtered_flights
-            result['total_offers'] = len(filtered_flights)
+        result['flights'] = filtered_flights
+        result['total_offers'] = len(filtered_flights)
+        result['carriers'], result['aircraft'] = build_lookup_tables(filtered_flights)
+    
+    return attach_ranking(result)
+
+@app.post("/search-flights")
+async def search_flights(request: FlightSearchRequest):
+    """
+    Search for real-time flight offers
+    Connects to Amadeus API
+    """
+    try:
+        if not amadeus_searcher:
+            raise HTTPException(
+                status_code=503,
+                detail="Flight search service unavailable. Check Amadeus credentials."
+            )
         
-        return result
+        return await run_in_context(flight_search_pool, run_flight_search, request)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching flights: {str(e)}")
 
-@app.get("/airline-info/{carrier_code}")
-async def get_airline_info(carrier_code: str):
-    """Get airline name and website from carrier code"""
+@app.get("/airline-info")
+async def get_airline_info_batch(codes: str, response: Response):
+    """Get airline names and websites for a comma-separated list of carrier codes"""
     try:
-        airline_name = get_airline_name(carrier_code)
-        airline_website = get_airline_website(carrier_code)
-        
+        carrier_codes = sorted({code.strip().upper() for code in codes.split(",") if code.strip()})
+        if not carrier_codes:
+            raise HTTPException(status_code=400, detail="No carrier codes provided")
+
+        response.headers["Cache-Control"] = AIRLINE_INFO_CACHE_CONTROL
         return {
-            "carrier_code": carrier_code,
-            "airline_name": airline_name,
-            "website": airline_website,
-            "has_direct_booking": airline_website is not None
+            "airlines": {code: lookup_airline_info(code) for code in carrier_codes}
         }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching airline info: {str(e)}")
+
+@app.get("/airline-info/{carrier_code}")
+async def get_airline_info(carrier_code: str, response: Response):
+    """Get airline name and website from carrier code"""
+    try:
+        response.headers["Cache-Control"] = AIRLINE_INFO_CACHE_CONTROL
+        return lookup_airline_info(carrier_code)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching airline info: {str(e)}")
 
+@app.get("/metrics")
+async def metrics():
+    """LLM call and worker pool metrics in the Prometheus text format"""
+    content = llm_metrics.render_prometheus() + worker_pools.render_prometheus()
+    return Response(content=content, media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
@@ -292,6 +463,13 @@ async def health_check():
         "status": "healthy",
         "amadeus_configured": amadeus_searcher is not None,
         "google_api_configured": os.getenv("GOOGLE_API_KEY") is not None,
+        "llm_backend": model_registry.backend.name,
+        "prompts": {"style": PROMPT_STYLE, "system_prompt_tokens": prompt_sizes()},
+        "models": model_health.snapshot(),
+        "extraction_cache": query_cache.stats(),
+        "extraction_paths": path_stats.snapshot(),
+        "llm": llm_metrics.snapshot(),
+        "worker_pools": worker_pools.snapshot(),
         "timestamp": datetime.now().isoformat()
     }
 
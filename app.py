@@ -8,8 +8,12 @@ import os
 from dotenv import load_dotenv
 
 # Import core functionality
-from core import get_trip_dates
-from iata_extractor import extract_iata_from_query, get_indian_airports_list, INDIAN_AIRPORTS
+from local_extractor import fast_extract_trip
+from core import MODEL_CANDIDATES as DURATION_MODEL_CANDIDATES, DURATION_GENERATION_CONFIG
+from trip_extractor import MODEL_CANDIDATES as TRIP_MODEL_CANDIDATES, TRIP_GENERATION_CONFIG
+from iata_extractor import get_indian_airports_list, INDIAN_AIRPORTS, MODEL_CANDIDATES as IATA_MODEL_CANDIDATES, IATA_GENERATION_CONFIG
+from llm_client import init_models
+from flight_ranking import attach_ranking
 from amadeus_flights import AmadeusFlightSearch, format_duration, format_datetime, get_airline_name, get_aircraft_name, get_airline_website
 try:
     import google.generativeai as genai
@@ -545,8 +549,11 @@ if 'searching_flights' not in st.session_state:
 
 # Configure Gemini API
 api_key = os.getenv("GOOGLE_API_KEY")
-if api_key and GENAI_AVAILABLE:
-    genai.configure(api_key=api_key)
+if api_key and GENAI_AVAILABLE and init_models(api_key, [
+    (IATA_MODEL_CANDIDATES, IATA_GENERATION_CONFIG),
+    (DURATION_MODEL_CANDIDATES, DURATION_GENERATION_CONFIG),
+    (TRIP_MODEL_CANDIDATES, TRIP_GENERATION_CONFIG),
+]):
     api_status = "Connected"
     api_color = "green"
 else:
@@ -695,11 +702,8 @@ with col_left:
         else:
             with st.spinner("🤖 AI is extracting trip details..."):
                 try:
-                    # Extract IATA code
-                    iata_result = extract_iata_from_query(query)
-                    
-                    # Extract duration
-                    duration_result = get_trip_dates(
+                    # Extract destination and duration locally, or in one model call
+                    trip_result = fast_extract_trip(
                         origin_text=origin_city,
                         user_query=query,
                         fallback_days=fallback_days,
@@ -708,13 +712,12 @@ with col_left:
                     
                     # Combine results
                     combined_result = {
-                        **duration_result,
+                        **trip_result,
                         'origin_iata': origin_iata,
                         'origin_city': origin_city,
-                        'destination_city': iata_result['destination_city'],
-                        'destination_iata': iata_result['iata_code'],
-                        'iata_confidence': iata_result['confidence'],
-                        'iata_fallback': iata_result['used_fallback']
+                        'destination_iata': trip_result['iata_code'],
+                        'iata_confidence': trip_result['confidence'],
+                        'iata_fallback': trip_result['iata_used_fallback']
                     }
                     
                     # Add to history
@@ -907,7 +910,7 @@ if st.session_state.results_history:
                             flight_results['flights'] = filtered_flights
                             flight_results['total_offers'] = len(filtered_flights)
                         
-                        st.session_state.flight_results = flight_results
+                        st.session_state.flight_results = attach_ranking(flight_results)
                         st.session_state.searching_flights = False
                         st.rerun()
                     except Exception as e:
@@ -932,7 +935,8 @@ if st.session_state.results_history:
         
         with detail_col2:
             st.markdown("**🤖 AI Extraction Details**")
-            st.write(f"**Duration Model:** {result.get('model_used', 'N/A')}")
+            st.write(f"**Extraction Model:** {result.get('model_used') or 'N/A'}")
+            st.write(f"**Answered By:** {result.get('answered_by', 'llm').upper()}")
             st.write(f"**Duration Fallback:** {'Yes' if result.get('used_fallback') else 'No'}")
             st.write(f"**IATA Confidence:** {result.get('iata_confidence', 'N/A').upper()}")
             st.write(f"**IATA Fallback:** {'Yes' if result.get('iata_fallback') else 'No'}")
@@ -949,8 +953,26 @@ if st.session_state.flight_results:
     
     flights_data = st.session_state.flight_results
     
+    # Carrier/aircraft lookup tables embedded in the search response
+    carriers = flights_data.get('carriers') or {}
+    aircraft_names = flights_data.get('aircraft') or {}
+    
+    def carrier_name_for(code):
+        info = carriers.get(code)
+        return info['airline_name'] if info else get_airline_name(code)
+    
+    def carrier_website_for(code):
+        info = carriers.get(code)
+        return info['website'] if info else get_airline_website(code)
+    
+    def aircraft_name_for(code):
+        return aircraft_names.get(code) or get_aircraft_name(code)
+    
     if flights_data.get('success') and flights_data.get('flights'):
         st.success(f"Found {flights_data['total_offers']} flight offers from {flights_data['origin']} to {flights_data['destination']}")
+        if flights_data.get('price_converted'):
+            fx = flights_data.get('fx', {})
+            st.caption(f"💱 Prices converted from {fx.get('source_currency')} at cached rates (as of {fx.get('as_of')}); the fare is charged in {fx.get('source_currency')}.")
         
         # Display each flight
         for idx, flight in enumerate(flights_data['flights'], 1):
@@ -975,9 +997,11 @@ if st.session_state.flight_results:
                 seat_status = 'CHECK AVAILABILITY'
             
             # Create expander title with price
-            expander_title = f"💺 Flight {idx} - {get_airline_name(flight['outbound']['carrier'])} • {flight['price']['currency']} {flight['price']['total']}"
-            if idx == 1:
-                expander_title = f"🏆 {expander_title} • BEST PRICE"
+            badges = flight.get('badges', [])
+            badge_labels = [label for key, label in (('cheapest', 'BEST PRICE'), ('fastest', 'FASTEST'), ('best_value', 'BEST VALUE')) if key in badges]
+            expander_title = f"💺 Flight {idx} - {carrier_name_for(flight['outbound']['carrier'])} • {flight['price']['currency']} {flight['price']['total']}"
+            if badge_labels:
+                expander_title = f"🏆 {expander_title} • {' • '.join(badge_labels)}"
             
             with st.expander(expander_title, expanded=(idx==1)):
                 
@@ -994,7 +1018,7 @@ if st.session_state.flight_results:
                             <div class='{seat_class}' style='margin-bottom: 0.75rem;'>
                                 {seat_icon} {seat_status}
                             </div>
-                            {"<div class='best-price-badge'>BEST PRICE</div>" if idx == 1 else ""}
+                            {"".join(f"<div class='best-price-badge'>{label}</div>" for label in badge_labels)}
                         </div>
                     </div>
                 </div>
@@ -1003,7 +1027,7 @@ if st.session_state.flight_results:
                 # Flight Overview Metrics
                 overview_cols = st.columns(4)
                 with overview_cols[0]:
-                    st.metric("✈️ Airline", get_airline_name(flight.get('validating_airline', 'N/A')))
+                    st.metric("✈️ Airline", carrier_name_for(flight.get('validating_airline', 'N/A')))
                 with overview_cols[1]:
                     st.metric("🎫 Cabin", flight['outbound'].get('cabin', 'Economy'))
                 with overview_cols[2]:
@@ -1020,13 +1044,13 @@ if st.session_state.flight_results:
                 dest_code = flight['outbound']['arrival']['iata']
                 dep_date = flight['outbound']['departure']['time'][:10] if flight['outbound']['departure'].get('time') else ''
                 carrier = flight['outbound']['carrier']
-                airline_website = get_airline_website(carrier)
+                airline_website = carrier_website_for(carrier)
                 
                 # Primary booking button
                 booking_col1, booking_col2, booking_col3 = st.columns([1, 2, 1])
                 with booking_col2:
                     if airline_website:
-                        carrier_name = get_airline_name(carrier)
+                        carrier_name = carrier_name_for(carrier)
                         st.link_button(
                             f"✈️ Book on {carrier_name} Official Website",
                             airline_website,
@@ -1076,16 +1100,16 @@ if st.session_state.flight_results:
                     
                     with seg_col2:
                         st.write("**Flight**")
-                        carrier_name = get_airline_name(segment['carrier'])
+                        carrier_name = carrier_name_for(segment['carrier'])
                         st.write(f"✈️ {carrier_name}")
                         st.write(f"🔢 {segment['carrier']}{segment['flight_number']}")
                         if segment.get('operating_carrier') and segment['operating_carrier'] != segment['carrier']:
-                            st.caption(f"Operated by: {get_airline_name(segment['operating_carrier'])}")
+                            st.caption(f"Operated by: {carrier_name_for(segment['operating_carrier'])}")
                     
                     with seg_col3:
                         st.write("**Details**")
                         st.write(f"⏱️ {format_duration(segment['duration'])}")
-                        st.write(f"�️ {get_aircraft_name(segment.get('aircraft'))}")
+                        st.write(f"�️ {aircraft_name_for(segment.get('aircraft'))}")
                         if segment.get('cabin'):
                             st.caption(f"Cabin: {segment['cabin']}")
                     
@@ -1122,16 +1146,16 @@ if st.session_state.flight_results:
                         
                         with seg_col2:
                             st.write("**Flight**")
-                            carrier_name = get_airline_name(segment['carrier'])
+                            carrier_name = carrier_name_for(segment['carrier'])
                             st.write(f"✈️ {carrier_name}")
                             st.write(f"🔢 {segment['carrier']}{segment['flight_number']}")
                             if segment.get('operating_carrier') and segment['operating_carrier'] != segment['carrier']:
-                                st.caption(f"Operated by: {get_airline_name(segment['operating_carrier'])}")
+                                st.caption(f"Operated by: {carrier_name_for(segment['operating_carrier'])}")
                         
                         with seg_col3:
                             st.write("**Details**")
                             st.write(f"⏱️ {format_duration(segment['duration'])}")
-                            st.write(f"�️ {get_aircraft_name(segment.get('aircraft'))}")
+                            st.write(f"�️ {aircraft_name_for(segment.get('aircraft'))}")
                             if segment.get('cabin'):
                                 st.caption(f"Cabin: {segment['cabin']}")
                         
@@ -0,0 +1,56 @@
+"""
+Duration Parser Benchmark
+Reports accuracy of the local duration extractor on the labelled corpus and its
+throughput in parses per second.
+
+Usage: python benchmarks/bench_duration.py [--seconds 2]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import extract_duration_days_full
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "duration_corpus.tsv")
+
+def load_corpus(path=CORPUS_FILE):
+    """List of (query, expected_days) from a tab-separated file ('#' lines are comments)"""
+    corpus = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            query, expected = line.rsplit("\t", 1)
+            corpus.append((query, int(expected)))
+    return corpus
+
+def accuracy(corpus):
+    misses = [(q, e, extract_duration_days_full(q)) for q, e in corpus if extract_duration_days_full(q) != e]
+    return 1 - len(misses) / len(corpus), misses
+
+def throughput(corpus, seconds):
+    queries = [q for q, _ in corpus]
+    parses = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for q in queries:
+            extract_duration_days_full(q)
+        parses += len(queries)
+    return parses / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time budget for the throughput run")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    acc, misses = accuracy(corpus)
+    print(f"Corpus: {len(corpus)} labelled queries")
+    print(f"Accuracy: {acc:.1%}")
+    for query, expected, got in misses:
+        print(f"  MISS '{query}' -> {got} (expected {expected})")
+    print(f"Throughput: {throughput(corpus, args.seconds):,.0f} parses/sec")
@@ -0,0 +1,273 @@
+"""
+Trip Extraction Benchmark
+Runs the labelled trip corpus (trip_corpus.tsv, see make_trip_corpus.py) through each
+extraction path and reports coverage, exact-match accuracy and per-query latency
+percentiles, plus a confidence-threshold sweep for the local fast path: how much
+traffic it can answer at each threshold and how accurate those answers are.
+The generated corpus shares its tables with the gazetteer, so its precision is circular
+and cannot justify a threshold. The hand-labelled adversarial slice (trip_adversarial.tsv:
+person names, common-word cities, "City, Country" and "City, Region", numeric shorthands,
+several destinations, origins, negations, reversed and cross-month date ranges) is
+reported separately. Its sweep is the one LOCAL_CONFIDENCE_THRESHOLD is chosen from:
+the lowest threshold with no wrong local answer on the slice is printed at the end.
+
+A destination is correct when the predicted primary airport is one of the accepted
+codes (or there is none when the query names no place); a trip is an exact match
+when destination and duration are both correct. LLM paths use the fake backend unless
+--backend gemini is given (needs GOOGLE_API_KEY). The fake backend answers from the
+same gazetteer and grammar, so its rows measure plumbing and latency, not model accuracy.
+
+Usage: python benchmarks/bench_extraction.py [--llm-sample 300] [--backend fake|gemini] [--misses 10]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the paths, not the on-disk extraction cache
+os.environ.setdefault("QUERY_CACHE_DB", "")
+
+from core import extract_duration_days_full
+from iata_extractor import local_iata_fallback
+from local_extractor import (local_match_destination, local_match_duration, local_extract_trip,
+                             fast_extract_trip, ExtractionPathStats, LOCAL_CONFIDENCE_THRESHOLD)
+from trip_extractor import extract_trip, MODEL_CANDIDATES, TRIP_GENERATION_CONFIG
+from llm_client import init_models, set_backend
+from fake_llm import FakeLLMBackend
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trip_corpus.tsv")
+ADVERSARIAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trip_adversarial.tsv")
+SWEEP_THRESHOLDS = (0.5, 0.7, 0.8, 0.85, 0.9, 0.95)
+
+def load_corpus(path=CORPUS_FILE):
+    """
+    (version, [{"origin", "query", "accepted", "days", "category"}]) from the TSV corpus;
+    an accepted column of "-" (no destination named) becomes an empty set
+    """
+    version, corpus = None, []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("#"):
+                if version is None:
+                    version = line.lstrip("# ").split(" ", 1)[0]
+                continue
+            if not line:
+                continue
+            origin, query, accepted, days, category = line.split("\t")
+            corpus.append({"origin": origin, "query": query,
+                           "accepted": set() if accepted == "-" else set(accepted.split(",")),
+                           "days": int(days), "category": category})
+    return version, corpus
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+# Each path maps a corpus row to (iata_code|None, duration_days|None); None means "no answer"
+def path_duration_grammar(row):
+    return None, extract_duration_days_full(row["query"])
+
+def path_gazetteer(row):
+    match = local_match_destination(row["query"], row["origin"])
+    return match["iata_code"], None
+
+def path_iata_fallback(row):
+    return local_iata_fallback(row["query"])["iata_code"], None
+
+def path_local_trip(row):
+    result = local_extract_trip(row["query"], origin_text=row["origin"])
+    if result is None:
+        return None, None
+    return result["iata_code"], result["duration_days"]
+
+def path_llm_trip(row):
+    result = extract_trip(row["origin"], row["query"])
+    return result["iata_code"], result["duration_days"]
+
+def make_fast_path():
+    stats = ExtractionPathStats()
+
+    def path_fast_trip(row):
+        result = fast_extract_trip(row["origin"], row["query"], stats=stats, sample_rate=0)
+        return result["iata_code"], result["duration_days"]
+    return path_fast_trip, stats
+
+def field_ok(check, iata, days, row):
+    """One predicted field against the labels (no destination is right for queries naming no place)"""
+    if check == "destination":
+        return iata in row["accepted"] if row["accepted"] else iata is None
+    return days == row["days"]
+
+def run_path(name, fn, rows, checks, self_graded=False):
+    """
+    Time `fn` over `rows` and score the fields named in `checks` ("destination", "duration").
+    self_graded marks paths whose answers come from the code under test (the fake backend)
+    """
+    latencies, answered, correct, misses = [], 0, 0, []
+    by_category = {}
+    for row in rows:
+        start = time.perf_counter()
+        iata, days = fn(row)
+        latencies.append(time.perf_counter() - start)
+
+        got = {"destination": iata, "duration": days}
+        if any(got[check] is None and (check != "destination" or row["accepted"]) for check in checks):
+            ok, has_answer = False, False
+        else:
+            has_answer = True
+            ok = all(field_ok(check, iata, days, row) for check in checks)
+        answered += has_answer
+        correct += ok
+        cat = by_category.setdefault(row["category"], [0, 0])
+        cat[0] += 1
+        cat[1] += ok
+        if has_answer and not ok:
+            misses.append((row["query"], iata, days, sorted(row["accepted"]), row["days"]))
+
+    n = len(rows)
+    return {
+        "path": name,
+        "self_graded": self_graded,
+        "queries": n,
+        "coverage": round(answered / n, 4) if n else None,
+        "accuracy": round(correct / n, 4) if n else None,
+        "precision": round(correct / answered, 4) if answered else None,
+        "latency_ms": {label: round(percentile(latencies, q) * 1000, 3)
+                       for label, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))} if n else {},
+        "by_category": {cat: round(ok / total, 4) for cat, (total, ok) in sorted(by_category.items())},
+        "misses": misses,
+    }
+
+def threshold_sweep(rows, thresholds=SWEEP_THRESHOLDS):
+    """Coverage and precision of the local trip matcher at each confidence threshold"""
+    scored = []
+    for row in rows:
+        destination = local_match_destination(row["query"], row["origin"])
+        duration = local_match_duration(row["query"])
+        score = min(destination["score"], duration["score"])
+        ok = (field_ok("destination", destination["iata_code"], None, row)
+              and field_ok("duration", None, duration["duration_days"], row))
+        scored.append((score, ok))
+    sweep = []
+    for threshold in thresholds:
+        kept = [ok for score, ok in scored if score and score >= threshold]
+        sweep.append({
+            "threshold": threshold,
+            "coverage": round(len(kept) / len(scored), 4),
+            "precision": round(sum(kept) / len(kept), 4) if kept else None,
+        })
+    return sweep
+
+def safe_threshold(sweep):
+    """Lowest swept threshold whose local answers are all correct (None when there is none)"""
+    safe = [s["threshold"] for s in sweep if s["precision"] == 1.0]
+    return min(safe) if safe else None
+
+def configure_backend(backend, latency_ms, seed):
+    if backend == "fake":
+        set_backend(FakeLLMBackend(latency_ms=latency_ms, jitter_ms=latency_ms / 2, seed=seed))
+        return True
+    from dotenv import load_dotenv
+    load_dotenv()
+    return init_models(os.getenv("GOOGLE_API_KEY"), [(MODEL_CANDIDATES, TRIP_GENERATION_CONFIG)])
+
+def print_report(version, corpus, results, sweep, show_misses, sweep_note=""):
+    print(f"Corpus: {version}, {len(corpus)} labelled queries")
+    print(f"{'path':<18}{'queries':>8}{'coverage':>10}{'accuracy':>10}{'precision':>10}"
+          f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        lat = r["latency_ms"]
+        if r["self_graded"]:
+            accuracy = precision = "self"
+        else:
+            accuracy = f"{r['accuracy']:.1%}"
+            precision = f"{r['precision']:.1%}" if r["precision"] is not None else "-"
+        print(f"{r['path']:<18}{r['queries']:>8}{r['coverage']:>10.1%}{accuracy:>10}{precision:>10}"
+              f"{lat['p50']:>10.3f}{lat['p90']:>10.3f}{lat['p99']:>10.3f}")
+    if any(r["self_graded"] for r in results):
+        print("  (self: the fake backend answers from the same gazetteer and grammar, not a model;"
+              " only its latency and coverage are meaningful)")
+
+    print("\nAccuracy by category:")
+    categories = sorted({cat for r in results for cat in r["by_category"]})
+    print(f"{'path':<18}" + "".join(f"{cat[:12]:>13}" for cat in categories))
+    for r in results:
+        if r["self_graded"]:
+            continue
+        print(f"{r['path']:<18}" + "".join(
+            f"{r['by_category'][cat]:>13.1%}" if cat in r["by_category"] else f"{'-':>13}" for cat in categories))
+
+    print(f"\nLocal fast-path threshold sweep (current LOCAL_CONFIDENCE_THRESHOLD={LOCAL_CONFIDENCE_THRESHOLD}):")
+    if sweep_note:
+        print(f"  ({sweep_note})")
+    for s in sweep:
+        precision = f"{s['precision']:.1%}" if s["precision"] is not None else "-"
+        print(f"  >= {s['threshold']:<5} answers {s['coverage']:>6.1%} of traffic at {precision} precision")
+
+    if show_misses:
+        for r in results:
+            if r["misses"]:
+                print(f"\n{r['path']} misses (first {show_misses} of {len(r['misses'])}):")
+                for query, iata, days, accepted, expected in r["misses"][:show_misses]:
+                    print(f"  '{query}' -> {iata}/{days} (expected {'|'.join(accepted) or '-'}/{expected})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=CORPUS_FILE, help="Labelled corpus TSV")
+    parser.add_argument("--adversarial", default=ADVERSARIAL_FILE, help="Hand-labelled adversarial TSV ('' skips it)")
+    parser.add_argument("--backend", choices=("fake", "gemini"), default="fake", help="LLM backend for the LLM paths")
+    parser.add_argument("--llm-sample", type=int, default=300, help="Queries sent through the LLM paths (0 skips them)")
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0, help="Simulated model latency for --backend fake")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the LLM sample and the fake backend")
+    parser.add_argument("--misses", type=int, default=0, help="Print up to N wrong answers per path")
+    parser.add_argument("--json", help="Also write the full report to this file")
+    args = parser.parse_args()
+
+    def run_all(rows, llm_rows):
+        results = [
+            run_path("duration_grammar", path_duration_grammar, rows, ("duration",)),
+            run_path("gazetteer", path_gazetteer, rows, ("destination",)),
+            run_path("iata_fallback", path_iata_fallback, rows, ("destination",)),
+            run_path("local_trip", path_local_trip, rows, ("destination", "duration")),
+        ]
+        if llm_rows:
+            self_graded = args.backend == "fake"
+            results.append(run_path(f"llm_trip[{args.backend}]", path_llm_trip, llm_rows,
+                                    ("destination", "duration"), self_graded))
+            fast_path, _ = make_fast_path()
+            results.append(run_path(f"fast_trip[{args.backend}]", fast_path, llm_rows,
+                                    ("destination", "duration"), self_graded))
+        return results, threshold_sweep(rows)
+
+    version, corpus = load_corpus(args.corpus)
+    adversarial_version, adversarial = load_corpus(args.adversarial) if args.adversarial else (None, [])
+    use_llm = args.llm_sample > 0 and configure_backend(args.backend, args.fake_latency_ms, args.seed)
+    sample = random.Random(args.seed).sample(corpus, min(args.llm_sample, len(corpus))) if use_llm else []
+    results, sweep = run_all(corpus, sample)
+    print_report(version, corpus, results, sweep, args.misses,
+                 sweep_note="generated corpus: labels come from the gazetteer tables, so this precision is circular")
+
+    report = {"corpus": version, "results": results, "threshold_sweep": sweep}
+    if adversarial:
+        adversarial_results, adversarial_sweep = run_all(adversarial, adversarial if use_llm else [])
+        print("\n" + "=" * 60 + "\nAdversarial slice (hand-labelled)\n" + "=" * 60)
+        print_report(adversarial_version, adversarial, adversarial_results, adversarial_sweep, args.misses,
+                     sweep_note="hand-labelled: the threshold is chosen from this sweep")
+        threshold = safe_threshold(adversarial_sweep)
+        print(f"\nLowest threshold with no wrong local answer on the hand-labelled slice: {threshold}"
+              f" (current {LOCAL_CONFIDENCE_THRESHOLD})")
+        if threshold is None or LOCAL_CONFIDENCE_THRESHOLD < threshold:
+            print("  WARNING: the current threshold answers some hand-labelled traps wrongly")
+        report["adversarial"] = {"corpus": adversarial_version, "results": adversarial_results,
+                                 "threshold_sweep": adversarial_sweep, "safe_threshold": threshold}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=sorted)
+        print(f"\nWrote {args.json}")
@@ -0,0 +1,138 @@
+"""
+Prompt Cost Benchmark
+Sends a sample of the trip corpus through the trip, destination and duration extractions
+once per prompt configuration (PROMPT_STYLE full/compact x LLM_CONTEXT_CACHE off/on) and
+reports prompt tokens per call, uncached prompt tokens per call and mean time to first
+token, with savings relative to the full, uncached baseline. PROMPT_STYLE defaults to full
+in production; compact is measured here as an option.
+
+Context caching is inactive in practice: the pinned google-generativeai 0.3.2 has no
+caching API, and the system prompts (about 168-450 tokens) are below Gemini's
+LLM_CONTEXT_CACHE_MIN_TOKENS (1024) anyway. The fake backend applies the same minimum,
+so the +cache rows match the uncached ones unless the prompts grow past it.
+
+With the default fake backend, time to first token is simulated as a fixed latency plus a
+prefill cost per 1000 uncached prompt tokens (--prefill-ms-per-ktoken), and answers come
+from the same gazetteer and grammar the corpus was built from, so trip accuracy is shown
+as "self". Use --backend gemini (needs GOOGLE_API_KEY) for real latency and accuracy.
+
+Usage: python benchmarks/bench_prompts.py [--sample 100] [--backend fake|gemini]
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the paths, not the on-disk extraction cache
+os.environ.setdefault("QUERY_CACHE_DB", "")
+
+CONFIGS = [("full", False), ("compact", False), ("full", True), ("compact", True)]
+LABELS = ("trip", "iata", "duration")
+
+def run_worker(args):
+    """Run one configuration in this process and print its measurements as JSON"""
+    from bench_extraction import load_corpus
+    from llm_client import init_models, set_backend
+    from llm_metrics import llm_metrics
+    from fake_llm import FakeLLMBackend
+    from prompts import prompt_sizes
+    from trip_extractor import extract_trip, MODEL_CANDIDATES, TRIP_GENERATION_CONFIG
+    from iata_extractor import extract_iata_from_query
+    from core import get_trip_dates
+
+    if args.backend == "fake":
+        set_backend(FakeLLMBackend(latency_ms=args.fake_latency_ms, prefill_ms_per_ktoken=args.prefill_ms_per_ktoken,
+                                   seed=args.seed))
+    else:
+        from dotenv import load_dotenv
+        load_dotenv()
+        if not init_models(os.getenv("GOOGLE_API_KEY"), [(MODEL_CANDIDATES, TRIP_GENERATION_CONFIG)]):
+            print(json.dumps({"error": "Gemini is not configured"}))
+            return
+
+    _, corpus = load_corpus()
+    sample = random.Random(args.seed).sample(corpus, min(args.sample, len(corpus)))
+    llm_metrics.reset()
+    correct = 0
+    for row in sample:
+        trip = extract_trip(row["origin"], row["query"])
+        correct += trip["iata_code"] in row["accepted"] and trip["duration_days"] == row["days"]
+        extract_iata_from_query(row["query"])
+        get_trip_dates(row["origin"], row["query"])
+
+    report = {"trip_accuracy": round(correct / len(sample), 4), "prompts": {}}
+    with llm_metrics._lock:
+        for label in LABELS:
+            keys = [key for key in llm_metrics.latency if key[0] == label]
+            calls = sum(llm_metrics.latency[key].count for key in keys)
+            ttft = [llm_metrics.ttft[key] for key in keys if key in llm_metrics.ttft]
+            ttft_count = sum(h.count for h in ttft)
+            prompt_tokens = sum(llm_metrics.prompt_tokens[key] for key in keys)
+            cached_tokens = sum(llm_metrics.cached_tokens[key] for key in keys)
+            report["prompts"][label] = {
+                "calls": calls,
+                "prompt_tokens_per_call": round(prompt_tokens / calls, 1) if calls else None,
+                "uncached_tokens_per_call": round((prompt_tokens - cached_tokens) / calls, 1) if calls else None,
+                "ttft_mean_ms": round(1000 * sum(h.sum for h in ttft) / ttft_count, 2) if ttft_count else None,
+            }
+    report["system_prompt_tokens"] = prompt_sizes()
+    print(json.dumps(report))
+
+def run_config(style, cache, args):
+    env = {**os.environ, "PROMPT_STYLE": style, "LLM_CONTEXT_CACHE": "1" if cache else "0"}
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--sample", str(args.sample),
+               "--backend", args.backend, "--seed", str(args.seed), "--fake-latency-ms", str(args.fake_latency_ms),
+               "--prefill-ms-per-ktoken", str(args.prefill_ms_per_ktoken)]
+    out = subprocess.run(command, env=env, capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def savings(value, baseline):
+    if value is None or not baseline:
+        return "-"
+    return f"{(value - baseline) / baseline:+.0%}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sample", type=int, default=100, help="Corpus queries per configuration")
+    parser.add_argument("--backend", choices=("fake", "gemini"), default="fake", help="LLM backend")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the sample and the fake backend")
+    parser.add_argument("--fake-latency-ms", type=float, default=20.0, help="Fixed fake model latency")
+    parser.add_argument("--prefill-ms-per-ktoken", type=float, default=150.0,
+                        help="Fake time to first token per 1000 uncached prompt tokens")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        sys.exit(0)
+
+    results = {(style, cache): run_config(style, cache, args) for style, cache in CONFIGS}
+    if any("error" in r for r in results.values()):
+        print(next(r["error"] for r in results.values() if "error" in r))
+        sys.exit(1)
+
+    sizes = results[CONFIGS[0]]["system_prompt_tokens"]
+    print(f"System prompt tokens (estimated), full -> compact ({args.backend} backend, {args.sample} queries):")
+    for name, by_style in sizes.items():
+        print(f"  {name:<11}{by_style['full']:>6} -> {by_style['compact']:<6}({savings(by_style['compact'], by_style['full'])})")
+
+    baseline = results[("full", False)]
+    print(f"\n{'config':<16}{'prompt':<10}{'tokens/call':>12}{'uncached':>10}{'change':>8}{'ttft ms':>10}{'change':>8}{'trip acc':>10}")
+    for style, cache in CONFIGS:
+        r = results[(style, cache)]
+        name = f"{style}{'+cache' if cache else ''}"
+        accuracy = "self" if args.backend == "fake" else f"{r['trip_accuracy']:.1%}"
+        for label in LABELS:
+            p, b = r["prompts"][label], baseline["prompts"][label]
+            if not p["calls"]:
+                continue
+            print(f"{name:<16}{label:<10}{p['prompt_tokens_per_call']:>12}{p['uncached_tokens_per_call']:>10}"
+                  f"{savings(p['uncached_tokens_per_call'], b['uncached_tokens_per_call']):>8}"
+                  f"{p['ttft_mean_ms'] if p['ttft_mean_ms'] is not None else '-':>10}"
+                  f"{savings(p['ttft_mean_ms'], b['ttft_mean_ms']):>8}{accuracy:>10}")
+    if args.backend == "fake":
+        print("  (self: the fake backend answers from the same gazetteer and grammar, not a model)")
@@ -0,0 +1,190 @@
+"""
+Trip Query Corpus Generator
+Builds the labelled trip_corpus.tsv used by bench_extraction.py: realistic trip
+queries over cities, local names, countries, regions, typos, missing durations and
+noisy phrasing, each labelled with the accepted destination airports and the
+intended duration. Labels come from the tables below, not from the extractors.
+
+The output is deterministic for a given seed; bump CORPUS_VERSION when the
+templates or tables change so benchmark results stay comparable.
+
+Usage: python benchmarks/make_trip_corpus.py [--size 3000] [--seed 7]
+"""
+import os
+import random
+import argparse
+
+CORPUS_VERSION = "trip-corpus-v1"
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trip_corpus.tsv")
+DEFAULT_ORIGIN = "BOM"
+# Duration the product assumes when the query states none
+DEFAULT_DAYS = 7
+
+# (name as written, accepted airports)
+CITIES = [
+    ("Dubai", "DXB"), ("Paris", "CDG ORY"), ("London", "LHR LGW STN LTN"), ("New York", "JFK EWR LGA"),
+    ("Tokyo", "HND NRT"), ("Singapore", "SIN"), ("Bangkok", "BKK DMK"), ("Bali", "DPS"), ("Goa", "GOI GOX"),
+    ("Delhi", "DEL"), ("New Delhi", "DEL"), ("Bangalore", "BLR"), ("Chennai", "MAA"), ("Kolkata", "CCU"),
+    ("Kochi", "COK"), ("Jaipur", "JAI"), ("Udaipur", "UDR"), ("Srinagar", "SXR"), ("Leh", "IXL"),
+    ("Varanasi", "VNS"), ("Amritsar", "ATQ"), ("Hyderabad", "HYD"), ("Pune", "PNQ"), ("Abu Dhabi", "AUH"),
+    ("Doha", "DOH"), ("Muscat", "MCT"), ("Riyadh", "RUH"), ("Jeddah", "JED"), ("Istanbul", "IST SAW"),
+    ("Amman", "AMM"), ("Tel Aviv", "TLV"), ("Rome", "FCO CIA"), ("Milan", "MXP LIN BGY"), ("Venice", "VCE"),
+    ("Florence", "FLR"), ("Barcelona", "BCN"), ("Madrid", "MAD"), ("Lisbon", "LIS"), ("Amsterdam", "AMS"),
+    ("Berlin", "BER"), ("Munich", "MUC"), ("Frankfurt", "FRA"), ("Zurich", "ZRH"), ("Geneva", "GVA"),
+    ("Vienna", "VIE"), ("Prague", "PRG"), ("Budapest", "BUD"), ("Athens", "ATH"), ("Santorini", "JTR"),
+    ("Copenhagen", "CPH"), ("Stockholm", "ARN"), ("Oslo", "OSL"), ("Helsinki", "HEL"), ("Reykjavik", "KEF"),
+    ("Dublin", "DUB"), ("Edinburgh", "EDI"), ("Manchester", "MAN"), ("Nice", "NCE"),
+    ("Kuala Lumpur", "KUL"), ("Phuket", "HKT"), ("Hanoi", "HAN"), ("Ho Chi Minh City", "SGN"),
+    ("Manila", "MNL"), ("Hong Kong", "HKG"), ("Seoul", "ICN GMP"), ("Osaka", "KIX ITM"), ("Beijing", "PEK PKX"),
+    ("Shanghai", "PVG SHA"), ("Kathmandu", "KTM"), ("Colombo", "CMB"), ("Taipei", "TPE"),
+    ("Los Angeles", "LAX"), ("San Francisco", "SFO"), ("Chicago", "ORD MDW"), ("Las Vegas", "LAS"),
+    ("Miami", "MIA"), ("Toronto", "YYZ"), ("Vancouver", "YVR"), ("Cancun", "CUN"), ("Mexico City", "MEX"),
+    ("Rio de Janeiro", "GIG SDU"), ("Buenos Aires", "EZE AEP"), ("Lima", "LIM"), ("Sydney", "SYD"),
+    ("Melbourne", "MEL"), ("Auckland", "AKL"), ("Queenstown", "ZQN"), ("Cape Town", "CPT"),
+    ("Johannesburg", "JNB"), ("Nairobi", "NBO"), ("Cairo", "CAI"), ("Marrakech", "RAK"), ("Zanzibar", "ZNZ"),
+]
+
+# Local, historic or informal names
+ALIASES = [
+    ("Bombay", "BOM"), ("Bengaluru", "BLR"), ("Madras", "MAA"), ("Calcutta", "CCU"), ("Cochin", "COK"),
+    ("Kashmir", "SXR"), ("Ladakh", "IXL"), ("Manali", "KUU"), ("Rishikesh", "DED"), ("Darjeeling", "IXB"),
+    ("Andaman", "IXZ"), ("NYC", "JFK EWR LGA"), ("Saigon", "SGN"), ("Kyoto", "KIX ITM"), ("Vegas", "LAS"),
+    ("Mecca", "JED"), ("Roma", "FCO CIA"), ("Praha", "PRG"), ("Munchen", "MUC"), ("Lapland", "RVN"),
+    ("Machu Picchu", "CUZ"), ("Angkor Wat", "REP"), ("Amalfi Coast", "NAP"), ("Tuscany", "FLR PSA"),
+]
+
+COUNTRIES = [
+    ("Japan", "HND NRT KIX"), ("Thailand", "BKK DMK HKT"), ("Switzerland", "ZRH GVA"), ("Swiss", "ZRH GVA"),
+    ("Italy", "FCO MXP VCE"), ("France", "CDG ORY NCE"), ("Spain", "MAD BCN"), ("UK", "LHR LGW STN LTN MAN"),
+    ("England", "LHR LGW STN LTN MAN"), ("USA", "JFK EWR LGA LAX ATL ORD SFO"), ("Australia", "SYD MEL"),
+    ("Vietnam", "SGN HAN"), ("Indonesia", "CGK DPS"), ("Sri Lanka", "CMB"), ("Nepal", "KTM"),
+    ("Greece", "ATH"), ("Turkey", "IST SAW AYT"), ("Egypt", "CAI"), ("Malaysia", "KUL"),
+    ("Germany", "FRA MUC BER"), ("Iceland", "KEF"), ("New Zealand", "AKL"), ("South Korea", "ICN GMP"),
+    ("Canada", "YYZ YVR"), ("Portugal", "LIS"), ("Maldives", "MLE"), ("Mauritius", "MRU"),
+    ("Seychelles", "SEZ"), ("Fiji", "NAN"), ("Bhutan", "PBH"),
+]
+
+REGIONS = [
+    ("Europe", "LHR CDG FRA AMS MAD FCO IST MUC BCN ZRH LGW"), ("Scandinavia", "CPH ARN OSL HEL"),
+    ("Southeast Asia", "SIN BKK KUL CGK SGN MNL"), ("the Middle East", "DXB DOH AUH RUH JED"),
+]
+
+ORIGIN_CITIES = {"BOM": "Mumbai", "DEL": "Delhi", "BLR": "Bangalore", "MAA": "Chennai"}
+
+NUMBER_WORDS = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+                "eleven", "twelve", "thirteen", "fourteen"]
+
+def duration_phrases(rng):
+    """(phrase, days) for one randomly chosen duration surface form"""
+    n = rng.randint(2, 14)
+    forms = [
+        (f"{n} days", n), (f"{n} days", n), (f"{NUMBER_WORDS[n]} days", n), (f"{n} nights", n),
+        ("a week", 7), ("one week", 7), ("two weeks", 14), (f"{rng.randint(2, 3)} weeks", None),
+        ("a fortnight", 14), ("the weekend", 2), ("a long weekend", 3), ("a month", 30),
+        ("about a week", 7), (f"{n}d", None),
+    ]
+    phrase, days = rng.choice(forms)
+    if days is None:
+        if phrase.endswith("weeks"):
+            days = int(phrase.split()[0]) * 7
+        else:
+            phrase, days = f"{n} days", n
+    return phrase, days
+
+DURATION_TEMPLATES = [
+    "{dur} in {place}", "trip to {place} for {dur}", "{place} for {dur}", "I want to spend {dur} in {place}",
+    "going to {place} for {dur} with family", "honeymoon in {place}, {dur}", "plan a trip to {place} for {dur}",
+    "{dur} vacation in {place}", "visit {place} for {dur}", "can you find flights to {place} for {dur}?",
+    "solo trip to {place} for {dur}", "{dur} holiday in {place} with friends", "Need to be in {place} for {dur}",
+    "business trip to {place}, {dur}",
+]
+ADJECTIVE_TEMPLATES = ["a {n}-day trip to {place}", "{n} day {place} itinerary", "planning a {n}-night stay in {place}"]
+NO_DURATION_TEMPLATES = ["trip to {place}", "visiting {place}", "flights to {place}", "{place} holiday",
+                         "I want to go to {place}", "cheap flights to {place} please"]
+ORIGIN_TEMPLATES = ["flying from {origin} to {place} for {dur}", "{origin} to {place}, {dur}",
+                    "from {origin} to {place} for {dur}"]
+
+def typo(name, rng):
+    """One deterministic typing slip: adjacent swap, dropped or doubled letter"""
+    word_positions = [i for i in range(1, len(name) - 1) if name[i].isalpha() and name[i + 1].isalpha()]
+    if not word_positions:
+        return name
+    i = rng.choice(word_positions)
+    kind = rng.choice(("swap", "drop", "double"))
+    if kind == "swap":
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    if kind == "drop":
+        return name[:i] + name[i + 1:]
+    return name[:i] + name[i] + name[i:]
+
+def noisy(query, rng):
+    """Shouting, stray punctuation or filler around an otherwise clean query"""
+    choice = rng.choice(("upper", "lower", "punct", "filler"))
+    if choice == "upper":
+        return query.upper()
+    if choice == "lower":
+        return query.lower()
+    if choice == "punct":
+        return query + rng.choice(("!!!", "??", " :)", "..."))
+    return rng.choice(("hey, ", "pls ", "hi! ", "umm ")) + query
+
+def generate(size=3000, seed=7):
+    """List of (origin, query, accepted_iatas, expected_days, category)"""
+    rng = random.Random(seed)
+    mix = [("city", 40), ("alias", 10), ("country", 12), ("region", 3), ("typo", 12),
+           ("adjective", 5), ("no_duration", 8), ("origin_mention", 5), ("noisy", 5)]
+    categories = [c for c, weight in mix for _ in range(weight)]
+    rows, seen = [], set()
+    attempts = 0
+    while len(rows) < size and attempts < size * 20:
+        attempts += 1
+        category = rng.choice(categories)
+        origin = DEFAULT_ORIGIN
+        pool = {"alias": ALIASES, "country": COUNTRIES, "region": REGIONS}.get(category, CITIES)
+        place, accepted = rng.choice(pool)
+        if "BOM" in accepted.split():
+            origin = "DEL"
+        if category == "typo":
+            if len(place.replace(" ", "")) < 6:
+                continue
+            place = typo(place, rng)
+
+        if category == "adjective":
+            n = rng.randint(2, 14)
+            template = rng.choice(ADJECTIVE_TEMPLATES)
+            query, days = template.format(n=n, place=place), n
+        elif category == "no_duration":
+            query, days = rng.choice(NO_DURATION_TEMPLATES).format(place=place), DEFAULT_DAYS
+        else:
+            phrase, days = duration_phrases(rng)
+            if category == "origin_mention":
+                origin = rng.choice(sorted(o for o in ORIGIN_CITIES if o not in accepted.split()))
+                query = rng.choice(ORIGIN_TEMPLATES).format(origin=ORIGIN_CITIES[origin], place=place, dur=phrase)
+            else:
+                query = rng.choice(DURATION_TEMPLATES).format(place=place, dur=phrase)
+        if category == "noisy":
+            query = noisy(query, rng)
+
+        if (origin, query) in seen:
+            continue
+        seen.add((origin, query))
+        rows.append((origin, query, accepted.replace(" ", ","), days, category))
+    return rows
+
+def write_corpus(rows, path=CORPUS_FILE, seed=7):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# {CORPUS_VERSION} (seed {seed}, {len(rows)} queries); generated by make_trip_corpus.py\n")
+        f.write("# origin\tquery\taccepted_iatas\texpected_days\tcategory\n")
+        for origin, query, accepted, days, category in rows:
+            f.write(f"{origin}\t{query}\t{accepted}\t{days}\t{category}\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=3000, help="Number of queries")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    parser.add_argument("--out", default=CORPUS_FILE, help="Output TSV path")
+    args = parser.parse_args()
+
+    rows = generate(args.size, args.seed)
+    write_corpus(rows, args.out, args.seed)
+    print(f"Wrote {len(rows)} queries to {args.out}")
@@ -4,7 +4,7 @@ Module to extract trip duration using Gemini (prefers AI extraction).
 If Gemini can't produce a valid integer duration (1..365), falls back to a robust local extractor.
 Returns a dict with:
   - duration_days (int)
-  - departure_date (datetime.date)  # today + 8 days
+  - departure_date (datetime.date)  # stated in the query, else today + 8 days
   - return_date (datetime.date)
   - raw_model_output (str|None)
   - model_used (str|None)
@@ -18,13 +18,13 @@ from datetime import datetime, timedelta
 import os
 import re
 import json
-import time
+import math
 
-# Optional: import google.generativeai if you will call Gemini
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
+# Gemini access goes through the shared client layer (model registry + health tracking)
+from llm_client import generate_text, init_models, json_generation_config
+from llm_metrics import llm_metrics
+from date_parser import parse_trip_dates
+from prompts import get_prompt, user_message
 
 # --- Model candidates (from your project ListModels) ---
 MODEL_CANDIDATES = [
@@ -38,6 +38,9 @@ MODEL_CANDIDATES = [
     "gemini-flash-latest",
 ]
 
+# Deterministic, capped output for the tiny JSON answer we ask for
+DURATION_GENERATION_CONFIG = json_generation_config(max_output_tokens=256)
+
 # --- Local robust extractor (fallback) ---
 NUMBER_WORDS = {
     "zero":0,"one":1,"two":2,"three":3,"four":4,"five":5,"six":6,"seven":7,"eight":8,
@@ -60,57 +63,178 @@ def words_to_number(words):
     total += current
     return total if total > 0 else None
 
-# robust full extractor (handles digits, words, weeks, ranges, weekend etc.)
-def extract_duration_days_full(text, fallback=7):
-    if not text:
-        return fallback
-    t = text.lower()
-
-    # weekend -> 2 days
-    if "weekend" in t:
-        return 2
-
-    # "a week and a half" or explicit halves
-    if re.search(r"(?:a|one)\s+week\s+and\s+a\s+half", t):
-        return 11  # 1.5 weeks = 10.5 days, round up to 11
-
-    # weeks -> days
-    m_week = re.search(r"(\d+|\w+)\s*(?:weeks|week)\b", t)
-    if m_week:
-        w = m_week.group(1)
-        try:
-            wv = int(w)
-        except:
-            wv = words_to_number(w) or 1
-        return max(1, int(wv * 7))
-
-    # range like "10-12 days" -> take lower bound
-    m_range = re.search(r"(\d+)\s*[-–]\s*(\d+)\s*(?:days|day|nights|night)", t)
-    if m_range:
-        return int(m_range.group(1))
-
-    # digit with day/night
-    m_digits = re.search(r"(\d+)\s*(?:days|day|nights|night)\b", t)
-    if m_digits:
-        return int(m_digits.group(1))
-
-    # number words followed by days
-    m_words = re.search(
-        r"\b(?:(?:one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred)(?:\s+|[-])?){1,3}\b(?:\s*(?:days|day|nights|night))?",
-        t)
-    if m_words:
-        candidate = m_words.group(0)
-        num = words_to_number(candidate)
-        if num:
-            return num
-
-    # fallback: any single digit in text
-    m_any_digit = re.search(r"\b(\d{1,3})\b", t)
-    if m_any_digit:
-        v = int(m_any_digit.group(1))
-        if 1 <= v <= 365:
-            return v
+# --- Duration grammar: one precompiled tokenizer, single pass over the tokens ---
+_DURATION_TOKEN_RE = re.compile(r"\d+(?:\.\d+)?|[a-z]+|[-–/]")
+
+# unit word -> days
+DURATION_UNITS = {
+    "day": 1, "days": 1, "night": 1, "nights": 1,
+    "week": 7, "weeks": 7, "wk": 7, "wks": 7,
+    "fortnight": 14, "fortnights": 14,
+    "month": 30, "months": 30,
+}
+_ARTICLES = {"a", "an"}
+_RANGE_WORDS = {"-", "–", "/", "to", "or"}
+# Vague quantities ("a couple of days") parse but mark the result approximate
+_VAGUE_QUANTITIES = {"couple": 2, "few": 3, "several": 4}
+_APPROXIMATE_WORDS = {
+    "about", "around", "approx", "approximately", "roughly", "nearly", "almost", "under", "over",
+    "max", "maximum", "min", "minimum", "upto", "least", "most", "less", "more", "between"
+}
+# Words that do not interrupt a quantity ("a couple of days", "a full week")
+_FILLER_WORDS = {"of", "full", "whole", "entire", "long"}
+
+def _is_number_token(token):
+    return token is not None and (token[0].isdigit() or token in NUMBER_WORDS)
 
+def parse_duration(text):
+    """
+    Parse every duration mention in `text` in a single pass. Returns
+      {
+        "days": int|None,          # first mention, rounded up to whole days
+        "mentions": [int],         # all mentions in order
+        "is_range": bool,          # "3 to 4 weeks", "10-12 days", "a day or two" (lower bound is used)
+        "is_approximate": bool,    # "about a week", "a couple of days"
+        "bare_number": int|None    # first number not attached to a unit
+      }
+    """
+    tokens = _DURATION_TOKEN_RE.findall(text.lower()) if text else []
+    mentions = []
+    is_range = is_approximate = approx_pending = False
+    bare_number = None
+
+    qty = None              # pending quantity waiting for its unit
+    qty_is_article = False  # pending quantity is an implicit 1 ("a week")
+    last_word_value = None  # previous number word, for compounds ("twenty one", "two hundred")
+    range_pending = False   # a range connector follows the pending quantity
+    in_upper_bound = False  # skipping the upper bound of a range
+    last_unit = None        # days per unit of a mention that just ended ("a week and a half")
+
+    def flush():
+        nonlocal qty, qty_is_article, last_word_value, range_pending, in_upper_bound, bare_number
+        if qty is not None and not qty_is_article and bare_number is None and qty == int(qty):
+            bare_number = int(qty)
+        qty, qty_is_article, last_word_value = None, False, None
+        range_pending = in_upper_bound = False
+
+    i, n = 0, len(tokens)
+    while i < n:
+        token = tokens[i]
+        following = tokens[i + 1] if i + 1 < n else None
+        unit_just_ended = last_unit
+        last_unit = None
+
+        if token[0].isdigit() or token in NUMBER_WORDS:
+            word_value = None if token[0].isdigit() else NUMBER_WORDS[token]
+            if range_pending or (in_upper_bound and word_value is not None and last_word_value is not None):
+                is_range, range_pending, in_upper_bound = True, False, True
+                last_word_value = word_value
+            elif in_upper_bound:
+                flush()
+                qty, last_word_value = (float(token) if word_value is None else word_value), word_value
+            elif word_value is None:
+                if qty is not None and not qty_is_article:
+                    flush()
+                qty, qty_is_article, last_word_value = float(token), False, None
+            elif last_word_value is not None and word_value == 100:
+                qty *= 100
+                last_word_value = word_value
+            elif last_word_value is not None and last_word_value >= 20 and last_word_value % 10 == 0 and word_value < 10:
+                qty += word_value
+                last_word_value = word_value
+            else:
+                if qty is not None and not qty_is_article:
+                    flush()
+                qty, qty_is_article, last_word_value = float(word_value), False, word_value
+        elif token in _ARTICLES:
+            if qty is None:
+                qty, qty_is_article, last_word_value = 1.0, True, 1
+            elif tokens[i - 1] != "half":
+                flush()
+                qty, qty_is_article, last_word_value = 1.0, True, 1
+        elif token == "half":
+            if qty is None:
+                qty, qty_is_article, last_word_value = 0.5, False, None
+        elif token == "and":
+            half_words = 2 if following in _ARTICLES and i + 2 < n and tokens[i + 2] == "half" else (1 if following == "half" else 0)
+            if half_words and qty is not None:
+                qty += 0.5                                  # "one and a half weeks"
+                last_word_value = None
+                i += half_words
+            elif half_words and unit_just_ended:
+                mentions[-1] += 0.5 * unit_just_ended       # "a week and a half"
+                i += half_words
+            elif qty is not None and _is_number_token(following):
+                range_pending = True                        # "between 7 and 10 days"
+            else:
+                flush()
+        elif token in _RANGE_WORDS:
+            if (token == "-" and last_word_value is not None and last_word_value >= 20
+                    and following in NUMBER_WORDS and NUMBER_WORDS[following] < 10):
+                pass                                        # "twenty-one"
+            elif (unit_just_ended and token in ("or", "to") and _is_number_token(following)
+                  and (i + 2 >= n or tokens[i + 2] not in DURATION_UNITS)):
+                is_range = True                             # "a day or two", "a week or two"
+                i += 1
+            elif (qty is not None and not qty_is_article and _is_number_token(following)
+                  and (token != "/" or (i + 2 < n and tokens[i + 2] in DURATION_UNITS))):
+                range_pending = True                        # "3/4 days", not "20/12"
+            elif token not in ("-", "–"):
+                flush()
+        elif token in DURATION_UNITS:
+            if qty is None and token == "fortnight":
+                qty = 1.0                                   # "fortnight in Goa"
+            if qty is not None:
+                unit_days = DURATION_UNITS[token]
+                mentions.append(qty * unit_days)
+                is_approximate = is_approximate or approx_pending
+                approx_pending = False
+                qty, qty_is_article, last_word_value = None, False, None
+                range_pending = in_upper_bound = False
+                last_unit = unit_days
+        elif token in ("weekend", "weekends"):
+            base = 3 if i > 0 and tokens[i - 1] == "long" else 2
+            mentions.append(base * (qty if qty is not None and token == "weekends" else 1))
+            qty, qty_is_article, last_word_value = None, False, None
+            range_pending = in_upper_bound = False
+        elif token in _VAGUE_QUANTITIES:
+            qty, qty_is_article, last_word_value = float(_VAGUE_QUANTITIES[token]), True, None
+            approx_pending = True
+        elif token in _APPROXIMATE_WORDS:
+            flush()
+            approx_pending = True
+        elif token not in _FILLER_WORDS:
+            flush()
+        i += 1
+    flush()
+
+    mentions = [max(1, int(math.ceil(m))) for m in mentions]
+    return {
+        "days": mentions[0] if mentions else None,
+        "mentions": mentions,
+        "is_range": is_range,
+        "is_approximate": is_approximate,
+        "bare_number": bare_number
+    }
+
+def stated_duration_days(text, max_duration=365):
+    """The one duration the query states (None for missing, conflicting, ranged, approximate or out-of-bounds)"""
+    parsed = parse_duration(text)
+    if parsed["is_range"] or parsed["is_approximate"]:
+        return None
+    values = set(parsed["mentions"])
+    if len(values) != 1:
+        return None
+    days = values.pop()
+    return days if 1 <= days <= max_duration else None
+
+def extract_duration_days_full(text, fallback=7):
+    """Local duration extractor: first duration mention, else a bare number (1..365), else `fallback`"""
+    parsed = parse_duration(text)
+    if parsed["days"] is not None:
+        return parsed["days"]
+    if parsed["bare_number"] is not None and 1 <= parsed["bare_number"] <= 365:
+        return parsed["bare_number"]
     return fallback
 
 # --- Helpers to call Gemini (robustly try candidate models) ---
@@ -147,103 +271,165 @@ def safe_extract_text_from_genai_response(resp):
     except Exception:
         return None
 
-def call_gemini_json(system_prompt, user_prompt, model_candidates=MODEL_CANDIDATES, sleep_between_tries=0.25):
+def is_json_object(value):
+    return isinstance(value, dict)
+
+def call_gemini_json(system_prompt, user_prompt, model_candidates=MODEL_CANDIDATES,
+                     generation_config=DURATION_GENERATION_CONFIG, deadline=None, json_accept=is_json_object,
+                     label="duration"):
     """
-    Try each model candidate until one returns text. Returns:
+    Try model candidates (healthiest first, see llm_client.ModelHealth) until one returns text.
+    The answer is streamed and cut off at the first complete JSON value `json_accept` takes.
+    Calls are recorded in llm_metrics under `label`.
+    Returns:
       (raw_text, used_model, errors)
     """
-    if genai is None:
-        return None, None, [("genai_missing", "google.generativeai library not available")]
-    errors = []
-    for model_name in model_candidates:
-        try:
-            model = genai.GenerativeModel(model_name)
-            resp = model.generate_content([system_prompt, user_prompt])
-            text = safe_extract_text_from_genai_response(resp)
-            return text, model_name, errors
-        except Exception as e:
-            errors.append((model_name, repr(e)))
-            time.sleep(sleep_between_tries)
-            continue
-    return None, None, errors
+    return generate_text(system_prompt, user_prompt, model_candidates, generation_config,
+                         text_fn=safe_extract_text_from_genai_response, deadline=deadline,
+                         json_accept=json_accept, label=label)
 
 # --- System prompt used to ask Gemini for ONLY duration (JSON) ---
-SYSTEM_PROMPT_DURATION = (
-    "You are a short and strict extractor. The user has a trip request in plain English "
-    "and an origin provided separately. Your job: infer the trip DURATION (in days) the user intends.\n\n"
-    "RETURN ONLY a JSON object and NOTHING ELSE. The JSON must contain a single key:\n"
-    '  "duration_days": <integer number of days>\n'
-    "If you cannot determine it with confidence, still return a reasonable integer or the string 'UNKNOWN' for duration_days.\n\n"
-    "Examples:\n"
-    'Input: "plan trip to swiss for 7 days" => {"duration_days":7}\n'
-    'Input: "trip for a week" => {"duration_days":7}\n'
-    'Input: "weekend in paris" => {"duration_days":2}\n'
-    "Do NOT include commentary, markdown, or extra fields. Return valid JSON only."
-)
+# Versioned system prompt (prompts.py); its key is part of extraction cache keys
+DURATION_PROMPT = get_prompt("duration")
+DURATION_PROMPT_VERSION = DURATION_PROMPT.key
+SYSTEM_PROMPT_DURATION = DURATION_PROMPT.text
+
+# --- Parsing of the model's JSON answer ---
+def extract_json_object(raw_text):
+    """Parse the first {...} block of a model answer (or the whole text) as JSON"""
+    start = raw_text.find("{")
+    end = raw_text.rfind("}")
+    if start != -1 and end != -1 and end > start:
+        return json.loads(raw_text[start:end+1])
+    return json.loads(raw_text)
+
+def extract_json_array(raw_text):
+    """Parse the first [...] block of a model answer (or the whole text) as JSON"""
+    start = raw_text.find("[")
+    end = raw_text.rfind("]")
+    if start != -1 and end != -1 and end > start:
+        return json.loads(raw_text[start:end+1])
+    return json.loads(raw_text)
+
+def coerce_duration_value(val, max_duration=365):
+    """
+    Turn a model-provided duration_days value into an int.
+    Returns (duration_days|None, error|None); None means "use the local fallback".
+    """
+    # model may return string 'UNKNOWN' or number
+    if isinstance(val, str) and val.strip().upper() == "UNKNOWN":
+        duration_days = None
+    elif isinstance(val, bool):
+        duration_days = None
+    elif isinstance(val, (int, float)):
+        duration_days = int(val)
+    elif isinstance(val, str) and re.fullmatch(r"\d+", val.strip()):
+        duration_days = int(val.strip())
+    else:
+        duration_days = None
+
+    # Validate duration number range
+    if duration_days is not None and not (1 <= duration_days <= max_duration):
+        # invalid number from model -> fallback
+        return None, f" | invalid duration from model: {duration_days}"
+    return duration_days, None
+
+def parse_duration_response(raw_text, max_duration=365):
+    """
+    Parse the duration model output. Returns (duration_days|None, error|None).
+    """
+    if not raw_text:
+        return None, "No model text returned"
+    try:
+        parsed = extract_json_object(raw_text)
+    except Exception as e:
+        # parsing failed - keep raw_text for debugging and fallback
+        return None, f"Model JSON parse error: {repr(e)}"
+    val = parsed.get("duration_days") if isinstance(parsed, dict) else None
+    return coerce_duration_value(val, max_duration)
+
+def compute_trip_dates(duration_days, today=None, departure=None):
+    """Departure is today + 8 days unless given; return is departure + duration"""
+    today = today or datetime.today().date()
+    departure = departure or today + timedelta(days=8)
+    return departure, departure + timedelta(days=duration_days)
+
+def local_trip_dates(user_query, max_duration=365, today=None):
+    """
+    Trip dates the query states outright: an explicit range ("Dec 20 to Dec 27"), or an
+    explicit departure or return plus a duration ("next Friday for 5 days", "5 days, back by Dec 20").
+    Returns (duration_days, departure, return_date) or None
+    """
+    dates = parse_trip_dates(user_query, today, max_duration)
+    if dates is None:
+        return None
+    if dates["departure_date"] and dates["return_date"]:
+        return dates["duration_days"], dates["departure_date"], dates["return_date"]
+    duration_days = stated_duration_days(user_query, max_duration)
+    if duration_days is None:
+        return None
+    if dates["departure_date"] is None:
+        departure = dates["return_date"] - timedelta(days=duration_days)
+        if departure < (today or datetime.today().date()):
+            return None
+        return duration_days, departure, dates["return_date"]
+    return duration_days, dates["departure_date"], dates["departure_date"] + timedelta(days=duration_days)
+
+def resolve_trip_dates(user_query, duration_days, max_duration=365, today=None):
+    """
+    (duration_days, departure, return_date) once a duration is known: an explicit range in
+    the query wins over it, and an explicit departure replaces the default lead time
+    """
+    dates = parse_trip_dates(user_query, today, max_duration)
+    if dates and dates["departure_date"] and dates["return_date"]:
+        return dates["duration_days"], dates["departure_date"], dates["return_date"]
+    if dates and dates["return_date"]:
+        # Only the return is stated: count the duration back from it
+        departure = dates["return_date"] - timedelta(days=duration_days)
+        if departure >= (today or datetime.today().date()):
+            return duration_days, departure, dates["return_date"]
+        dates = None
+    departure, return_date = compute_trip_dates(duration_days, today, dates and dates["departure_date"])
+    return duration_days, departure, return_date
 
 # --- Public API function ---
 def get_trip_dates(origin_text, user_query, fallback_days=7, max_duration=365):
     """
-    Use Gemini to extract duration. Returns:
+    Trip dates stated in the query, else use Gemini to extract duration. Returns:
       {
         "duration_days": int,
         "departure_date": date,
         "return_date": date,
         "raw_model_output": str|None,
-        "model_used": str|None,
+        "model_used": str|None,       # "local" when the query stated the dates
         "used_fallback": bool,
         "error": str|None
       }
     """
-    today = datetime.today().date()
-    departure = today + timedelta(days=8)
+    # Explicit dates need no model call
+    local = local_trip_dates(user_query, max_duration)
+    if local is not None:
+        duration_days, departure, return_date = local
+        return {
+            "duration_days": duration_days,
+            "departure_date": departure,
+            "return_date": return_date,
+            "raw_model_output": None,
+            "model_used": "local",
+            "used_fallback": False,
+            "error": None
+        }
 
-    # Prepare system/user prompt
-    ctx_line = f"Origin: {origin_text}" if origin_text else ""
-    user_prompt = f"User query: {user_query}"
+    # Static system prompt; the origin travels with the query
+    raw_text, used_model, errors = call_gemini_json(
+        SYSTEM_PROMPT_DURATION, user_message(f"User query: {user_query}", origin_text),
+        json_accept=lambda value: isinstance(value, dict) and "duration_days" in value
+    )
 
-    final_system = SYSTEM_PROMPT_DURATION + ("\n" + ctx_line if ctx_line else "")
-
-    raw_text, used_model, errors = call_gemini_json(final_system, user_prompt)
+    duration_days, error = parse_duration_response(raw_text, max_duration)
     used_fallback = False
-    duration_days = None
-    error = None
-
-    # Try to parse model output as JSON (strict)
-    if raw_text:
-        try:
-            # extract first { .. } block
-            start = raw_text.find("{")
-            end = raw_text.rfind("}")
-            if start != -1 and end != -1 and end > start:
-                candidate = raw_text[start:end+1]
-                parsed = json.loads(candidate)
-            else:
-                parsed = json.loads(raw_text)
-            # model may return string 'UNKNOWN' or number
-            val = parsed.get("duration_days") if isinstance(parsed, dict) else None
-            if isinstance(val, str) and val.strip().upper() == "UNKNOWN":
-                duration_days = None
-            elif isinstance(val, (int, float)):
-                duration_days = int(val)
-            elif isinstance(val, str) and re.fullmatch(r"\d+", val.strip()):
-                duration_days = int(val.strip())
-            else:
-                duration_days = None
-        except Exception as e:
-            # parsing failed - keep raw_text for debugging and fallback
-            error = f"Model JSON parse error: {repr(e)}"
-            duration_days = None
-    else:
-        error = "No model text returned"
-        duration_days = None
-
-    # Validate duration number range
-    if duration_days is not None:
-        if not (1 <= duration_days <= max_duration):
-            # invalid number from model -> fallback
-            error = (error or "") + f" | invalid duration from model: {duration_days}"
-            duration_days = None
+    llm_metrics.record_extraction("duration", parse_failed=bool(raw_text) and duration_days is None,
+                                  used_fallback=duration_days is None)
 
     # If model failed or returned invalid, fallback to local parsing
     if duration_days is None:
@@ -251,8 +437,8 @@ def get_trip_dates(origin_text, user_query, fallback_days=7, max_duration=365):
         used_fallback = True
         duration_days = fallback_val
 
-    # Compute return date
-    return_date = departure + timedelta(days=duration_days)
+    # Compute departure/return dates
+    duration_days, departure, return_date = resolve_trip_dates(user_query, duration_days, max_duration)
 
     result = {
         "duration_days": int(duration_days),
@@ -277,8 +463,7 @@ if __name__ == "__main__":
         print("Please set it in .env file or environment variable.")
         exit(1)
     
-    if genai:
-        genai.configure(api_key=api_key)
+    if init_models(api_key, [(MODEL_CANDIDATES, DURATION_GENERATION_CONFIG)]):
         print("✓ Gemini API configured successfully\n")
     else:
         print("WARNING: google-generativeai not installed. Will use fallback extractor only.\n")
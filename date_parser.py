@@ -0,0 +1,230 @@
+"""
+Travel Date Parser
+Finds explicit travel dates in trip queries: absolute dates ("Dec 20", "20th of December",
+"2026-12-20", "20/12"), ranges ("Dec 20 to Dec 27", "20-27 Dec", "Dec 28-3 Jan"), weekday references
+("next Friday", "Friday to Sunday"), relative days ("tomorrow", "this weekend") and month
+names ("in December", "mid-March"). A date after "back by" or "returning" is the return
+date. Pure regex matching, no LLM.
+"""
+import os
+import re
+from datetime import date, datetime, timedelta
+
+# Numeric dates like 05/06 are read day-first unless DATE_DAY_FIRST=0
+DATE_DAY_FIRST = os.getenv("DATE_DAY_FIRST", "1") == "1"
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+}
+MONTH_ABBREVIATIONS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8, "sep": 9, "sept": 9,
+    "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+}
+# Day of the month a bare month reference starts on ("mid-March" -> March 15)
+MONTH_PART_DAYS = {"early": 1, "beginning of": 1, "start of": 1, "mid": 15, "late": 22, "end of": 22}
+
+def _alternation(words):
+    return "|".join(sorted(words, key=len, reverse=True))
+
+# Abbreviations only count next to a day number; "may" and "march" alone are verbs too often
+_ANY_MONTH = rf"(?:{_alternation(list(MONTHS) + list(MONTH_ABBREVIATIONS))})\.?"
+_FULL_MONTH = rf"(?:{_alternation(MONTHS)})"
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s+(?P<year>\d{4}))?"
+_CONNECTOR = r"(?:-|–|to|till|until|thru|through)"
+
+# "Dec 28-3 Jan": a month before the first day applies to it alone
+_DAY_RANGE_MONTH_RE = re.compile(
+    rf"\b(?:(?P<mon1>{_ANY_MONTH})\s+)?(?P<d1>{_DAY})\s*{_CONNECTOR}\s*(?P<d2>{_DAY})\s+(?:of\s+)?(?P<mon>{_ANY_MONTH})(?![a-z]){_YEAR}")
+_MONTH_DAY_RANGE_RE = re.compile(
+    rf"\b(?P<mon>{_ANY_MONTH})\s+(?P<d1>{_DAY})\s*{_CONNECTOR}\s*(?P<d2>{_DAY})\b"
+    rf"(?!\s*(?:{_ANY_MONTH}(?![a-z])|days?\b|nights?\b|weeks?\b)){_YEAR}")
+
+_MONTH_DAY_RE = re.compile(rf"\b(?P<mon>{_ANY_MONTH})\s+(?P<day>{_DAY})\b(?!\s*(?:days?|nights?|weeks?)\b){_YEAR}")
+_DAY_MONTH_RE = re.compile(rf"\b(?P<day>{_DAY})\s+(?:of\s+)?(?P<mon>{_ANY_MONTH})(?![a-z]){_YEAR}")
+_ISO_RE = re.compile(r"\b(?P<year>\d{4})-(?P<mon>\d{1,2})-(?P<day>\d{1,2})\b")
+# "3/4 days" and "2/3 weeks" are duration ranges, not dates
+_NUMERIC_RE = re.compile(r"\b(?!24/7\b)(?P<a>\d{1,2})/(?P<b>\d{1,2})(?:/(?P<year>\d{4}|\d{2}))?\b"
+                         r"(?!\s*(?:days?|nights?|weeks?|months?)\b)")
+_WEEKDAY_RE = re.compile(rf"\b(?:(?P<mod>next|this|coming)\s+)?(?P<wd>{_alternation(WEEKDAYS)})\b")
+# "today" is left out: "book a trip today" is about booking, not departing
+_RELATIVE_RE = re.compile(r"\b(?P<rel>day after tomorrow|tomorrow|(?:this|next) weekend|next week|next month)\b")
+# A date right after one of these is when the trip ends ("back by Dec 20", "returning on the 27th")
+_RETURN_CUE_RE = re.compile(r"\b(?:back|return|returning|home)(?:\s+(?:by|on|before))?[\s,]*(?:the\s+)?$")
+_MONTH_ONLY_RE = re.compile(
+    rf"\b(?P<pre>in|during|this|next|early|mid|late|end of|beginning of|start of)[\s-]+(?P<mon>{_FULL_MONTH})\b"
+    r"(?:\s+(?P<year>\d{4}))?")
+
+# Every date expression contains one of these; queries without any skip the full scan
+_HINT_RE = re.compile(
+    rf"\b(?:{_ANY_MONTH}|{_alternation(WEEKDAYS)}|tomorrow|weekend|next week|next month)(?![a-z])|\d[/-]\d")
+
+_ORDINAL_RE = re.compile(r"(st|nd|rd|th)$")
+# Text between a weekday and the date it qualifies ("Friday, Dec 20", "Dec 20 (Friday)")
+_QUALIFIER_GAP_RE = re.compile(r"^[\s,(]*(?:the\s+)?$")
+
+def _day_number(token):
+    return int(_ORDINAL_RE.sub("", token))
+
+def _month_number(token):
+    token = token.rstrip(".")
+    return MONTHS.get(token) or MONTH_ABBREVIATIONS.get(token)
+
+def _on_or_after(month, day, year, not_before):
+    """Date for month/day (in `year` if given, else the next occurrence on or after `not_before`)"""
+    if year:
+        year = int(year)
+        return date(year + 2000 if year < 100 else year, month, day)
+    candidate = date(not_before.year, month, day)
+    if candidate < not_before:
+        candidate = date(not_before.year + 1, month, day)
+    return candidate
+
+def _next_weekday(weekday, after):
+    """First `weekday` strictly after `after`"""
+    return after + timedelta(days=(weekday - after.weekday() - 1) % 7 + 1)
+
+def _resolve_relative(rel, today):
+    if rel == "tomorrow":
+        return today + timedelta(days=1)
+    if rel == "day after tomorrow":
+        return today + timedelta(days=2)
+    if rel == "next week":
+        return _next_weekday(0, today)
+    if rel == "next month":
+        return date(today.year + today.month // 12, today.month % 12 + 1, 1)
+    saturday = today if today.weekday() == 5 else _next_weekday(5, today)
+    return saturday + timedelta(days=7) if rel == "next weekend" else saturday
+
+def _date_mentions(text, today):
+    """
+    Every single-date mention as (start, end, kind, resolver) where resolver(not_before)
+    returns the date on or after `not_before` (ValueError when the date does not exist)
+    """
+    mentions = []
+
+    def add(match, kind, resolver):
+        mentions.append((match.start(), match.end(), kind, resolver))
+
+    for m in _MONTH_DAY_RE.finditer(text):
+        add(m, "date", lambda nb, m=m: _on_or_after(_month_number(m["mon"]), _day_number(m["day"]), m["year"], nb))
+    for m in _DAY_MONTH_RE.finditer(text):
+        add(m, "date", lambda nb, m=m: _on_or_after(_month_number(m["mon"]), _day_number(m["day"]), m["year"], nb))
+    for m in _ISO_RE.finditer(text):
+        add(m, "date", lambda nb, m=m: date(int(m["year"]), int(m["mon"]), int(m["day"])))
+    for m in _NUMERIC_RE.finditer(text):
+        day, month = (m["a"], m["b"]) if DATE_DAY_FIRST else (m["b"], m["a"])
+        add(m, "date", lambda nb, m=m, day=int(day), month=int(month): _on_or_after(month, day, m["year"], nb))
+    for m in _WEEKDAY_RE.finditer(text):
+        add(m, "weekday", lambda nb, m=m: _next_weekday(WEEKDAYS[m["wd"]], max(nb - timedelta(days=1), today)))
+    for m in _RELATIVE_RE.finditer(text):
+        add(m, "relative", lambda nb, m=m: max(_resolve_relative(m["rel"], today), nb))
+    for m in _MONTH_ONLY_RE.finditer(text):
+        day = MONTH_PART_DAYS.get(m["pre"], 1)
+        add(m, "month", lambda nb, m=m, day=day: max(_on_or_after(MONTHS[m["mon"]], day, m["year"], nb.replace(day=1)), nb))
+
+    # Longest mention wins where patterns overlap ("Friday, Dec 20" keeps both; "20 Dec 2026" keeps one)
+    mentions.sort(key=lambda item: (item[0], -(item[1] - item[0])))
+    kept = []
+    for mention in mentions:
+        if not kept or mention[0] >= kept[-1][1]:
+            kept.append(mention)
+
+    # A weekday right next to a date only qualifies it
+    def qualifies(a, b):
+        return "weekday" in (a[2], b[2]) and "date" in (a[2], b[2]) and _QUALIFIER_GAP_RE.match(text[a[1]:b[0]].rstrip(")"))
+    return [mention for i, mention in enumerate(kept)
+            if not (mention[2] == "weekday" and ((i > 0 and qualifies(kept[i - 1], mention))
+                                                 or (i + 1 < len(kept) and qualifies(mention, kept[i + 1]))))]
+
+def _result(departure, return_date, kind, text, today, max_duration):
+    if departure < today:
+        return None
+    if return_date is not None:
+        days = (return_date - departure).days
+        if not 1 <= days <= max_duration:
+            return_date = None
+    return {
+        "departure_date": departure,
+        "return_date": return_date,
+        "duration_days": (return_date - departure).days if return_date else None,
+        "kind": kind,
+        "text": text,
+    }
+
+def _day_range(m, month_after_days, today, max_duration):
+    """
+    A one-month day range ("20-27 Dec", "Dec 20-27"). A second day below the first ends in
+    the next month ("Dec 28-3", "28-3 Jan" -> Dec 28 to Jan 3) unless both days name the same
+    month ("Dec 28-3 Dec"), which is rejected (None)
+    """
+    d1, d2 = _day_number(m["d1"]), _day_number(m["d2"])
+    month = _month_number(m["mon"])
+    if month_after_days:
+        month2 = month
+        month1 = _month_number(m["mon1"]) if m["mon1"] else (month if d1 <= d2 else (month - 2) % 12 + 1)
+    else:
+        month1 = month
+        month2 = month if d1 <= d2 else month % 12 + 1
+    if month1 == month2 and d2 < d1:
+        return None
+    year1 = year2 = int(m["year"]) if m["year"] else None
+    if year1 is not None and (month1, d1) > (month2, d2):
+        year1 -= 1                                      # "28 Dec - 3 Jan 2027": the year is the return's
+    departure = _on_or_after(month1, d1, year1, today)
+    return_date = _on_or_after(month2, d2, year2, departure + timedelta(days=1))
+    return _result(departure, return_date, "range", m.group(0), today, max_duration)
+
+def parse_trip_dates(text, today=None, max_duration=365):
+    """
+    Explicit travel dates in `text`, or None when no date is mentioned. Returns
+      {
+        "departure_date": date|None,  # None when only the return is stated ("back by Dec 20")
+        "return_date": date|None,     # from a range, a second date or a return cue
+        "duration_days": int|None,    # return - departure
+        "kind": "range"|"date"|"weekday"|"relative"|"month"|"return",
+        "text": str                   # the matched expression(s)
+      }
+    Dates without a year are the next occurrence; past explicit dates are ignored.
+    """
+    lowered = text.lower() if text else ""
+    if not _HINT_RE.search(lowered):
+        return None
+    today = today or datetime.today().date()
+
+    try:
+        for regex in (_DAY_RANGE_MONTH_RE, _MONTH_DAY_RANGE_RE):
+            m = regex.search(lowered)
+            if m:
+                return _day_range(m, regex is _DAY_RANGE_MONTH_RE, today, max_duration)
+    except ValueError:
+        return None
+
+    departure = return_date = None
+    kind, matched = None, []
+    for start, end, mention_kind, resolver in _date_mentions(lowered, today):
+        try:
+            if departure is None and _RETURN_CUE_RE.search(lowered[:start]):
+                return_date = resolver(today + timedelta(days=1))
+                return {"departure_date": None, "return_date": return_date, "duration_days": None,
+                        "kind": "return", "text": lowered[start:end]}
+            if departure is None:
+                departure, kind = resolver(today), mention_kind
+                matched.append(lowered[start:end])
+            elif mention_kind != "month":
+                return_date = resolver(departure + timedelta(days=1))
+                if (mention_kind == "date" and return_date.month == departure.month
+                        and return_date.day < departure.day and resolver(today) <= departure):
+                    return None                         # "Dec 27 to Dec 20": reversed, not a 358-day trip
+                matched.append(lowered[start:end])
+                kind = "range"
+                break
+        except ValueError:
+            return None                                 # "Feb 30", "45/13": not a date we can trust
+    if departure is None:
+        return None
+    return _result(departure, return_date, kind, " / ".join(matched), today, max_duration)
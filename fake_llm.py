@@ -0,0 +1,278 @@
+"""
+Fake LLM Backend
+Deterministic stand-in for Gemini (LLM_BACKEND=fake) used by offline tests, benchmarks
+and load runs. Answers are scripted or derived from the local gazetteer and duration
+grammar, with configurable latency, error injection, malformed answers and token
+accounting, so the whole LLM path (model fallback, hedging, streaming, parsing, context
+caching) runs without calling Google.
+"""
+import os
+import re
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from llm_metrics import estimate_tokens
+from llm_client import LLM_CONTEXT_CACHE_MIN_TOKENS
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "0"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_MALFORMED_RATE = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+# Comma-separated model names that always fail (exercises candidate fallback)
+FAKE_LLM_FAILING_MODELS = os.getenv("FAKE_LLM_FAILING_MODELS", "")
+# JSON file of {"<query substring>": "<answer text>"} checked before the rules
+FAKE_LLM_SCRIPT = os.getenv("FAKE_LLM_SCRIPT", "")
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED", "")
+# Streamed answers arrive in chunks of this many characters, FAKE_LLM_CHUNK_DELAY_MS apart
+FAKE_LLM_CHUNK_CHARS = int(os.getenv("FAKE_LLM_CHUNK_CHARS", "16"))
+FAKE_LLM_CHUNK_DELAY_MS = float(os.getenv("FAKE_LLM_CHUNK_DELAY_MS", "0"))
+# Extra time to first token per 1000 uncached prompt tokens (models prompt size vs latency)
+FAKE_LLM_PREFILL_MS_PER_KTOKEN = float(os.getenv("FAKE_LLM_PREFILL_MS_PER_KTOKEN", "0"))
+# Smallest system prompt the fake accepts as cached context (Gemini's minimum unless overridden)
+FAKE_LLM_CACHE_MIN_TOKENS = int(os.getenv("FAKE_LLM_CACHE_MIN_TOKENS", str(LLM_CONTEXT_CACHE_MIN_TOKENS)))
+
+# Injected errors carry the class names the real client raises, so metrics group them the same way
+class ResourceExhausted(Exception):
+    pass
+
+class ServiceUnavailable(Exception):
+    pass
+
+class DeadlineExceeded(Exception):
+    pass
+
+# A caller error (bad request, safety block): scripts raise it to check it leaves model health alone
+class InvalidArgument(Exception):
+    pass
+
+INJECTED_ERRORS = (ResourceExhausted, ServiceUnavailable)
+
+_QUERY_RE = re.compile(r"User query:\s*(.*)", re.S)
+_BATCH_RE = re.compile(r"Queries:\s*(\[.*\])", re.S)
+_ORIGIN_RE = re.compile(r"^Origin:\s*(.+)$", re.M)
+
+def rule_destination(query, origin=None):
+    """Destination fields from the local gazetteer (fuzzy index as a second try)"""
+    from gazetteer import gazetteer
+    from fuzzy_index import fuzzy_index
+    match = gazetteer.resolve(query, origin=origin)
+    if not match["iata_code"]:
+        match = fuzzy_index.resolve(query, origin=origin)
+    if not match["iata_code"]:
+        return {"destination_city": "Unknown", "iata_code": "UNKNOWN", "alternate_iata_codes": [], "confidence": "low"}
+    return {
+        "destination_city": match["destination_city"],
+        "iata_code": match["iata_code"],
+        "alternate_iata_codes": match["iata_codes"][1:],
+        "confidence": "high" if match["confidence"] == "high" else "medium",
+    }
+
+def rule_duration(query):
+    """duration_days from the local duration grammar ("UNKNOWN" when none is stated)"""
+    from core import parse_duration
+    days = parse_duration(query)["days"]
+    return int(round(days)) if days else "UNKNOWN"
+
+def rule_answer(system_prompt, user_prompt):
+    """Answer text a well-behaved model would give for one of our prompts"""
+    wants_city = '"iata_code"' in system_prompt
+    wants_days = '"duration_days"' in system_prompt
+    origin = _ORIGIN_RE.search(user_prompt) or _ORIGIN_RE.search(system_prompt)
+    origin = origin.group(1).strip() if origin else None
+
+    def answer_one(query):
+        answer = rule_destination(query, origin) if wants_city else {}
+        if wants_days:
+            answer["duration_days"] = rule_duration(query)
+        if wants_city and not wants_days:
+            answer.pop("alternate_iata_codes", None)
+        return answer
+
+    batch = _BATCH_RE.search(user_prompt)
+    if batch and "BATCH MODE" in system_prompt:
+        items = json.loads(batch.group(1))
+        return json.dumps([{"id": item["id"], **answer_one(item["query"])} for item in items])
+    if not wants_city and not wants_days:
+        return "OK"
+    query = _QUERY_RE.search(user_prompt)
+    return json.dumps(answer_one(query.group(1) if query else user_prompt))
+
+class FakeResponse:
+    """Looks like a GenerateContentResponse (or one streamed chunk)"""
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+class _StreamIterator:
+    def __init__(self, chunks, delay, on_cancel):
+        self._chunks = iter(chunks)
+        self._delay = delay
+        self._on_cancel = on_cancel
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.cancelled:
+            raise StopIteration
+        chunk = next(self._chunks)
+        if self._delay:
+            time.sleep(self._delay)
+        return chunk
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self._on_cancel()
+
+class FakeStream:
+    """Iterable of chunks; `_iterator.cancel()` stops it like the gRPC stream"""
+    def __init__(self, chunks, delay, on_cancel):
+        self._iterator = _StreamIterator(chunks, delay, on_cancel)
+
+    def __iter__(self):
+        return self._iterator
+
+class FakeModel:
+    def __init__(self, backend, model_name, generation_config=None, cached_prefix=None):
+        self.backend = backend
+        self.model_name = model_name
+        self.generation_config = generation_config or {}
+        self.cached_prefix = cached_prefix
+
+    def generate_content(self, contents, stream=False, request_options=None):
+        if isinstance(contents, str):
+            contents = [contents]
+        if self.cached_prefix is not None:
+            system_prompt = self.cached_prefix
+        else:
+            system_prompt = contents[0] if len(contents) > 1 else ""
+        user_prompt = contents[-1]
+        timeout = (request_options or {}).get("timeout")
+        prompt_tokens = estimate_tokens(system_prompt + user_prompt)
+        cached_tokens = estimate_tokens(self.cached_prefix)
+        text = self.backend.answer(self.model_name, system_prompt, user_prompt, timeout,
+                                   prefill_tokens=prompt_tokens - cached_tokens)
+
+        usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=estimate_tokens(text),
+                                cached_content_token_count=cached_tokens)
+        self.backend.account(self.model_name, usage)
+        if not stream:
+            return FakeResponse(text, usage)
+        size = max(1, self.backend.chunk_chars)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        chunks = [FakeResponse(piece) for piece in pieces[:-1]] + [FakeResponse(pieces[-1], usage)]
+        return FakeStream(chunks, self.backend.chunk_delay, lambda: self.backend.count("streams_cancelled"))
+
+class FakeLLMBackend:
+    """
+    Model factory for llm_client (see llm_client.set_backend). `script` maps a query
+    substring to answer text, an Exception to raise, or a callable(system, user) -> text.
+    """
+    name = "fake"
+    available = True
+    supports_request_options = True
+    supports_cached_content = True
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, malformed_rate=0.0,
+                 failing_models=(), script=None, seed=None, chunk_chars=16, chunk_delay_ms=0.0,
+                 prefill_ms_per_ktoken=0.0, cache_min_tokens=FAKE_LLM_CACHE_MIN_TOKENS, model_latency_ms=None):
+        self.latency = latency_ms / 1000.0
+        # Per-model latency overrides ({"gemini-2.5-pro": 900}): a slow primary for hedging runs
+        self.model_latency = {name: ms / 1000.0 for name, ms in (model_latency_ms or {}).items()}
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.failing_models = set(failing_models)
+        self.script = dict(script or {})
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay_ms / 1000.0
+        self.prefill_per_token = prefill_ms_per_ktoken / 1e6
+        self.cached_content_min_tokens = cache_min_tokens
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "malformed": 0, "streams_cancelled": 0, "cached_contents": 0,
+                      "prompt_tokens": 0, "cached_prompt_tokens": 0, "response_tokens": 0}
+        self.calls_by_model = {}
+
+    @classmethod
+    def from_env(cls):
+        script = {}
+        if FAKE_LLM_SCRIPT:
+            with open(FAKE_LLM_SCRIPT, "r", encoding="utf-8") as f:
+                script = json.load(f)
+        return cls(
+            latency_ms=FAKE_LLM_LATENCY_MS, jitter_ms=FAKE_LLM_JITTER_MS, error_rate=FAKE_LLM_ERROR_RATE,
+            malformed_rate=FAKE_LLM_MALFORMED_RATE,
+            failing_models=[m.strip() for m in FAKE_LLM_FAILING_MODELS.split(",") if m.strip()],
+            script=script, seed=int(FAKE_LLM_SEED) if FAKE_LLM_SEED else None,
+            chunk_chars=FAKE_LLM_CHUNK_CHARS, chunk_delay_ms=FAKE_LLM_CHUNK_DELAY_MS,
+            prefill_ms_per_ktoken=FAKE_LLM_PREFILL_MS_PER_KTOKEN, cache_min_tokens=FAKE_LLM_CACHE_MIN_TOKENS
+        )
+
+    # --- llm_client backend interface ---
+    def configure(self, api_key=None):
+        return True
+
+    def build_model(self, model_name, generation_config=None):
+        return FakeModel(self, model_name, generation_config)
+
+    def build_cached_model(self, model_name, generation_config, system_prompt):
+        self.count("cached_contents")
+        return FakeModel(self, model_name, generation_config, cached_prefix=system_prompt)
+
+    # --- behaviour ---
+    def count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def account(self, model_name, usage):
+        with self._lock:
+            self.stats["prompt_tokens"] += usage.prompt_token_count
+            self.stats["cached_prompt_tokens"] += usage.cached_content_token_count
+            self.stats["response_tokens"] += usage.candidates_token_count
+
+    def _draw(self):
+        with self._lock:
+            return self._rng.random(), self._rng.random(), self._rng.random()
+
+    def answer(self, model_name, system_prompt, user_prompt, timeout=None, prefill_tokens=0):
+        """Sleep for the configured latency (plus prefill), then return answer text or raise an injected error"""
+        with self._lock:
+            self.stats["calls"] += 1
+            self.calls_by_model[model_name] = self.calls_by_model.get(model_name, 0) + 1
+        error_draw, malformed_draw, jitter_draw = self._draw()
+
+        delay = (self.model_latency.get(model_name, self.latency) + self.jitter * jitter_draw
+                 + self.prefill_per_token * prefill_tokens)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            self.count("errors")
+            raise DeadlineExceeded(f"{model_name} did not answer within {timeout:.2f}s")
+        if delay:
+            time.sleep(delay)
+
+        if model_name in self.failing_models or error_draw < self.error_rate:
+            self.count("errors")
+            error = INJECTED_ERRORS[int(jitter_draw * len(INJECTED_ERRORS)) % len(INJECTED_ERRORS)]
+            raise error(f"injected failure for {model_name}")
+
+        for needle, scripted in self.script.items():
+            if needle.lower() in user_prompt.lower():
+                if isinstance(scripted, Exception):
+                    self.count("errors")
+                    raise scripted
+                return scripted(system_prompt, user_prompt) if callable(scripted) else scripted
+
+        if malformed_draw < self.malformed_rate:
+            self.count("malformed")
+            return "Sure! The destination is probably somewhere nice."
+        return rule_answer(system_prompt, user_prompt)
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "calls_by_model": dict(self.calls_by_model)}
@@ -0,0 +1,128 @@
+"""
+Flight Offer Ranking
+Pareto-frontier ("best options") ranking over price, total duration and stops,
+with cheapest / fastest / best value picks for merged offer sets
+"""
+import numpy as np
+
+# Weights for the "best value" pick over normalized price, duration and stops
+BEST_VALUE_WEIGHTS = (0.5, 0.35, 0.15)
+
+def stored_metrics(flight):
+    """Ranking fields stored on a parsed offer by amadeus_flights.offer_metrics ({} if missing)"""
+    return flight.get('metrics') or {}
+
+def metrics_arrays(flights):
+    """
+    Build NumPy arrays (price, duration_minutes, stops, departure_minutes) for a list of offers.
+    Missing values rank last.
+    """
+    n = len(flights)
+    price = np.full(n, np.inf)
+    duration = np.full(n, np.inf)
+    stops = np.full(n, np.inf)
+    departure = np.full(n, np.inf)
+    for i, flight in enumerate(flights):
+        m = stored_metrics(flight)
+        if m.get('price') is not None:
+            price[i] = m['price']
+        if m.get('duration_minutes') is not None:
+            duration[i] = m['duration_minutes']
+        if m.get('stops') is not None:
+            stops[i] = m['stops']
+        if m.get('departure_minutes') is not None:
+            departure[i] = m['departure_minutes']
+    return price, duration, stops, departure
+
+def pareto_frontier(price, duration, stops, departure=None):
+    """
+    Indices of offers not dominated on (price, duration, stops), ordered by price
+
+    Offers are sorted once (O(n log n)); then, for each distinct stop count s,
+    a vectorized prefix minimum of duration over offers with <= s stops tells
+    whether a cheaper-or-equal offer is also at least as fast. Stop counts are
+    small integers, so the sweep is O(n * distinct_stops). Exact duplicates keep
+    only their first occurrence; departure time only breaks ties in the ordering.
+    """
+    price = np.asarray(price, dtype=float)
+    duration = np.asarray(duration, dtype=float)
+    stops = np.asarray(stops, dtype=float)
+    n = price.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    sort_keys = (stops, duration, price) if departure is None else (np.asarray(departure, dtype=float), stops, duration, price)
+    order = np.lexsort(sort_keys)
+    p_dur = duration[order]
+    p_stops = stops[order]
+
+    dominated = np.zeros(n, dtype=bool)
+    for level in np.unique(p_stops):
+        candidates = p_stops <= level
+        masked = np.where(candidates, p_dur, np.inf)
+        # Best duration among earlier (cheaper or equal) offers with <= `level` stops
+        best_before = np.concatenate(([np.inf], np.minimum.accumulate(masked)[:-1]))
+        at_level = p_stops == level
+        dominated |= at_level & (best_before <= p_dur)
+
+    return order[~dominated]
+
+def rank_offers(flights, weights=BEST_VALUE_WEIGHTS):
+    """
+    Rank parsed offers. Returns:
+    {
+        "frontier": [offer indices on the Pareto frontier, cheapest first],
+        "cheapest": index|None,
+        "fastest": index|None,
+        "best_value": index|None
+    }
+    """
+    if not flights:
+        return {"frontier": [], "cheapest": None, "fastest": None, "best_value": None}
+
+    price, duration, stops, departure = metrics_arrays(flights)
+    frontier = pareto_frontier(price, duration, stops, departure)
+
+    cheapest = int(np.lexsort((departure, stops, duration, price))[0])
+    fastest = int(np.lexsort((departure, stops, price, duration))[0])
+
+    # Best value: lowest weighted, min-max normalized score among frontier offers
+    f_price = price[frontier]
+    f_duration = duration[frontier]
+    f_stops = stops[frontier]
+
+    def normalize(values):
+        finite = np.isfinite(values)
+        if not finite.any():
+            return np.zeros_like(values)
+        low = values[finite].min()
+        span = values[finite].max() - low
+        scaled = (values - low) / span if span > 0 else np.zeros_like(values)
+        return np.where(finite, scaled, 1.0)
+
+    w_price, w_duration, w_stops = weights
+    score = w_price * normalize(f_price) + w_duration * normalize(f_duration) + w_stops * normalize(f_stops)
+    best_value = int(frontier[int(np.argmin(score))]) if frontier.size else cheapest
+
+    return {
+        "frontier": [int(i) for i in frontier],
+        "cheapest": cheapest,
+        "fastest": fastest,
+        "best_value": best_value
+    }
+
+def attach_ranking(result):
+    """Add a `ranking` block to a search result and `badges` to each of its offers"""
+    flights = result.get('flights') or []
+    ranking = rank_offers(flights)
+    frontier = set(ranking['frontier'])
+    for i, flight in enumerate(flights):
+        badges = []
+        for pick in ('cheapest', 'fastest', 'best_value'):
+            if ranking[pick] == i:
+                badges.append(pick)
+        if i in frontier:
+            badges.append('pareto')
+        flight['badges'] = badges
+    result['ranking'] = ranking
+    return result
@@ -48,6 +48,7 @@ export default function Home() {
         const flightsResult = await searchFlights({
           origin: tripResult.origin_iata,
           destination: tripResult.destination_iata,
+          destinations: tripResult.destination_iatas,
           departure_date: tripResult.departure_date,
           return_date: tripResult.return_date,
           adults: 1,
@@ -225,7 +226,9 @@ export default function Home() {
                     key={index}
                     flight={flight}
                     index={index}
-                    isBestPrice={index === 0}
+                    isBestPrice={flightsData.ranking ? index === flightsData.ranking.cheapest : index === 0}
+                    carriers={flightsData.carriers}
+                    aircraft={flightsData.aircraft}
                   />
                 ))}
               </div>
@@ -3,17 +3,25 @@
 import { useState } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { FiChevronDown, FiChevronUp, FiClock, FiMapPin, FiInfo, FiExternalLink } from 'react-icons/fi';
-import type { Flight, FlightSegment } from '@/lib/api';
+import type { AirlineInfo, Flight, FlightSegment } from '@/lib/api';
 
 interface FlightCardProps {
   flight: Flight;
   index: number;
   isBestPrice?: boolean;
+  carriers?: Record<string, AirlineInfo>;
+  aircraft?: Record<string, string>;
 }
 
-export default function FlightCard({ flight, index, isBestPrice }: FlightCardProps) {
+export default function FlightCard({ flight, index, isBestPrice, carriers = {}, aircraft = {} }: FlightCardProps) {
   const [isExpanded, setIsExpanded] = useState(index === 0); // First flight expanded by default
 
+  // Names come from the lookup tables embedded in the search response
+  const airlineName = carriers[flight.outbound.carrier]?.airline_name
+    || flight.outbound.carrier_name
+    || carriers[flight.validating_airline]?.airline_name
+    || flight.validating_airline;
+
   const formatDuration = (minutes: number | string) => {
     const totalMinutes = typeof minutes === 'string' ? parseInt(minutes, 10) : minutes;
     const hours = Math.floor(totalMinutes / 60);
@@ -81,9 +89,9 @@ export default function FlightCard({ flight, index, isBestPrice }: FlightCardPro
         <div className="text-center">
           <p className="text-xs font-semibold text-premium-mist/60 mb-2">FLIGHT</p>
           <div className="space-y-1">
-            <p className="text-sm font-bold text-gold-400">{segment.carrier}</p>
+            <p className="text-sm font-bold text-gold-400">{carriers[segment.carrier]?.airline_name || segment.carrier}</p>
             <p className="text-sm text-premium-mist">{segment.carrier}{segment.flight_number}</p>
-            <p className="text-xs text-premium-mist/60">{segment.aircraft || 'Aircraft N/A'}</p>
+            <p className="text-xs text-premium-mist/60">{aircraft[segment.aircraft] || segment.aircraft || 'Aircraft N/A'}</p>
           </div>
         </div>
 
@@ -136,7 +144,7 @@ export default function FlightCard({ flight, index, isBestPrice }: FlightCardPro
                   <span className="font-bold">{flight.outbound.arrival.iata}</span>
                 </div>
                 <div className="text-xs mt-1">
-                  {flight.outbound.carrier_name || flight.validating_airline} • {flight.outbound.stops} stop{flight.outbound.stops !== 1 ? 's' : ''}
+                  {airlineName} • {flight.outbound.stops} stop{flight.outbound.stops !== 1 ? 's' : ''}
                 </div>
               </div>
             </div>
@@ -190,7 +198,7 @@ export default function FlightCard({ flight, index, isBestPrice }: FlightCardPro
               <div className="grid grid-cols-4 gap-4">
                 <div>
                   <p className="text-xs font-semibold text-premium-mist/60 mb-1">AIRLINE</p>
-                  <p className="text-sm font-bold text-white">{flight.outbound.carrier_name || flight.validating_airline}</p>
+                  <p className="text-sm font-bold text-white">{airlineName}</p>
                 </div>
                 <div>
                   <p className="text-xs font-semibold text-premium-mist/60 mb-1">CABIN</p>
@@ -35,6 +35,7 @@ export interface TripExtractionResponse {
   origin_iata: string;
   origin_city: string;
   destination_iata: string | null;
+  destination_iatas: string[];
   destination_city: string | null;
   iata_confidence: 'high' | 'medium' | 'low';
   duration_days: number;
@@ -42,7 +43,38 @@ export interface TripExtractionResponse {
   return_date: string;
   model_used: string;
   used_fallback: boolean;
+  answered_by: string;
   error: string | null;
+  llm_trace: LlmTraceEntry[];
+}
+
+export interface LlmTraceEntry {
+  type: 'call' | 'deadline' | 'extraction';
+  prompt: string;
+  model?: string;
+  latency_ms?: number;
+  outcome?: 'success' | 'empty' | 'error';
+  error_class?: string | null;
+  prompt_tokens?: number;
+  response_tokens?: number;
+  tokens_estimated?: boolean;
+  parse_failed?: boolean;
+  used_fallback?: boolean;
+}
+
+export interface TripBatchRequest {
+  origin_iata: string;
+  user_queries: string[];
+  fallback_days?: number;
+}
+
+export interface TripBatchResponse {
+  results: TripExtractionResponse[];
+  queries: number;
+  unique_queries: number;
+  llm_calls: number;
+  answered_by: Record<string, number>;
+  llm_trace: LlmTraceEntry[];
 }
 
 export interface FlightSearchRequest {
@@ -56,6 +88,10 @@ export interface FlightSearchRequest {
   travel_class?: string;
   non_stop?: boolean;
   max_stops?: number;
+  max_layover_minutes?: number;
+  mix_and_match?: boolean;
+  sort_by?: 'price' | 'duration';
+  destinations?: string[];
 }
 
 export interface FlightSegment {
@@ -109,6 +145,23 @@ export interface Flight {
   validating_airline: string;
   outbound: FlightJourney;
   return?: FlightJourney;
+  badges?: Array<'cheapest' | 'fastest' | 'best_value' | 'pareto'>;
+  destination?: string;
+  combination?: {
+    type: 'mix_and_match';
+    separate_tickets: boolean;
+    outbound_offer_id: string;
+    return_offer_id: string;
+    outbound_price: string;
+    return_price: string;
+  };
+}
+
+export interface AirlineInfo {
+  carrier_code: string;
+  airline_name: string;
+  website: string | null;
+  has_direct_booking: boolean;
 }
 
 export interface FlightSearchResponse {
@@ -117,16 +170,29 @@ export interface FlightSearchResponse {
   origin: string;
   destination: string;
   flights: Flight[];
+  carriers: Record<string, AirlineInfo>;
+  aircraft: Record<string, string>;
+  price_currency?: string;
+  price_converted?: boolean;
+  mix_and_match?: boolean;
+  destinations?: string[];
+  destination_errors?: Record<string, string>;
+  ranking?: {
+    frontier: number[];
+    cheapest: number | null;
+    fastest: number | null;
+    best_value: number | null;
+  };
+  fx?: {
+    source_currency: string;
+    target_currency: string;
+    rate: number;
+    as_of: string | null;
+    note: string;
+  };
   error?: string;
 }
 
-export interface AirlineInfo {
-  carrier_code: string;
-  airline_name: string;
-  website: string | null;
-  has_direct_booking: boolean;
-}
-
 // ==================== API FUNCTIONS ====================
 
 /**
@@ -142,6 +208,25 @@ export const getAirports = async (): Promise<Airport[]> => {
   }
 };
 
+/**
+ * Airport autocomplete: matches on IATA code, city, airport name or alias, best first.
+ * Responses are cacheable, so it is safe to call on every keystroke.
+ */
+export const searchAirports = async (query: string, limit = 8): Promise<Airport[]> => {
+  if (!query.trim()) {
+    return [];
+  }
+  try {
+    const response = await api.get<Airport[]>('/airports/search', {
+      params: { q: query.trim(), limit },
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error searching airports:', error);
+    throw new Error('Failed to search airports');
+  }
+};
+
 /**
  * Extract trip details from natural language query
  */
@@ -157,6 +242,21 @@ export const extractTrip = async (
   }
 };
 
+/**
+ * Extract trip details for a list of queries (results in request order)
+ */
+export const extractTrips = async (
+  request: TripBatchRequest
+): Promise<TripBatchResponse> => {
+  try {
+    const response = await api.post<TripBatchResponse>('/extract-trips', request);
+    return response.data;
+  } catch (error) {
+    console.error('Error extracting trips:', error);
+    throw new Error('Failed to extract trip details');
+  }
+};
+
 /**
  * Search for flights
  */
@@ -185,6 +285,21 @@ export const getAirlineInfo = async (carrierCode: string): Promise<AirlineInfo>
   }
 };
 
+/**
+ * Get airline information for several carriers in one request
+ */
+export const getAirlineInfoBatch = async (carrierCodes: string[]): Promise<Record<string, AirlineInfo>> => {
+  try {
+    const response = await api.get<{ airlines: Record<string, AirlineInfo> }>('/airline-info', {
+      params: { codes: carrierCodes.join(',') },
+    });
+    return response.data.airlines;
+  } catch (error) {
+    console.error('Error fetching airline info:', error);
+    throw new Error('Failed to fetch airline information');
+  }
+};
+
 /**
  * Health check
  */
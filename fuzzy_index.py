@@ -0,0 +1,184 @@
+"""
+Fuzzy Destination Index
+Typo-tolerant lookup over the gazetteer aliases ("Dubaai", "zurch", "kuala lumpor"):
+trigram postings pick candidates, a bounded edit distance confirms them
+"""
+import re
+from collections import defaultdict
+
+from core import NUMBER_WORDS, DURATION_UNITS
+from gazetteer import gazetteer, COMMON_WORD_ALIASES, TRAVEL_CUES
+
+# Everyday query words that must never be "corrected" into a destination
+FUZZY_SKIP_WORDS = {
+    "trip", "trips", "travel", "travelling", "traveling", "tour", "visit", "visiting", "going",
+    "plan", "planning", "holiday", "holidays", "vacation", "honeymoon", "family", "friends",
+    "weekend", "flight", "flights", "from", "with", "this", "that", "next", "want", "would",
+    "like", "love", "some", "days", "week", "weeks", "month", "months", "night", "nights",
+    "home", "back", "there", "here", "near", "city", "beach", "beaches", "mountains", "solo",
+    "cheap", "budget", "luxury", "business", "work", "couple", "kids", "around", "about",
+    "during", "summer", "winter", "spring", "autumn", "christmas", "diwali", "year", "book",
+    "booking", "return", "round", "stay", "staying", "anniversary", "birthday", "party",
+    "explore", "exploring", "sightseeing", "food", "shopping", "best", "good", "nice", "long",
+    "short", "quick", "fortnight", "somewhere", "anywhere", "abroad", "international",
+}
+
+# Dictionary words one typo away from a destination ("pairs" -> Paris, "june" -> Pune)
+DICTIONARY_WORDS = {
+    "pair", "pairs", "park", "parks", "pars", "ball", "bail", "child", "chili", "chin", "deli",
+    "dune", "june", "tune", "pure", "lime", "made", "maze", "malt", "logos", "maples", "merlin",
+    "indie", "omani", "woman", "roman", "roam", "soul", "stain", "sprain", "tuba", "gaza",
+    "canes", "canned", "shaka", "salta", "mail", "male", "nice", "mice", "rice",
+}
+
+# A misspelled place must open the query or follow a travel cue ("trip to Dubaai"); a word next to
+# a companion word ("3 days with lisa", "lisa and me") is a person, never a destination
+COMPANION_WORDS = {"with", "and", "plus"}
+COMPANION_PRONOUNS = {"me", "i", "my", "us"}
+
+# Fuzzy-only matches score below the local answer threshold, so the LLM confirms them
+FUZZY_SCORES = {0: 0.85, 1: 0.8}
+FUZZY_TWO_EDIT_SCORE = 0.7
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+def _trigrams(text):
+    padded = f"$${text}$$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def bounded_edit_distance(a, b, max_distance):
+    """
+    Optimal-string-alignment distance (adjacent transpositions count as one edit),
+    or max_distance + 1 as soon as it is certain to exceed max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev_prev is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev_prev[j - 2] + 1)
+            cur[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, cur
+    return prev[-1] if prev[-1] <= max_distance else max_distance + 1
+
+def max_edits(length):
+    """Typos tolerated for a word of this length"""
+    if length < 4:
+        return 0
+    return 1 if length <= 6 else 2
+
+class FuzzyIndex:
+    """Trigram postings over alias strings (multi-word aliases are indexed whole)"""
+    def __init__(self, aliases, skip_words=FUZZY_SKIP_WORDS):
+        self.aliases = [(alias, payload) for alias, payload in aliases.items() if payload["kind"] != "code"]
+        self.skip_words = (set(skip_words) | DICTIONARY_WORDS | COMMON_WORD_ALIASES
+                           | set(NUMBER_WORDS) | set(DURATION_UNITS))
+        self.postings = defaultdict(list)
+        self._gram_counts = []
+        for alias_id, (alias, _) in enumerate(self.aliases):
+            grams = _trigrams(alias)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(alias_id)
+        self.max_words = max(len(alias.split()) for alias, _ in self.aliases)
+
+    def _phrases(self, text):
+        """
+        Candidate spans: single words and runs of up to `max_words` words that open the
+        query or follow a travel cue, and are not next to a companion word
+        """
+        words = _WORD_RE.findall(text.lower())
+        for size in range(1, self.max_words + 1):
+            for i in range(len(words) - size + 1):
+                span = words[i:i + size]
+                if span[0] in self.skip_words or span[-1] in self.skip_words:
+                    continue
+                if i > 0 and words[i - 1] not in TRAVEL_CUES:
+                    continue
+                after = words[i + size:i + size + 2]
+                if len(after) == 2 and after[0] in COMPANION_WORDS and after[1] in COMPANION_PRONOUNS:
+                    continue
+                yield " ".join(span)
+
+    def lookup(self, phrase):
+        """Aliases within the edit budget of `phrase`: [(distance, alias, payload)]"""
+        budget = max_edits(len(phrase.replace(" ", "")))
+        if budget == 0:
+            return []
+        grams = _trigrams(phrase)
+        shared = defaultdict(int)
+        for gram in grams:
+            for alias_id in self.postings.get(gram, ()):
+                shared[alias_id] += 1
+
+        found = []
+        for alias_id, count in shared.items():
+            alias, payload = self.aliases[alias_id]
+            # q-gram lemma: each edit (or adjacent transposition) destroys at most 4 trigrams
+            if count < max(len(grams), self._gram_counts[alias_id]) - 4 * budget:
+                continue
+            distance = bounded_edit_distance(phrase, alias, budget)
+            if distance <= budget and distance <= max_edits(len(alias.replace(" ", ""))):
+                found.append((distance, alias, payload))
+        return found
+
+    def search(self, text, limit=5):
+        """
+        Ranked destination candidates for the misspelled places in `text`:
+        [{"alias", "matched", "iata", "city", "country", "kind", "distance", "score"}]
+        (one entry per airport, best first)
+        """
+        best = {}
+        for phrase in self._phrases(text):
+            for distance, alias, payload in self.lookup(phrase):
+                score = round(1 - distance / max(len(alias), 1), 3)
+                key = payload["iata"]
+                if key not in best or score > best[key]["score"]:
+                    best[key] = {
+                        "alias": alias, "matched": phrase, "iata": payload["iata"],
+                        "city": payload["city"], "country": payload["country"],
+                        "kind": payload["kind"], "distance": distance, "score": score
+                    }
+        return sorted(best.values(), key=lambda c: (c["distance"], -c["score"]))[:limit]
+
+    def resolve(self, text, origin=None):
+        """
+        Best fuzzy destination, in the same shape as Gazetteer.resolve(). A single
+        candidate scores 0.85 or less (FUZZY_SCORES), a tie 0.4: never enough to skip the LLM
+        """
+        origin_code = gazetteer.origin_code(origin)
+        candidates = [c for c in self.search(text) if c["iata"] != origin_code]
+        if not candidates:
+            return {"destination_city": None, "iata_code": None, "iata_codes": [], "country": None,
+                    "kind": None, "confidence": "low", "score": 0.0, "ambiguous": False, "matches": []}
+
+        best = candidates[0]
+        ambiguous = len(candidates) > 1 and candidates[1]["distance"] == best["distance"]
+        if ambiguous:
+            score = 0.4
+        else:
+            score = FUZZY_SCORES.get(best["distance"], FUZZY_TWO_EDIT_SCORE)
+        codes = [c for c in gazetteer.airports_for(best) if c != origin_code] or [best["iata"]]
+        return {
+            "destination_city": best["city"],
+            "iata_code": codes[0],
+            "iata_codes": codes,
+            "country": best["country"],
+            "kind": "fuzzy",
+            "confidence": "low" if ambiguous else "medium",
+            "score": score,
+            "ambiguous": ambiguous,
+            "matches": candidates
+        }
+
+fuzzy_index = FuzzyIndex(gazetteer.aliases)
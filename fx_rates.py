@@ -0,0 +1,132 @@
+"""
+Local Currency Conversion
+Converts flight prices using a cached FX rates table loaded from a local JSON file,
+so switching the display currency does not trigger a new Amadeus search
+"""
+import os
+import copy
+import json
+import threading
+import time
+
+FX_RATES_FILE = os.getenv("FX_RATES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fx_rates.json"))
+FX_REFRESH_SECONDS = int(os.getenv("FX_REFRESH_SECONDS", "3600"))
+
+class FxRatesTable:
+    """
+    Rates table loaded from a JSON file of the form:
+        {"base": "EUR", "as_of": "YYYY-MM-DD", "rates": {"EUR": 1.0, "USD": 1.08, ...}}
+    The file is re-checked at most every `refresh_seconds` and reloaded when it changed.
+    """
+    def __init__(self, path=FX_RATES_FILE, refresh_seconds=FX_REFRESH_SECONDS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.base = None
+        self.as_of = None
+        self.rates = {}
+        self._mtime = None
+        self._last_check = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def _maybe_reload(self):
+        """
+        Reload the rates file if the refresh interval passed and the file changed.
+        A failed load is retried after the same interval, not on every lookup.
+        """
+        now = time.monotonic()
+        if self._last_check is not None and now - self._last_check < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._last_check is not None and now - self._last_check < self.refresh_seconds:
+                return
+            self._last_check = now
+            try:
+                mtime = os.path.getmtime(self.path)
+                if mtime == self._mtime:
+                    return
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.rates = {code.upper(): float(rate) for code, rate in data.get("rates", {}).items() if rate}
+                self.base = data.get("base")
+                self.as_of = data.get("as_of")
+                self._mtime = mtime
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the last good table
+                self.last_error = str(e)
+                print(f"WARNING: Could not load FX rates from {self.path}: {e}")
+
+    def get_rate(self, from_currency, to_currency):
+        """Rate to multiply an amount in `from_currency` by, or None if unknown"""
+        if not from_currency or not to_currency:
+            return None
+        from_currency = from_currency.upper()
+        to_currency = to_currency.upper()
+        if from_currency == to_currency:
+            return 1.0
+        self._maybe_reload()
+        from_rate = self.rates.get(from_currency)
+        to_rate = self.rates.get(to_currency)
+        if not from_rate or not to_rate:
+            return None
+        return to_rate / from_rate
+
+fx_table = FxRatesTable()
+
+def _convert_amount(amount, rate):
+    """Convert an Amadeus amount string (e.g. "1234.50") keeping the string format"""
+    if amount in (None, ""):
+        return amount
+    try:
+        return f"{float(amount) * rate:.2f}"
+    except (TypeError, ValueError):
+        return amount
+
+def _convert_price(price, rate, to_currency):
+    """Convert a parsed offer price block in place"""
+    source_currency = price.get('currency')
+    price['source_currency'] = source_currency
+    price['source_total'] = price.get('total')
+    for key in ('total', 'base', 'grand_total'):
+        price[key] = _convert_amount(price.get(key), rate)
+    for fee in price.get('fees') or []:
+        if isinstance(fee, dict) and 'amount' in fee:
+            fee['amount'] = _convert_amount(fee['amount'], rate)
+    price['currency'] = to_currency
+    price['converted'] = True
+
+def convert_search_result(result, to_currency, table=fx_table):
+    """
+    Return a copy of a parsed search result with prices converted to `to_currency`.
+    Returns None when no rate is available for the currency pair.
+    """
+    flights = result.get('flights') or []
+    source_currency = result.get('price_currency') or (flights[0]['price'].get('currency') if flights else None)
+    to_currency = to_currency.upper()
+
+    converted = copy.deepcopy(result)
+    if not source_currency or source_currency.upper() == to_currency:
+        converted['price_converted'] = False
+        return converted
+
+    rate = table.get_rate(source_currency, to_currency)
+    if rate is None:
+        return None
+
+    for flight in converted.get('flights', []):
+        if flight and flight.get('price'):
+            _convert_price(flight['price'], rate, to_currency)
+        if flight and (flight.get('metrics') or {}).get('price') is not None:
+            flight['metrics']['price'] = round(flight['metrics']['price'] * rate, 2)
+
+    converted['price_currency'] = to_currency
+    converted['price_converted'] = True
+    converted['fx'] = {
+        'source_currency': source_currency,
+        'target_currency': to_currency,
+        'rate': rate,
+        'as_of': table.as_of,
+        'note': 'Prices converted locally from cached exchange rates; final fare is charged in the source currency.'
+    }
+    return converted
@@ -0,0 +1,717 @@
+"""
+Destination Gazetteer
+Cities, countries, regions, airports, local names and common misspellings compiled
+into an Aho-Corasick automaton, so every alias in a query is found in one linear pass
+without calling the LLM. Places covering several airports (metro areas, countries,
+regions) resolve to candidate airports ranked by passenger traffic.
+"""
+import re
+from collections import deque
+
+# IATA code -> (city, country, aliases). The city name itself is always an alias.
+DESTINATIONS = {
+    # India
+    "DEL": ("New Delhi", "India", ["delhi", "dilli", "ncr"]),
+    "BOM": ("Mumbai", "India", ["bombay", "mumbay"]),
+    "BLR": ("Bangalore", "India", ["bengaluru", "banglore"]),
+    "HYD": ("Hyderabad", "India", ["hydrabad"]),
+    "MAA": ("Chennai", "India", ["madras"]),
+    "CCU": ("Kolkata", "India", ["calcutta"]),
+    "COK": ("Kochi", "India", ["cochin"]),
+    "AMD": ("Ahmedabad", "India", ["amdavad"]),
+    "PNQ": ("Pune", "India", ["poona"]),
+    "GOI": ("Goa", "India", []),
+    "TRV": ("Thiruvananthapuram", "India", ["trivandrum"]),
+    "IXC": ("Chandigarh", "India", []),
+    "JAI": ("Jaipur", "India", []),
+    "LKO": ("Lucknow", "India", []),
+    "VNS": ("Varanasi", "India", ["banaras", "benares"]),
+    "ATQ": ("Amritsar", "India", []),
+    "SXR": ("Srinagar", "India", ["kashmir"]),
+    "IXL": ("Leh", "India", ["ladakh"]),
+    "IXZ": ("Port Blair", "India", ["andaman", "andamans", "andaman islands"]),
+    "GAU": ("Guwahati", "India", []),
+    "IXB": ("Bagdogra", "India", ["darjeeling", "siliguri"]),
+    "UDR": ("Udaipur", "India", []),
+    "JDH": ("Jodhpur", "India", []),
+    "IXE": ("Mangalore", "India", ["mangaluru"]),
+    "CCJ": ("Kozhikode", "India", ["calicut"]),
+    "IXM": ("Madurai", "India", []),
+    "CJB": ("Coimbatore", "India", []),
+    "VTZ": ("Visakhapatnam", "India", ["vizag"]),
+    "BBI": ("Bhubaneswar", "India", []),
+    "PAT": ("Patna", "India", []),
+    "NAG": ("Nagpur", "India", []),
+    "IDR": ("Indore", "India", []),
+    "BHO": ("Bhopal", "India", []),
+    "DED": ("Dehradun", "India", ["rishikesh", "mussoorie"]),
+    "IXJ": ("Jammu", "India", []),
+    "KUU": ("Kullu", "India", ["manali"]),
+    # Middle East
+    "DXB": ("Dubai", "United Arab Emirates", ["dubay"]),
+    "AUH": ("Abu Dhabi", "United Arab Emirates", ["abudhabi"]),
+    "SHJ": ("Sharjah", "United Arab Emirates", []),
+    "DOH": ("Doha", "Qatar", []),
+    "MCT": ("Muscat", "Oman", []),
+    "BAH": ("Bahrain", "Bahrain", ["manama"]),
+    "RUH": ("Riyadh", "Saudi Arabia", []),
+    "JED": ("Jeddah", "Saudi Arabia", ["jedda", "mecca", "makkah"]),
+    "MED": ("Medina", "Saudi Arabia", ["madinah"]),
+    "KWI": ("Kuwait City", "Kuwait", []),
+    "AMM": ("Amman", "Jordan", ["petra"]),
+    "TLV": ("Tel Aviv", "Israel", ["jerusalem"]),
+    "BEY": ("Beirut", "Lebanon", []),
+    "IST": ("Istanbul", "Turkey", ["instanbul"]),
+    "SAW": ("Istanbul", "Turkey", []),
+    "AYT": ("Antalya", "Turkey", []),
+    # Europe
+    "LHR": ("London", "United Kingdom", ["londan"]),
+    "STN": ("London", "United Kingdom", []),
+    "LTN": ("London", "United Kingdom", []),
+    "LGW": ("London", "United Kingdom", []),
+    "MAN": ("Manchester", "United Kingdom", []),
+    "EDI": ("Edinburgh", "United Kingdom", ["edinburg"]),
+    "CDG": ("Paris", "France", []),
+    "ORY": ("Paris", "France", []),
+    "NCE": ("Nice", "France", ["nice france", "french riviera", "cote d azur", "cannes", "monaco"]),
+    "FRA": ("Frankfurt", "Germany", []),
+    "MUC": ("Munich", "Germany", ["munchen", "muenchen", "münchen"]),
+    "BER": ("Berlin", "Germany", []),
+    "HAM": ("Hamburg", "Germany", []),
+    "AMS": ("Amsterdam", "Netherlands", []),
+    "BRU": ("Brussels", "Belgium", ["bruges"]),
+    "ZRH": ("Zurich", "Switzerland", ["zürich", "zuerich", "lucerne", "interlaken"]),
+    "GVA": ("Geneva", "Switzerland", ["geneve", "genève"]),
+    "VIE": ("Vienna", "Austria", ["wien"]),
+    "SZG": ("Salzburg", "Austria", []),
+    "PRG": ("Prague", "Czech Republic", ["praha"]),
+    "BUD": ("Budapest", "Hungary", []),
+    "WAW": ("Warsaw", "Poland", []),
+    "KRK": ("Krakow", "Poland", ["cracow", "kraków"]),
+    "FCO": ("Rome", "Italy", ["roma", "vatican"]),
+    "MXP": ("Milan", "Italy", ["milano", "lake como"]),
+    "LIN": ("Milan", "Italy", []),
+    "VCE": ("Venice", "Italy", ["venezia"]),
+    "FLR": ("Florence", "Italy", ["firenze", "tuscany"]),
+    "NAP": ("Naples", "Italy", ["napoli", "amalfi", "amalfi coast", "capri"]),
+    "BCN": ("Barcelona", "Spain", ["barca"]),
+    "MAD": ("Madrid", "Spain", []),
+    "AGP": ("Malaga", "Spain", ["málaga"]),
+    "PMI": ("Palma de Mallorca", "Spain", ["mallorca", "majorca"]),
+    "IBZ": ("Ibiza", "Spain", []),
+    "LIS": ("Lisbon", "Portugal", ["lisboa"]),
+    "OPO": ("Porto", "Portugal", ["oporto"]),
+    "ATH": ("Athens", "Greece", ["athina"]),
+    "JTR": ("Santorini", "Greece", ["thira"]),
+    "JMK": ("Mykonos", "Greece", []),
+    "CPH": ("Copenhagen", "Denmark", []),
+    "ARN": ("Stockholm", "Sweden", []),
+    "OSL": ("Oslo", "Norway", []),
+    "HEL": ("Helsinki", "Finland", []),
+    "RVN": ("Rovaniemi", "Finland", ["lapland"]),
+    "KEF": ("Reykjavik", "Iceland", []),
+    "DUB": ("Dublin", "Ireland", []),
+    "DBV": ("Dubrovnik", "Croatia", []),
+    "OTP": ("Bucharest", "Romania", []),
+    "SOF": ("Sofia", "Bulgaria", []),
+    "BEG": ("Belgrade", "Serbia", []),
+    "SVO": ("Moscow", "Russia", []),
+    "DME": ("Moscow", "Russia", []),
+    "LED": ("Saint Petersburg", "Russia", ["st petersburg"]),
+    "TBS": ("Tbilisi", "Georgia", []),
+    "GYD": ("Baku", "Azerbaijan", []),
+    "EVN": ("Yerevan", "Armenia", []),
+    "MLA": ("Valletta", "Malta", []),
+    "LCA": ("Larnaca", "Cyprus", []),
+    # Asia
+    "SIN": ("Singapore", "Singapore", ["singapur", "singapore city"]),
+    "KUL": ("Kuala Lumpur", "Malaysia", ["kl"]),
+    "PEN": ("Penang", "Malaysia", []),
+    "BKI": ("Kota Kinabalu", "Malaysia", []),
+    "LGK": ("Langkawi", "Malaysia", []),
+    "BKK": ("Bangkok", "Thailand", ["bankok", "pattaya"]),
+    "DMK": ("Bangkok", "Thailand", []),
+    "HKT": ("Phuket", "Thailand", []),
+    "CNX": ("Chiang Mai", "Thailand", []),
+    "USM": ("Koh Samui", "Thailand", ["samui"]),
+    "KBV": ("Krabi", "Thailand", []),
+    "DPS": ("Bali", "Indonesia", ["denpasar", "ubud"]),
+    "CGK": ("Jakarta", "Indonesia", []),
+    "HAN": ("Hanoi", "Vietnam", ["ha long bay", "halong bay"]),
+    "SGN": ("Ho Chi Minh City", "Vietnam", ["saigon", "ho chi minh"]),
+    "DAD": ("Da Nang", "Vietnam", ["danang", "hoi an"]),
+    "MNL": ("Manila", "Philippines", []),
+    "CEB": ("Cebu", "Philippines", []),
+    "HKG": ("Hong Kong", "Hong Kong", ["hongkong"]),
+    "MFM": ("Macau", "Macau", ["macao"]),
+    "TPE": ("Taipei", "Taiwan", []),
+    "NRT": ("Tokyo", "Japan", []),
+    "HND": ("Tokyo", "Japan", []),
+    "KIX": ("Osaka", "Japan", ["kyoto", "kansai"]),
+    "CTS": ("Sapporo", "Japan", ["hokkaido"]),
+    "ICN": ("Seoul", "South Korea", []),
+    "GMP": ("Seoul", "South Korea", []),
+    "PUS": ("Busan", "South Korea", ["pusan"]),
+    "CJU": ("Jeju", "South Korea", ["jeju island"]),
+    "PEK": ("Beijing", "China", ["peking"]),
+    "PKX": ("Beijing", "China", []),
+    "PVG": ("Shanghai", "China", []),
+    "SHA": ("Shanghai", "China", []),
+    "CAN": ("Guangzhou", "China", ["canton"]),
+    "SZX": ("Shenzhen", "China", []),
+    "CTU": ("Chengdu", "China", []),
+    "KTM": ("Kathmandu", "Nepal", ["pokhara"]),
+    "PBH": ("Paro", "Bhutan", ["thimphu"]),
+    "CMB": ("Colombo", "Sri Lanka", []),
+    "MLE": ("Male", "Maldives", ["male maldives"]),
+    "DAC": ("Dhaka", "Bangladesh", []),
+    "ISB": ("Islamabad", "Pakistan", []),
+    "KHI": ("Karachi", "Pakistan", []),
+    "LHE": ("Lahore", "Pakistan", []),
+    "TAS": ("Tashkent", "Uzbekistan", ["samarkand"]),
+    "ALA": ("Almaty", "Kazakhstan", []),
+    "REP": ("Siem Reap", "Cambodia", ["angkor wat", "angkor"]),
+    "PNH": ("Phnom Penh", "Cambodia", []),
+    "RGN": ("Yangon", "Myanmar", ["rangoon"]),
+    "VTE": ("Vientiane", "Laos", []),
+    # Americas
+    "JFK": ("New York", "United States", ["new york city", "nyc", "manhattan", "newyork"]),
+    "EWR": ("New York", "United States", ["newark"]),
+    "LGA": ("New York", "United States", []),
+    "LAX": ("Los Angeles", "United States", ["hollywood"]),
+    "SFO": ("San Francisco", "United States", ["frisco"]),
+    "ORD": ("Chicago", "United States", []),
+    "MIA": ("Miami", "United States", []),
+    "MCO": ("Orlando", "United States", ["disney world"]),
+    "LAS": ("Las Vegas", "United States", ["vegas"]),
+    "SEA": ("Seattle", "United States", []),
+    "BOS": ("Boston", "United States", []),
+    "IAD": ("Washington", "United States", ["washington dc", "washington d c"]),
+    "ATL": ("Atlanta", "United States", []),
+    "DFW": ("Dallas", "United States", []),
+    "IAH": ("Houston", "United States", []),
+    "DEN": ("Denver", "United States", []),
+    "HNL": ("Honolulu", "United States", ["hawaii", "oahu"]),
+    "YYZ": ("Toronto", "Canada", ["niagara falls", "niagara"]),
+    "YVR": ("Vancouver", "Canada", []),
+    "YUL": ("Montreal", "Canada", []),
+    "YYC": ("Calgary", "Canada", ["banff"]),
+    "MEX": ("Mexico City", "Mexico", []),
+    "CUN": ("Cancun", "Mexico", ["cancún", "tulum"]),
+    "GRU": ("Sao Paulo", "Brazil", ["são paulo"]),
+    "GIG": ("Rio de Janeiro", "Brazil", ["rio"]),
+    "EZE": ("Buenos Aires", "Argentina", []),
+    "SCL": ("Santiago", "Chile", []),
+    "LIM": ("Lima", "Peru", []),
+    "CUZ": ("Cusco", "Peru", ["cuzco", "machu picchu"]),
+    "BOG": ("Bogota", "Colombia", ["bogotá"]),
+    "HAV": ("Havana", "Cuba", []),
+    "PTY": ("Panama City", "Panama", []),
+    "SJO": ("San Jose", "Costa Rica", []),
+    # Oceania
+    "SYD": ("Sydney", "Australia", ["sidney"]),
+    "MEL": ("Melbourne", "Australia", []),
+    "BNE": ("Brisbane", "Australia", []),
+    "PER": ("Perth", "Australia", []),
+    "OOL": ("Gold Coast", "Australia", []),
+    "CNS": ("Cairns", "Australia", ["great barrier reef"]),
+    "ADL": ("Adelaide", "Australia", []),
+    "AKL": ("Auckland", "New Zealand", []),
+    "ZQN": ("Queenstown", "New Zealand", []),
+    "CHC": ("Christchurch", "New Zealand", []),
+    "WLG": ("Wellington", "New Zealand", []),
+    "NAN": ("Nadi", "Fiji", []),
+    "PPT": ("Papeete", "French Polynesia", ["tahiti", "bora bora"]),
+    # Africa
+    "JNB": ("Johannesburg", "South Africa", ["joburg", "jo burg"]),
+    "CPT": ("Cape Town", "South Africa", ["capetown"]),
+    "CAI": ("Cairo", "Egypt", ["giza"]),
+    "HRG": ("Hurghada", "Egypt", []),
+    "SSH": ("Sharm El Sheikh", "Egypt", ["sharm"]),
+    "NBO": ("Nairobi", "Kenya", ["masai mara", "maasai mara"]),
+    "ZNZ": ("Zanzibar", "Tanzania", []),
+    "DAR": ("Dar es Salaam", "Tanzania", []),
+    "JRO": ("Kilimanjaro", "Tanzania", ["serengeti", "arusha"]),
+    "CMN": ("Casablanca", "Morocco", []),
+    "RAK": ("Marrakech", "Morocco", ["marrakesh"]),
+    "ADD": ("Addis Ababa", "Ethiopia", []),
+    "LOS": ("Lagos", "Nigeria", []),
+    "ACC": ("Accra", "Ghana", []),
+    "MRU": ("Port Louis", "Mauritius", []),
+    "SEZ": ("Mahe", "Seychelles", []),
+    "TUN": ("Tunis", "Tunisia", []),
+}
+
+# Annual passengers (millions, approximate) used to rank airports within a metro area,
+# country or region; airports missing here count as DEFAULT_AIRPORT_TRAFFIC
+AIRPORT_TRAFFIC = {
+    # India
+    "DEL": 73, "BOM": 52, "BLR": 37, "HYD": 25, "MAA": 20, "CCU": 19, "AMD": 12, "COK": 11,
+    "PNQ": 9, "GOI": 8, "JAI": 6, "LKO": 6, "GAU": 6, "TRV": 5, "BBI": 5, "SXR": 4,
+    "IXC": 3, "VNS": 3, "ATQ": 3, "IXB": 3, "CCJ": 3, "CJB": 3, "VTZ": 3, "PAT": 3,
+    "NAG": 3, "IDR": 3, "IXZ": 2, "UDR": 2, "IXE": 2, "IXM": 2, "DED": 2, "IXJ": 2,
+    # Middle East
+    "DXB": 87, "DOH": 46, "JED": 43, "RUH": 35, "AUH": 23, "TLV": 21, "SHJ": 16, "KWI": 15,
+    "MCT": 13, "AMM": 9, "MED": 9, "BAH": 8, "BEY": 7, "IST": 76, "SAW": 41, "AYT": 35,
+    # Europe
+    "LHR": 79, "LGW": 41, "STN": 28, "LTN": 16, "MAN": 28, "EDI": 14,
+    "CDG": 67, "ORY": 32, "NCE": 14, "FRA": 60, "MUC": 41, "BER": 23, "HAM": 13,
+    "AMS": 62, "BRU": 22, "ZRH": 29, "GVA": 17, "VIE": 29, "SZG": 2, "PRG": 14, "BUD": 15,
+    "WAW": 18, "KRK": 9, "FCO": 40, "MXP": 26, "LIN": 10, "VCE": 10, "NAP": 12, "FLR": 3,
+    "MAD": 60, "BCN": 50, "PMI": 31, "AGP": 22, "IBZ": 9, "LIS": 33, "OPO": 15,
+    "ATH": 28, "JTR": 3, "JMK": 2, "CPH": 26, "ARN": 23, "OSL": 25, "HEL": 15, "KEF": 8,
+    "DUB": 32, "DBV": 3, "OTP": 16, "SOF": 7, "BEG": 8, "SVO": 40, "DME": 20, "LED": 21,
+    "TBS": 4, "GYD": 5, "EVN": 4, "MLA": 8, "LCA": 9,
+    # Asia
+    "SIN": 59, "KUL": 48, "PEN": 8, "BKI": 8, "LGK": 3, "BKK": 52, "DMK": 30, "HKT": 15,
+    "CNX": 9, "KBV": 4, "USM": 2, "CGK": 48, "DPS": 23, "SGN": 40, "HAN": 28, "DAD": 12,
+    "MNL": 45, "CEB": 11, "HKG": 40, "MFM": 7, "TPE": 35, "HND": 79, "NRT": 33, "KIX": 25,
+    "CTS": 23, "ICN": 56, "GMP": 23, "CJU": 29, "PUS": 16, "PEK": 53, "PKX": 40, "PVG": 55,
+    "SHA": 42, "CAN": 63, "SZX": 53, "CTU": 45, "KTM": 7, "CMB": 8, "MLE": 5, "DAC": 11,
+    "KHI": 7, "ISB": 5, "LHE": 5, "TAS": 6, "ALA": 8, "PNH": 5, "RGN": 5, "VTE": 2,
+    # Americas
+    "ATL": 104, "DFW": 82, "DEN": 78, "LAX": 75, "ORD": 74, "JFK": 62, "EWR": 49, "LGA": 33,
+    "LAS": 57, "MCO": 57, "MIA": 52, "SEA": 50, "SFO": 50, "IAH": 46, "BOS": 40, "IAD": 25,
+    "HNL": 21, "YYZ": 45, "YVR": 26, "YUL": 21, "YYC": 18, "MEX": 48, "CUN": 32, "GRU": 41,
+    "GIG": 12, "BOG": 39, "SCL": 25, "LIM": 24, "CUZ": 3, "EZE": 11, "PTY": 18, "SJO": 6,
+    "HAV": 3,
+    # Oceania
+    "SYD": 40, "MEL": 35, "BNE": 23, "PER": 15, "ADL": 8, "OOL": 6, "CNS": 5, "AKL": 20,
+    "CHC": 6, "WLG": 5, "ZQN": 2, "NAN": 2, "PPT": 2,
+    # Africa
+    "CAI": 26, "JNB": 20, "ADD": 12, "CPT": 11, "CMN": 10, "HRG": 9, "NBO": 9, "RAK": 9,
+    "SSH": 7, "LOS": 7, "TUN": 5, "DAR": 4, "MRU": 4, "ACC": 3, "ZNZ": 2,
+}
+DEFAULT_AIRPORT_TRAFFIC = 1.0
+
+# Airport names: they stand for that one airport, not the whole metro area
+AIRPORT_NAMES = {
+    "LHR": ["heathrow"], "LGW": ["gatwick"], "STN": ["stansted"], "LTN": ["luton"],
+    "CDG": ["charles de gaulle", "roissy"], "ORY": ["orly"], "AMS": ["schiphol"],
+    "FCO": ["fiumicino"], "MXP": ["malpensa"], "LIN": ["linate"], "SVO": ["sheremetyevo"],
+    "DME": ["domodedovo"], "SAW": ["sabiha gokcen", "sabiha gökçen"], "SIN": ["changi"],
+    "BKK": ["suvarnabhumi"], "DMK": ["don mueang", "don muang"], "NRT": ["narita"],
+    "HND": ["haneda"], "ICN": ["incheon"], "GMP": ["gimpo"], "PVG": ["pudong"],
+    "SHA": ["hongqiao"], "PKX": ["daxing"], "LGA": ["laguardia", "la guardia"],
+    "GOI": ["dabolim"],
+}
+
+# Regions -> (member countries, other names); the region name itself is always an alias
+REGIONS = {
+    "Europe": ([
+        "United Kingdom", "France", "Germany", "Netherlands", "Belgium", "Switzerland", "Austria",
+        "Czech Republic", "Hungary", "Poland", "Italy", "Spain", "Portugal", "Greece", "Denmark",
+        "Sweden", "Norway", "Finland", "Iceland", "Ireland", "Croatia", "Romania", "Bulgaria",
+        "Serbia", "Malta", "Cyprus", "Turkey",
+    ], ["european"]),
+    "Scandinavia": (["Denmark", "Sweden", "Norway", "Finland", "Iceland"],
+                    ["scandinavian", "nordics", "nordic countries"]),
+    "Eastern Europe": (["Poland", "Czech Republic", "Hungary", "Romania", "Bulgaria", "Serbia", "Croatia"],
+                       ["east europe"]),
+    "Balkans": (["Croatia", "Serbia", "Bulgaria", "Romania", "Greece"], []),
+    "Mediterranean": (["Spain", "Italy", "Greece", "Malta", "Cyprus", "Croatia", "France", "Turkey"], []),
+    "Caucasus": (["Georgia", "Azerbaijan", "Armenia"], []),
+    "Middle East": (["United Arab Emirates", "Qatar", "Oman", "Bahrain", "Kuwait", "Saudi Arabia",
+                     "Jordan", "Israel", "Lebanon"], ["mideast"]),
+    "Gulf": (["United Arab Emirates", "Qatar", "Oman", "Bahrain", "Kuwait", "Saudi Arabia"],
+             ["gulf countries", "persian gulf", "gcc"]),
+    "Southeast Asia": (["Singapore", "Malaysia", "Thailand", "Indonesia", "Vietnam", "Philippines",
+                        "Cambodia", "Myanmar", "Laos"],
+                       ["south east asia", "south-east asia", "se asia", "asean"]),
+    "East Asia": (["Japan", "South Korea", "China", "Hong Kong", "Macau", "Taiwan"], ["far east"]),
+    "South Asia": (["India", "Nepal", "Bhutan", "Sri Lanka", "Maldives", "Bangladesh", "Pakistan"],
+                   ["indian subcontinent"]),
+    "Central Asia": (["Uzbekistan", "Kazakhstan"], []),
+    "North America": (["United States", "Canada", "Mexico"], []),
+    "South America": (["Brazil", "Argentina", "Chile", "Peru", "Colombia"], []),
+    "Latin America": (["Mexico", "Brazil", "Argentina", "Chile", "Peru", "Colombia", "Cuba",
+                       "Panama", "Costa Rica"], []),
+    "Central America": (["Panama", "Costa Rica"], []),
+    "Oceania": (["Australia", "New Zealand", "Fiji", "French Polynesia"], ["australasia", "south pacific"]),
+    "Africa": (["South Africa", "Egypt", "Kenya", "Tanzania", "Morocco", "Ethiopia", "Nigeria",
+                "Ghana", "Mauritius", "Seychelles", "Tunisia"], []),
+    "East Africa": (["Kenya", "Tanzania", "Ethiopia"], []),
+    "North Africa": (["Egypt", "Morocco", "Tunisia"], []),
+}
+
+# Candidate airports returned for a country / region match
+COUNTRY_MAX_AIRPORTS = 6
+REGION_MAX_AIRPORTS = 8
+
+# Other names for countries (the country name itself is always an alias)
+COUNTRY_ALIASES = {
+    "United Arab Emirates": ["uae"],
+    "United Kingdom": ["uk", "england", "britain", "great britain", "scotland"],
+    "United States": ["usa", "america", "united states of america"],
+    "Switzerland": ["swiss", "switzerlnd", "swizerland"],
+    "Netherlands": ["holland", "the netherlands"],
+    "Czech Republic": ["czechia"],
+    "Turkey": ["turkiye", "türkiye"],
+    "Thailand": ["thai"],
+    "South Korea": ["korea"],
+    "Myanmar": ["burma"],
+    "Sri Lanka": ["srilanka", "ceylon"],
+    "Maldives": ["maldive"],
+    "Philippines": ["phillipines", "philipines"],
+    "Australia": ["aussie", "oz"],
+    "New Zealand": ["nz"],
+    "Saudi Arabia": ["saudi", "ksa"],
+}
+
+# Upper-case words that look like airport codes but are ordinary words or abbreviations
+CODE_STOPWORDS = {
+    "THE", "FOR", "AND", "YOU", "ARE", "NOT", "BUT", "ALL", "ANY", "CAN", "HAS", "HAD", "HER",
+    "HIS", "HIM", "HOW", "ITS", "OUR", "OUT", "WHO", "WHY", "NEW", "OLD", "DAY", "WAY", "GET",
+    "BIG", "TOP", "SEA", "MAN", "MAD", "DEN", "PER", "ADD", "LOS", "SUN", "FUN", "AIR",
+    "MON", "TUE", "WED", "THU", "FRI", "SAT", "JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL",
+    "AUG", "SEP", "OCT", "NOV", "DEC", "USA", "UAE", "TWO", "SIX", "TEN", "ONE", "VIA", "BUS",
+    "CAR", "BAR", "SPA", "PAT", "MED", "RIO", "REP", "HAM", "SAW", "SHA",
+}
+
+# City names that are also everyday words; only their longer aliases are matched
+COMMON_WORD_ALIASES = {"nice", "male"}
+
+# City and country names that are also first names ("3 days with Florence"); they only
+# count as a confident destination right after a preposition or travel verb
+PERSON_NAME_ALIASES = {
+    "florence", "paris", "sydney", "adelaide", "sofia", "georgia", "jordan", "india", "orlando", "dallas",
+}
+TRAVEL_CUES = {
+    "to", "in", "at", "into", "around", "across", "through", "via", "visit", "visiting",
+    "see", "explore", "exploring", "fly", "flying", "go", "going", "head", "heading", "travel",
+    "traveling", "travelling", "tour", "touring", "trip", "flight", "flights", "holiday", "vacation",
+}
+
+# Score of a lone person-name alias without a travel cue: below the local answer threshold
+PERSON_NAME_SCORE = 0.6
+
+# A place right after one of these words is where the trip starts ("flying from Dubai"), not the destination
+ORIGIN_CUES = {"from", "leaving", "departing"}
+# A place right after one of these words is ruled out ("not Dubai", "anywhere but Dubai", "not to Dubai");
+# a query that rules out a place is never answered locally
+NEGATION_CUES = {"not", "no", "but", "except", "excluding", "avoid", "avoiding", "without", "besides"}
+NEGATED_SCORE = 0.3
+
+# Country names that also name another place ("Georgia" the US state): never answered locally
+AMBIGUOUS_AREA_ALIASES = {"georgia"}
+# A country or region scores AREA_SCORE. Any match scores UNCERTAIN_PLACE_SCORE when something
+# else in the query may be a place ("Paris, Texas", "London Ontario"), which is never answered locally
+AREA_SCORE = 0.9
+UNCERTAIN_PLACE_SCORE = 0.6
+# Capitalized words that do not name a place
+CAPITALIZED_NON_PLACES = {
+    "i", "january", "february", "march", "april", "may", "june", "july", "august", "september",
+    "october", "november", "december", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep",
+    "sept", "oct", "nov", "dec", "monday", "tuesday", "wednesday", "thursday", "friday",
+    "saturday", "sunday", "christmas", "easter", "diwali", "holi", "eid", "new", "year", "eve",
+}
+
+# Match kinds that stand for several airports spread over a country or region
+AREA_KINDS = ("country", "region")
+
+def _is_word_char(ch):
+    return ch.isalnum()
+
+def _words_before(text, start):
+    return re.findall(r"[a-z]+", text[:start].lower())
+
+def has_travel_cue(text, start):
+    """True when the word just before position `start` is a preposition or travel verb"""
+    words = _words_before(text, start)
+    return bool(words) and words[-1] in TRAVEL_CUES
+
+def has_origin_cue(text, start):
+    """True when the word just before position `start` marks the place as the origin ("from")"""
+    words = _words_before(text, start)
+    return bool(words) and words[-1] in ORIGIN_CUES
+
+def is_negated(text, start):
+    """True when the place at `start` is ruled out ("not Dubai", "anywhere but Dubai", "not to Dubai")"""
+    words = _words_before(text, start)[-2:]
+    if words and words[-1] in TRAVEL_CUES:
+        words = words[:-1]
+    return bool(words) and words[-1] in NEGATION_CUES
+
+class AhoCorasick:
+    """Multi-pattern matcher: all occurrences of all patterns in one pass over the text"""
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+
+    def add(self, pattern, payload):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), payload))
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+
+    def iter_matches(self, text):
+        """Yield (start, end, payload) for every pattern occurrence"""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield i - length + 1, i + 1, payload
+
+def airport_traffic(code):
+    return AIRPORT_TRAFFIC.get(code, DEFAULT_AIRPORT_TRAFFIC)
+
+class Gazetteer:
+    """Destination aliases -> airports, matched with whole-word, leftmost-longest rules"""
+    def __init__(self, destinations=DESTINATIONS, country_aliases=COUNTRY_ALIASES, regions=REGIONS,
+                 airport_names=AIRPORT_NAMES, code_stopwords=CODE_STOPWORDS):
+        self.destinations = destinations
+        self.code_stopwords = code_stopwords
+        self.aliases = {}
+        # Common-word city names, only matched as "<name>, <country>" ("Nice, France")
+        self.common_word_aliases = {}
+        self._automaton = AhoCorasick()
+
+        # Metro areas: airports sharing a city, busiest first
+        self.metros = {}
+        for code, (city, country, _) in destinations.items():
+            self.metros.setdefault((city, country), []).append(code)
+        for codes in self.metros.values():
+            codes.sort(key=airport_traffic, reverse=True)
+        self.country_airports = self._rank_countries()
+        self.region_airports = {
+            region: self._rank_region(countries) for region, (countries, _) in regions.items()
+        }
+        self.region_countries = {region: set(countries) for region, (countries, _) in regions.items()}
+
+        for code, (city, country, aliases) in destinations.items():
+            # The city name stands for the busiest airport of the metro area
+            main = self.metros[(city, country)][0]
+            self._add(city.lower(), {"kind": "city", "iata": main, "city": city, "country": country})
+            for alias in aliases:
+                self._add(alias, {"kind": "city", "iata": code, "city": city, "country": country})
+            for alias in airport_names.get(code, []):
+                self._add(alias, {"kind": "airport", "iata": code, "city": city, "country": country})
+            self._add(code.lower(), {"kind": "code", "iata": code, "city": city, "country": country})
+        for country, codes in self.country_airports.items():
+            city = destinations[codes[0]][0]
+            for alias in [country.lower()] + country_aliases.get(country, []):
+                self._add(alias, {"kind": "country", "iata": codes[0], "city": city, "country": country})
+        for region, (_, aliases) in regions.items():
+            codes = self.region_airports[region]
+            for alias in [region.lower()] + aliases:
+                self._add(alias, {"kind": "region", "iata": codes[0], "city": region, "country": None})
+        self._automaton.build()
+
+    def _rank_countries(self):
+        """Country -> airports: metro areas by total traffic, then airports within each"""
+        by_country = {}
+        for (city, country), codes in self.metros.items():
+            by_country.setdefault(country, []).append(codes)
+        ranked = {}
+        for country, metros in by_country.items():
+            metros.sort(key=lambda codes: sum(airport_traffic(c) for c in codes), reverse=True)
+            ranked[country] = [code for codes in metros for code in codes][:COUNTRY_MAX_AIRPORTS]
+        return ranked
+
+    def _rank_region(self, countries):
+        """Main airport of each member country, busiest first"""
+        mains = [self.country_airports[c][0] for c in countries if c in self.country_airports]
+        return sorted(mains, key=airport_traffic, reverse=True)[:REGION_MAX_AIRPORTS]
+
+    def _add(self, alias, payload):
+        if alias in COMMON_WORD_ALIASES:
+            self.common_word_aliases.setdefault(alias, {**payload, "alias": alias})
+            return
+        payload = {**payload, "alias": alias}
+        # City names win over identical country names ("Singapore", "Bahrain")
+        if alias in self.aliases and self.aliases[alias]["kind"] not in ("country", "region"):
+            return
+        self.aliases[alias] = payload
+        self._automaton.add(alias, payload)
+
+    def related_airports(self, code):
+        """`code` followed by the other airports of its metro area ("LHR" -> LHR, LGW, STN, LTN)"""
+        code = code.upper()
+        if code not in self.destinations:
+            return [code]
+        city, country, _ = self.destinations[code]
+        return [code] + [c for c in self.metros[(city, country)] if c != code]
+
+    def airports_for(self, match):
+        """IATA codes a match stands for, best first"""
+        if match["kind"] == "country":
+            return list(self.country_airports[match["country"]])
+        if match["kind"] == "region":
+            return list(self.region_airports[match["city"]])
+        if match["kind"] == "city":
+            return self.related_airports(match["iata"])
+        return [match["iata"]]
+
+    def find_all(self, text):
+        """
+        Whole-word alias matches in `text`, leftmost-longest and non-overlapping.
+        Airport codes only count when written in upper case and not a stopword ("FOR", "THE").
+        """
+        if not text:
+            return []
+        lowered = text.lower()
+        check_case = len(lowered) == len(text)
+        candidates = []
+        for start, end, payload in self._automaton.iter_matches(lowered):
+            if start > 0 and _is_word_char(lowered[start - 1]):
+                continue
+            if end < len(lowered) and _is_word_char(lowered[end]):
+                continue
+            if payload["kind"] == "code":
+                if not check_case or not text[start:end].isupper() or text[start:end] in self.code_stopwords:
+                    continue
+            candidates.append((start, end, payload))
+
+        candidates.sort(key=lambda c: (c[0], c[0] - c[1]))
+        matches = []
+        last_end = -1
+        for start, end, payload in candidates:
+            if start >= last_end:
+                matches.append({**payload, "start": start, "end": end})
+                last_end = end
+        return [self._common_word_city(text, m) for m in matches]
+
+    def _common_word_city(self, text, match):
+        """A country match preceded by a common-word city of that country ("Nice, France") becomes the city"""
+        if match["kind"] != "country":
+            return match
+        before = re.search(r"([^\W\d_]+),?\s+$", text[:match["start"]])
+        city = before and self.common_word_aliases.get(before.group(1).lower())
+        if not city or city["country"] != match["country"]:
+            return match
+        return {**city, "start": before.start(1), "end": match["end"]}
+
+    def other_place_words(self, text, matches):
+        """
+        Words outside `matches` that may name a place the gazetteer does not know: capitalized
+        words after the first ("Nice" in "nice trip to Nice, ...") and common-word city names
+        """
+        words = []
+        for word in re.finditer(r"[^\W\d_]+", text):
+            if any(m["start"] <= word.start() < m["end"] for m in matches):
+                continue
+            value, lower = word.group(0), word.group(0).lower()
+            if lower in COMMON_WORD_ALIASES or (
+                    word.start() > 0 and value[0].isupper() and not value.isupper()
+                    and lower not in CAPITALIZED_NON_PLACES):
+                words.append(value)
+        return words
+
+    def resolve(self, text, origin=None):
+        """
+        Best destination in `text`. Returns
+          {"destination_city", "iata_code", "iata_codes", "country", "kind",
+           "confidence", "score", "ambiguous", "matches"}
+        iata_codes lists every candidate airport, best first (the metro area for a city,
+        the busiest airports for a country or region, never the origin). score is 0.95
+        for a single city/airport, 0.9 for a single country or region and 0.4 when
+        several distinct destinations are mentioned (the first one is returned). Places after
+        "from" or before "to <place>" are origins and never returned. A first-name alias without a travel cue before it
+        ("with Florence") scores PERSON_NAME_SCORE, a query ruling a place out ("not Dubai")
+        NEGATED_SCORE, and a match next to other possible place words UNCERTAIN_PLACE_SCORE
+        """
+        origin_code = self.origin_code(origin)
+        found = self.find_all(text)
+        # "Chennai to Budapest": a leading place followed by "to" and another place is where the trip starts
+        departures = found[:1] if len(found) > 1 and text[found[0]["end"]:found[1]["start"]].strip().lower() == "to" else []
+        matches = [m for m in found if not has_origin_cue(text, m["start"]) and m not in departures
+                   and (m["iata"] != origin_code or m["kind"] in AREA_KINDS)]
+        negated = [m for m in matches if is_negated(text, m["start"])]
+        matches = [m for m in matches if m not in negated] or matches
+        # A first name with no travel cue loses to any other place ("Jordan and I want Goa")
+        places = [m for m in matches
+                  if m["alias"] not in PERSON_NAME_ALIASES or has_travel_cue(text, m["start"])]
+        matches = places or matches
+        # A country or region next to a place inside it ("Kyoto, Japan", "Thailand, Southeast Asia") adds nothing
+        city_countries = {m["country"] for m in matches if m["kind"] not in AREA_KINDS}
+        named_countries = {m["country"] for m in matches if m["kind"] != "region"}
+        matches = [
+            m for m in matches
+            if not (m["kind"] == "country" and m["country"] in city_countries)
+            and not (m["kind"] == "region" and named_countries & self.region_countries[m["city"]])
+        ]
+
+        distinct = []
+        for m in matches:
+            codes = [c for c in self.airports_for(m) if c != origin_code]
+            if codes and codes[0] not in [d[1][0] for d in distinct]:
+                distinct.append((m, codes))
+
+        if not distinct:
+            return {"destination_city": None, "iata_code": None, "iata_codes": [], "country": None,
+                    "kind": None, "confidence": "low", "score": 0.0, "ambiguous": False, "matches": []}
+
+        best, codes = distinct[0]
+        ambiguous = len(distinct) > 1
+        other_places = self.other_place_words(text, found)
+        if best["kind"] not in AREA_KINDS:
+            # Lower-case common words ("nice weekend in Goa") only cast doubt on countries and regions
+            other_places = [w for w in other_places if w[0].isupper()]
+        if ambiguous:
+            score, confidence = 0.4, "low"
+        elif negated:
+            score, confidence = NEGATED_SCORE, "low"
+        elif best["alias"] in PERSON_NAME_ALIASES and not has_travel_cue(text, best["start"]):
+            score, confidence = PERSON_NAME_SCORE, "low"
+        elif best["alias"] in AMBIGUOUS_AREA_ALIASES or other_places:
+            score, confidence = UNCERTAIN_PLACE_SCORE, "low"
+        elif best["kind"] in AREA_KINDS:
+            score, confidence = AREA_SCORE, "medium"
+        else:
+            score, confidence = 0.95, "high"
+        # A country is named after its main city, which may be the excluded origin
+        city = self.destinations[codes[0]][0] if best["kind"] == "country" else best["city"]
+        return {
+            "destination_city": city,
+            "iata_code": codes[0],
+            "iata_codes": codes,
+            "country": best["country"],
+            "kind": best["kind"],
+            "confidence": confidence,
+            "score": score,
+            "ambiguous": ambiguous,
+            "matches": matches
+        }
+
+    def origin_code(self, origin):
+        """IATA code of an origin given as a code or a place name, if known"""
+        if not origin:
+            return None
+        origin = origin.strip()
+        if origin.upper() in self.destinations:
+            return origin.upper()
+        match = self.aliases.get(origin.lower())
+        return match["iata"] if match and match["kind"] not in AREA_KINDS else None
+
+gazetteer = Gazetteer()
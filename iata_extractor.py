@@ -4,13 +4,13 @@ Extracts destination airport codes from natural language queries
 """
 import os
 import json
-import time
 import re
 
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
+from llm_client import generate_text, init_models, json_generation_config
+from llm_metrics import llm_metrics
+from gazetteer import gazetteer, CODE_STOPWORDS, AREA_KINDS, AREA_SCORE
+from fuzzy_index import fuzzy_index
+from prompts import get_prompt
 
 # Major Indian International Airports
 INDIAN_AIRPORTS = {
@@ -61,34 +61,14 @@ MODEL_CANDIDATES = [
     "models/gemini-pro-latest",
 ]
 
-SYSTEM_PROMPT_IATA = """You are an expert travel assistant that extracts destination information from natural language queries.
+IATA_GENERATION_CONFIG = json_generation_config(max_output_tokens=256)
 
-Your task: Extract the DESTINATION city/country/airport from the user's trip query and return its IATA airport code.
+_UNKNOWN_CODE_RE = re.compile(r"\b([A-Z]{3})\b")
 
-RETURN ONLY a JSON object with these fields:
-{
-  "destination_city": "<city or country name>",
-  "iata_code": "<3-letter IATA code>",
-  "confidence": "<high|medium|low>"
-}
-
-Examples:
-Input: "plan trip to swiss for 7 days" => {"destination_city": "Zurich", "iata_code": "ZRH", "confidence": "high"}
-Input: "weekend in paris" => {"destination_city": "Paris", "iata_code": "CDG", "confidence": "high"}
-Input: "vacation in Dubai" => {"destination_city": "Dubai", "iata_code": "DXB", "confidence": "high"}
-Input: "trip to Thailand" => {"destination_city": "Bangkok", "iata_code": "BKK", "confidence": "medium"}
-Input: "visiting London" => {"destination_city": "London", "iata_code": "LHR", "confidence": "high"}
-
-Rules:
-- For countries, use the main/capital airport
-- For Switzerland: ZRH (Zurich)
-- For Thailand: BKK (Bangkok)
-- For UK/England: LHR (London)
-- For Japan: NRT (Tokyo)
-- Always return valid 3-letter IATA codes
-- If unsure, set confidence to "medium" or "low"
-
-Return ONLY valid JSON, no markdown, no commentary."""
+# Versioned system prompt (prompts.py); its key is part of extraction cache keys
+IATA_PROMPT = get_prompt("iata")
+IATA_PROMPT_VERSION = IATA_PROMPT.key
+SYSTEM_PROMPT_IATA = IATA_PROMPT.text
 
 def safe_extract_text(resp):
     """Extract text from Gemini response"""
@@ -113,24 +93,61 @@ def safe_extract_text(resp):
     return str(resp).strip()
 
 def call_gemini_for_iata(user_query, model_candidates=MODEL_CANDIDATES):
-    """Call Gemini to extract IATA code"""
-    if genai is None:
-        return None, None, [("genai_missing", "google.generativeai not available")]
-    
-    errors = []
-    for model_name in model_candidates:
-        try:
-            model = genai.GenerativeModel(model_name)
-            resp = model.generate_content([SYSTEM_PROMPT_IATA, f"User query: {user_query}"])
-            text = safe_extract_text(resp)
-            if text:
-                return text, model_name, errors
-        except Exception as e:
-            errors.append((model_name, repr(e)))
-            time.sleep(0.25)
-            continue
-    
-    return None, None, errors
+    """Call Gemini to extract IATA code (healthiest candidate first)"""
+    return generate_text(SYSTEM_PROMPT_IATA, f"User query: {user_query}", model_candidates,
+                         IATA_GENERATION_CONFIG, text_fn=safe_extract_text,
+                         json_accept=lambda value: isinstance(value, dict) and "iata_code" in value,
+                         label="iata")
+
+def parse_iata_fields(parsed):
+    """
+    Read destination fields from a parsed model JSON object.
+    Returns (destination_city, iata_code|None, confidence, error|None)
+    """
+    destination_city = parsed.get("destination_city")
+    iata = parsed.get("iata_code")
+    confidence = parsed.get("confidence", "medium")
+
+    # Validate IATA code format
+    if iata and isinstance(iata, str) and len(iata) == 3 and iata.isalpha():
+        return destination_city, iata.upper(), confidence, None
+    return destination_city, None, confidence, f"Invalid IATA code format: {iata}"
+
+def local_iata_fallback(user_query):
+    """
+    Local destination lookup used when Gemini gives no valid code.
+    Returns {"destination_city", "iata_code", "iata_codes", "confidence"} (iata_code may be None)
+    """
+    result = {"destination_city": None, "iata_code": None, "iata_codes": [], "confidence": "low"}
+
+    # Known cities, countries and airports (one pass over the query)
+    match = gazetteer.resolve(user_query)
+    if match["iata_code"]:
+        result["iata_code"] = match["iata_code"]
+        result["iata_codes"] = match["iata_codes"]
+        result["destination_city"] = match["destination_city"]
+        result["confidence"] = "low" if match["ambiguous"] else "medium"
+        return result
+
+    # Misspelled names ("Dubaai", "zurch")
+    match = fuzzy_index.resolve(user_query)
+    if match["iata_code"]:
+        result["iata_code"] = match["iata_code"]
+        result["iata_codes"] = match["iata_codes"]
+        result["destination_city"] = match["destination_city"]
+        result["confidence"] = match["confidence"]
+        return result
+
+    # Explicit upper-case code we have no name for ("trip to TRZ")
+    code_match = _UNKNOWN_CODE_RE.search(user_query)
+    while code_match and code_match.group(1) in CODE_STOPWORDS:
+        code_match = _UNKNOWN_CODE_RE.search(user_query, code_match.end())
+    if code_match:
+        result["iata_code"] = code_match.group(1)
+        result["iata_codes"] = [result["iata_code"]]
+        result["destination_city"] = "Unknown"
+
+    return result
 
 def extract_iata_from_query(user_query):
     """
@@ -138,19 +155,36 @@ def extract_iata_from_query(user_query):
     Returns: {
         "destination_city": str,
         "iata_code": str,
+        "iata_codes": [str],    # every candidate airport, best first
         "confidence": str,
         "raw_output": str,
-        "model_used": str,
+        "model_used": str,      # "local" when answered from the gazetteer
         "used_fallback": bool,
         "error": str|None
     }
     """
+    # Countries and regions map to ranked airport lists without asking the model, unless
+    # something else in the query may be the real place ("Nice, France" style, unknown towns)
+    match = gazetteer.resolve(user_query)
+    if match["kind"] in AREA_KINDS and not match["ambiguous"] and match["score"] >= AREA_SCORE:
+        return {
+            "destination_city": match["destination_city"],
+            "iata_code": match["iata_code"],
+            "iata_codes": match["iata_codes"],
+            "confidence": match["confidence"],
+            "raw_output": None,
+            "model_used": "local",
+            "used_fallback": False,
+            "error": None
+        }
+
     # Try Gemini first
     raw_text, model_used, errors = call_gemini_for_iata(user_query)
     
     result = {
         "destination_city": None,
         "iata_code": None,
+        "iata_codes": [],
         "confidence": "low",
         "raw_output": raw_text,
         "model_used": model_used,
@@ -167,51 +201,39 @@ def extract_iata_from_query(user_query):
                 json_str = raw_text[start:end+1]
                 parsed = json.loads(json_str)
                 
-                result["destination_city"] = parsed.get("destination_city")
-                result["iata_code"] = parsed.get("iata_code")
-                result["confidence"] = parsed.get("confidence", "medium")
-                
-                # Validate IATA code format
-                iata = result["iata_code"]
-                if iata and isinstance(iata, str) and len(iata) == 3 and iata.isalpha():
-                    result["iata_code"] = iata.upper()
-                else:
-                    result["error"] = f"Invalid IATA code format: {iata}"
-                    result["iata_code"] = None
+                (result["destination_city"], result["iata_code"],
+                 result["confidence"], result["error"]) = parse_iata_fields(parsed)
                     
         except Exception as e:
             result["error"] = f"JSON parse error: {repr(e)}"
     else:
         result["error"] = "No response from Gemini"
     
+    # Other airports of the same metro area ("LHR" -> LHR, LGW, STN, LTN)
+    if result["iata_code"]:
+        result["iata_codes"] = gazetteer.related_airports(result["iata_code"])
+    
+    llm_metrics.record_extraction("iata", parse_failed=bool(raw_text) and not result["iata_code"],
+                                  used_fallback=not result["iata_code"])
+    
     # Fallback: try to find IATA code patterns in query
     if not result["iata_code"]:
         result["used_fallback"] = True
-        
-        # Check for explicit IATA codes in query
-        iata_match = re.search(r'\b([A-Z]{3})\b', user_query.upper())
-        if iata_match:
-            result["iata_code"] = iata_match.group(1)
-            result["confidence"] = "low"
-            result["destination_city"] = "Unknown"
-        
-        # Check for popular city names
-        query_lower = user_query.lower()
-        for iata, city_name in POPULAR_DESTINATIONS.items():
-            if city_name.lower() in query_lower or iata.lower() in query_lower:
-                result["iata_code"] = iata
-                result["destination_city"] = city_name
-                result["confidence"] = "medium"
-                break
+        fallback = local_iata_fallback(user_query)
+        if fallback["iata_code"]:
+            result.update(fallback)
     
     return result
 
+# Dropdown options, sorted by city once at import
+INDIAN_AIRPORT_OPTIONS = [
+    {"code": code, "label": f"{data['city']} ({code}) - {data['name']}"}
+    for code, data in sorted(INDIAN_AIRPORTS.items(), key=lambda x: x[1]['city'])
+]
+
 def get_indian_airports_list():
     """Get formatted list of Indian airports for dropdown"""
-    return [
-        {"code": code, "label": f"{data['city']} ({code}) - {data['name']}"}
-        for code, data in sorted(INDIAN_AIRPORTS.items(), key=lambda x: x[1]['city'])
-    ]
+    return list(INDIAN_AIRPORT_OPTIONS)
 
 # Test function
 if __name__ == "__main__":
@@ -219,8 +241,7 @@ if __name__ == "__main__":
     load_dotenv()
     
     api_key = os.getenv("GOOGLE_API_KEY")
-    if api_key and genai:
-        genai.configure(api_key=api_key)
+    if init_models(api_key, [(MODEL_CANDIDATES, IATA_GENERATION_CONFIG)]):
         print("Gemini configured\n")
     
     test_queries = [
@@ -0,0 +1,671 @@
+"""
+Shared Gemini Client Layer
+Process-wide registry of configured GenerativeModel handles and model health
+tracking, shared by core.py (duration extraction) and iata_extractor.py
+(destination extraction). Model handles come from a pluggable backend:
+LLM_BACKEND=gemini (default) or LLM_BACKEND=fake (fake_llm.py, no network).
+"""
+import os
+import json
+import inspect
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from llm_metrics import llm_metrics, response_usage, cached_token_count, estimate_tokens
+from worker_pools import worker_pools, Overloaded
+
+try:
+    import google.generativeai as genai
+except Exception:
+    genai = None
+
+# Newer google-generativeai releases accept request_options={"timeout": ...}
+try:
+    _SUPPORTS_REQUEST_OPTIONS = genai is not None and "request_options" in inspect.signature(
+        genai.GenerativeModel.generate_content).parameters
+except Exception:
+    _SUPPORTS_REQUEST_OPTIONS = False
+
+# JSON-mode generation (response_mime_type) only exists in newer releases
+try:
+    _SUPPORTS_JSON_MIME_TYPE = genai is not None and "response_mime_type" in inspect.signature(
+        genai.GenerationConfig).parameters
+except Exception:
+    _SUPPORTS_JSON_MIME_TYPE = False
+
+# Streamed calls stop reading once the first complete JSON value arrived (LLM_STREAM_JSON=0 disables)
+LLM_STREAM_JSON = os.getenv("LLM_STREAM_JSON", "1") != "0"
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+
+# Static system prompts are held as cached context where the backend supports it (LLM_CONTEXT_CACHE=0 disables).
+# Gemini only caches prefixes above a minimum size, so shorter prompts are sent in full.
+LLM_CONTEXT_CACHE = os.getenv("LLM_CONTEXT_CACHE", "1") != "0"
+LLM_CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("LLM_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+LLM_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("LLM_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+
+# Thinking models (name substrings) count reasoning tokens against max_output_tokens; their
+# caps get LLM_THINKING_TOKEN_HEADROOM extra tokens so the answer itself is not cut off
+LLM_THINKING_MODELS = [m for m in os.getenv(
+    "LLM_THINKING_MODELS", "gemini-2.5,gemini-pro-latest,gemini-flash-latest").split(",") if m]
+LLM_THINKING_TOKEN_HEADROOM = int(os.getenv("LLM_THINKING_TOKEN_HEADROOM", "2048"))
+
+def json_generation_config(max_output_tokens, temperature=0.0):
+    """
+    Generation config for the small JSON answers the extractors ask for: deterministic,
+    capped output, and JSON-only responses where the installed SDK supports them.
+    The cap is for the answer; thinking models get headroom added per model (model_generation_config).
+    """
+    config = {"temperature": temperature, "max_output_tokens": max_output_tokens}
+    if _SUPPORTS_JSON_MIME_TYPE:
+        config["response_mime_type"] = "application/json"
+    return config
+
+def model_generation_config(model_name, generation_config):
+    """`generation_config` for one model: thinking models get LLM_THINKING_TOKEN_HEADROOM on top of the cap"""
+    if (not generation_config or "max_output_tokens" not in generation_config
+            or not any(marker in model_name for marker in LLM_THINKING_MODELS)):
+        return generation_config
+    return {**generation_config,
+            "max_output_tokens": generation_config["max_output_tokens"] + LLM_THINKING_TOKEN_HEADROOM}
+
+# --- Backends ---
+# A backend builds model handles whose generate_content(contents, stream=..., request_options=...)
+# behaves like google.generativeai's: responses expose .text and optionally .usage_metadata.
+# Backends with supports_cached_content also build handles bound to a cached system prompt.
+class GeminiBackend:
+    name = "gemini"
+    available = genai is not None
+    supports_request_options = _SUPPORTS_REQUEST_OPTIONS
+    # Explicit context caching (genai.caching) only exists in newer releases
+    supports_cached_content = genai is not None and hasattr(genai, "caching")
+    cached_content_min_tokens = LLM_CONTEXT_CACHE_MIN_TOKENS
+
+    def configure(self, api_key=None):
+        """Configure the Gemini client. Returns True when configured."""
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if genai is None or not api_key:
+            return False
+        genai.configure(api_key=api_key)
+        return True
+
+    def build_model(self, model_name, generation_config=None):
+        if genai is None:
+            raise RuntimeError("google.generativeai library not available")
+        return genai.GenerativeModel(model_name, generation_config=generation_config)
+
+    def build_cached_model(self, model_name, generation_config, system_prompt):
+        """Register `system_prompt` as cached content and return a handle that reuses it"""
+        from datetime import timedelta
+        cached = genai.caching.CachedContent.create(
+            model=model_name, system_instruction=system_prompt,
+            ttl=timedelta(seconds=LLM_CONTEXT_CACHE_TTL_SECONDS)
+        )
+        return genai.GenerativeModel.from_cached_content(cached, generation_config=generation_config)
+
+def make_backend(name=LLM_BACKEND):
+    """Backend for an LLM_BACKEND value"""
+    if name == "fake":
+        from fake_llm import FakeLLMBackend
+        return FakeLLMBackend.from_env()
+    if name != "gemini":
+        print(f"WARNING: Unknown LLM_BACKEND {name!r}, using gemini")
+    return GeminiBackend()
+
+class ModelRegistry:
+    """
+    Thread-safe cache of model handles keyed by (model name, generation config, cached prefix).
+    Handles are built once and reused, so repeated requests skip model construction
+    and share the underlying client connections. Handles bound to cached context are
+    rebuilt before the cache entry expires.
+    """
+    def __init__(self, backend=None):
+        self.backend = backend or GeminiBackend()
+        self._models = {}           # key -> (handle, expires_at or None)
+        self._uncacheable = set()   # (model name, prompt) pairs whose cache creation failed
+        self._lock = threading.Lock()
+        self.configured = False
+
+    def configure(self, api_key=None):
+        """Configure the backend once per process. Returns True when configured."""
+        if not self.backend.available:
+            return False
+        with self._lock:
+            if not self.configured:
+                self.configured = self.backend.configure(api_key)
+            return self.configured
+
+    def set_backend(self, backend):
+        """Swap the backend (drops cached handles; configure() must run again)"""
+        with self._lock:
+            self.backend = backend
+            self._models.clear()
+            self._uncacheable.clear()
+            self.configured = False
+
+    def get(self, model_name, generation_config=None, cached_prefix=None):
+        """Get (or build once) the handle for a model name, generation config and optional cached system prompt"""
+        generation_config = model_generation_config(model_name, generation_config)
+        key = (model_name, _config_key(generation_config), cached_prefix)
+        entry = self._models.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+                    if cached_prefix is None:
+                        entry = (self.backend.build_model(model_name, generation_config), None)
+                    else:
+                        model = self.backend.build_cached_model(model_name, generation_config, cached_prefix)
+                        entry = (model, time.monotonic() + 0.9 * LLM_CONTEXT_CACHE_TTL_SECONDS)
+                    self._models[key] = entry
+        return entry[0]
+
+    def cacheable(self, model_name, system_prompt):
+        """True when the backend can hold `system_prompt` as cached context for this model"""
+        backend = self.backend
+        return (LLM_CONTEXT_CACHE and bool(system_prompt) and getattr(backend, "supports_cached_content", False)
+                and estimate_tokens(system_prompt) >= backend.cached_content_min_tokens
+                and (model_name, system_prompt) not in self._uncacheable)
+
+    def handle_for(self, model_name, generation_config, contents):
+        """
+        (handle, contents to send) for [system_prompt, user_prompt] contents: when the system
+        prompt is cacheable the handle carries it and only the user prompt is sent
+        """
+        if len(contents) > 1 and self.cacheable(model_name, contents[0]):
+            try:
+                return self.get(model_name, generation_config, cached_prefix=contents[0]), contents[1:]
+            except Exception as e:
+                print(f"WARNING: Context caching unavailable for {model_name}, sending the prompt in full: {e}")
+                with self._lock:
+                    self._uncacheable.add((model_name, contents[0]))
+        return self.get(model_name, generation_config), contents
+
+    def warm(self, model_names, generation_config=None):
+        """Build handles ahead of the first request"""
+        if not self.backend.available:
+            return
+        for model_name in model_names:
+            try:
+                self.get(model_name, generation_config)
+            except Exception as e:
+                print(f"WARNING: Could not create model handle {model_name}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+def _config_key(generation_config):
+    """Hashable key for a generation config dict"""
+    if not generation_config:
+        return None
+    try:
+        key = tuple(sorted(generation_config.items()))
+        hash(key)
+        return key
+    except TypeError:
+        # Unhashable values (e.g. lists of stop sequences)
+        return json.dumps(generation_config, sort_keys=True, default=str)
+
+model_registry = ModelRegistry(make_backend())
+
+def get_model(model_name, generation_config=None):
+    """Shortcut for model_registry.get()"""
+    return model_registry.get(model_name, generation_config)
+
+def set_backend(backend, api_key=None):
+    """
+    Route all LLM calls through `backend` (e.g. fake_llm.FakeLLMBackend()) and configure it.
+    Returns the previous backend so callers can restore it.
+    """
+    previous = model_registry.backend
+    model_registry.set_backend(backend)
+    model_registry.configure(api_key)
+    return previous
+
+# --- Model health tracking ---
+MODEL_COOLDOWN_SECONDS = float(os.getenv("MODEL_COOLDOWN_SECONDS", "30"))
+MODEL_MAX_COOLDOWN_SECONDS = float(os.getenv("MODEL_MAX_COOLDOWN_SECONDS", "600"))
+MODEL_PROBE_INTERVAL_SECONDS = float(os.getenv("MODEL_PROBE_INTERVAL_SECONDS", "10"))
+HEALTH_EWMA_ALPHA = 0.2
+LATENCY_SAMPLE_SIZE = 200
+# Models failing more often than this are tried after healthier ones
+ERROR_RATE_DEMOTE_THRESHOLD = 0.5
+
+# Failures that say the model or the path to it is unhealthy (transport, quota, server side).
+# Anything else (invalid arguments, safety blocks, unreadable answers) is about the request
+# and leaves model health alone. Matched by class name, so the SDK stays an optional import.
+MODEL_FAULT_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError", "BadGateway",
+    "GatewayTimeout", "DeadlineExceeded", "Unknown", "Aborted", "RetryError",
+    "ConnectionError", "TimeoutError", "Timeout",
+}
+
+def is_model_fault(error):
+    """True when a failed call should count against the model's health (and start a cooldown)"""
+    if any(klass.__name__ in MODEL_FAULT_ERRORS for klass in type(error).__mro__):
+        return True
+    code = getattr(error, "code", None)    # google.api_core errors carry the HTTP status
+    return isinstance(code, int) and (code == 429 or code >= 500)
+
+class ModelHealth:
+    """
+    Per-model error rate (EWMA), latency (EWMA) and cooldown windows.
+
+    A model failing with a transport, quota or server error (is_model_fault) is put in
+    cooldown (doubling per consecutive failure) and is skipped on the request path until
+    a background probe succeeds, so user requests go straight to a working model instead
+    of paying for the failed attempt.
+    """
+    def __init__(self, cooldown_seconds=MODEL_COOLDOWN_SECONDS, max_cooldown_seconds=MODEL_MAX_COOLDOWN_SECONDS,
+                 alpha=HEALTH_EWMA_ALPHA):
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.alpha = alpha
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, model_name):
+        entry = self._stats.get(model_name)
+        if entry is None:
+            entry = {
+                "error_rate": 0.0,
+                "latency_ewma": None,
+                "successes": 0,
+                "failures": 0,
+                "consecutive_failures": 0,
+                "cooldown_until": 0.0,
+                "needs_probe": False,
+                "last_error": None,
+                "latencies": deque(maxlen=LATENCY_SAMPLE_SIZE)
+            }
+            self._stats[model_name] = entry
+        return entry
+
+    def record_success(self, model_name, latency):
+        with self._lock:
+            entry = self._entry(model_name)
+            entry["successes"] += 1
+            entry["consecutive_failures"] = 0
+            entry["needs_probe"] = False
+            entry["cooldown_until"] = 0.0
+            entry["error_rate"] = (1 - self.alpha) * entry["error_rate"]
+            entry["latencies"].append(latency)
+            if entry["latency_ewma"] is None:
+                entry["latency_ewma"] = latency
+            else:
+                entry["latency_ewma"] = (1 - self.alpha) * entry["latency_ewma"] + self.alpha * latency
+
+    def record_failure(self, model_name, error=None):
+        with self._lock:
+            entry = self._entry(model_name)
+            entry["failures"] += 1
+            entry["consecutive_failures"] += 1
+            entry["error_rate"] = (1 - self.alpha) * entry["error_rate"] + self.alpha
+            entry["last_error"] = error
+            cooldown = min(self.cooldown_seconds * 2 ** (entry["consecutive_failures"] - 1), self.max_cooldown_seconds)
+            entry["cooldown_until"] = time.monotonic() + cooldown
+            entry["needs_probe"] = True
+
+    def is_available(self, model_name):
+        entry = self._stats.get(model_name)
+        return entry is None or not entry["needs_probe"]
+
+    def order(self, model_candidates):
+        """
+        Candidates to try on the request path: models awaiting a probe are skipped,
+        models with a high error rate go last, otherwise the configured order is kept.
+        If every candidate is unavailable, the one whose cooldown ends first is returned.
+        """
+        with self._lock:
+            available = []
+            for index, model_name in enumerate(model_candidates):
+                entry = self._stats.get(model_name)
+                if entry is not None and entry["needs_probe"]:
+                    continue
+                demoted = entry is not None and entry["error_rate"] >= ERROR_RATE_DEMOTE_THRESHOLD
+                available.append((demoted, index, model_name))
+            if available:
+                return [model_name for _, _, model_name in sorted(available)]
+            if not model_candidates:
+                return []
+            return [min(model_candidates, key=lambda m: self._stats[m]["cooldown_until"])]
+
+    def latency(self, model_name):
+        entry = self._stats.get(model_name)
+        return entry["latency_ewma"] if entry else None
+
+    def latency_percentile(self, model_name, q):
+        """q-quantile (0..1) of recent successful call latencies, or None without samples"""
+        with self._lock:
+            entry = self._stats.get(model_name)
+            samples = sorted(entry["latencies"]) if entry else []
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def due_for_probe(self):
+        """Models whose cooldown expired and that are waiting for a background probe"""
+        now = time.monotonic()
+        with self._lock:
+            return [m for m, e in self._stats.items() if e["needs_probe"] and e["cooldown_until"] <= now]
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model_name: {
+                    "available": not entry["needs_probe"],
+                    "error_rate": round(entry["error_rate"], 3),
+                    "latency_ewma_ms": round(entry["latency_ewma"] * 1000, 1) if entry["latency_ewma"] is not None else None,
+                    "successes": entry["successes"],
+                    "failures": entry["failures"],
+                    "cooldown_remaining_s": round(max(0.0, entry["cooldown_until"] - now), 1),
+                    "last_error": entry["last_error"]
+                }
+                for model_name, entry in self._stats.items()
+            }
+
+model_health = ModelHealth()
+
+class ModelProber:
+    """Background thread that re-probes models in cooldown with a tiny request"""
+    PROBE_PROMPT = "Reply with OK."
+
+    def __init__(self, health, interval=MODEL_PROBE_INTERVAL_SECONDS):
+        self.health = health
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="model-prober", daemon=True)
+                self._thread.start()
+
+    def probe(self, model_name):
+        started = time.monotonic()
+        try:
+            get_model(model_name, {"max_output_tokens": 4, "temperature": 0.0}).generate_content(self.PROBE_PROMPT)
+            self.health.record_success(model_name, time.monotonic() - started)
+            return True
+        except Exception as e:
+            if not is_model_fault(e):
+                # The model answered, it just refused the probe: it is reachable
+                self.health.record_success(model_name, time.monotonic() - started)
+                return True
+            self.health.record_failure(model_name, repr(e))
+            return False
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not model_registry.configured:
+                continue
+            for model_name in self.health.due_for_probe():
+                self.probe(model_name)
+
+model_prober = ModelProber(model_health)
+
+# --- Deadlines and hedging ---
+# Every LLM call is bounded by LLM_DEADLINE_SECONDS; after that callers use their local extractors.
+# When the primary model is slower than its LLM_HEDGE_PERCENTILE latency, a second request is
+# hedged to the fastest other healthy model and the first answer wins.
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "8"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "2.5"))
+# Model calls run on a bounded pool; calls abandoned at the deadline keep their slot until
+# they finish, and callers that depend on the pool (API extraction) are refused while it is full
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "16"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+
+llm_pool = worker_pools.create("llm", max_workers=LLM_MAX_WORKERS, max_queue=LLM_MAX_QUEUE)
+
+class JsonStreamScanner:
+    """
+    Incremental scanner for the first complete top-level JSON object/array in streamed text.
+    Tracks nesting depth and string/escape state, so each character is looked at once.
+    """
+    def __init__(self, accept=None):
+        self.accept = accept
+        self.text = ""
+        self.value = None
+        self.value_text = None
+        self._pos = 0
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, piece):
+        """Add streamed text; returns True once a complete, accepted JSON value was found"""
+        if self.value_text is not None:
+            return True
+        self.text += piece or ""
+        text = self.text
+        while self._pos < len(text):
+            ch = text[self._pos]
+            if self._start is None:
+                if ch in "{[":
+                    self._start, self._depth = self._pos, 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = text[self._start:self._pos + 1]
+                    self._pos += 1
+                    self._start = None
+                    try:
+                        value = json.loads(candidate)
+                    except ValueError:
+                        continue
+                    if self.accept is None or self.accept(value):
+                        self.value, self.value_text = value, candidate
+                        return True
+                    continue
+            self._pos += 1
+        return False
+
+def _close_stream(resp):
+    """
+    Best-effort cancel of the underlying streaming RPC so the server stops generating.
+    google-generativeai has no public cancel: this reaches for the private `_iterator`
+    (a gRPC stream with cancel()) and silently does nothing when a release lacks it;
+    the caller has stopped reading either way
+    """
+    try:
+        iterator = getattr(resp, "_iterator", None)
+    except Exception:
+        return
+    for closer in ("cancel", "close"):
+        fn = getattr(iterator, closer, None)
+        if callable(fn):
+            try:
+                fn()
+            except Exception:
+                pass
+            return
+
+def _stream_json(model, contents, timeout, accept):
+    """
+    Stream a response and stop at the first complete JSON value.
+    Returns (text (may be empty), last chunk read or None, monotonic time of the first chunk or None)
+    """
+    kwargs = {"stream": True}
+    if model_registry.backend.supports_request_options:
+        kwargs["request_options"] = {"timeout": timeout}
+    resp = model.generate_content(contents, **kwargs)
+    scanner = JsonStreamScanner(accept)
+    chunk = first_chunk_at = None
+    try:
+        for chunk in resp:
+            if first_chunk_at is None:
+                first_chunk_at = time.monotonic()
+            try:
+                # Raw chunk text: text_fn strips, which would drop spaces at chunk boundaries
+                piece = chunk.text
+            except ValueError:
+                piece = None  # chunk without text parts (e.g. safety or finish metadata)
+            if scanner.feed(piece):
+                return scanner.value_text, chunk, first_chunk_at
+    finally:
+        if scanner.value_text is not None:
+            _close_stream(resp)
+    return scanner.text, chunk, first_chunk_at
+
+def _call_model(model_name, contents, generation_config, text_fn, timeout, stream_json=False, accept=None,
+                label="llm"):
+    """One model attempt with health and metrics bookkeeping. Returns text (may be empty) or raises."""
+    started = time.monotonic()
+    first_chunk_at = None
+    try:
+        model, contents = model_registry.handle_for(model_name, generation_config, contents)
+        if stream_json:
+            text, resp, first_chunk_at = _stream_json(model, contents, timeout, accept)
+        else:
+            if model_registry.backend.supports_request_options:
+                resp = model.generate_content(contents, request_options={"timeout": timeout})
+            else:
+                resp = model.generate_content(contents)
+            text = text_fn(resp) if text_fn else resp.text
+    except Exception as e:
+        if is_model_fault(e):
+            model_health.record_failure(model_name, repr(e))
+            model_prober.ensure_running()
+        llm_metrics.record_call(label, model_name, time.monotonic() - started, error=e,
+                                prompt_tokens=estimate_tokens("".join(contents)), tokens_estimated=True)
+        raise
+    latency = time.monotonic() - started
+    model_health.record_success(model_name, latency)
+    # A stream cut off early carries no usage; streamed usage (if any) is on the last chunk
+    usage = response_usage(resp)
+    tokens_estimated = usage is None
+    if tokens_estimated:
+        usage = (estimate_tokens("".join(contents)), estimate_tokens(text))
+    # Time to first token: first streamed chunk, or the whole call when not streamed
+    ttft = first_chunk_at - started if first_chunk_at is not None else latency
+    llm_metrics.record_call(label, model_name, latency, error=None if text else "empty",
+                            prompt_tokens=usage[0], response_tokens=usage[1], tokens_estimated=tokens_estimated,
+                            cached_tokens=cached_token_count(resp), ttft=ttft)
+    return text
+
+def _hedge_delay(model_name):
+    delay = model_health.latency_percentile(model_name, LLM_HEDGE_PERCENTILE)
+    return delay if delay is not None else LLM_HEDGE_DEFAULT_DELAY_SECONDS
+
+def _fastest(model_names):
+    """Fastest model by latency EWMA; models without data keep their order after measured ones"""
+    measured = [(model_health.latency(m), i, m) for i, m in enumerate(model_names) if model_health.latency(m) is not None]
+    if measured:
+        return min(measured)[2]
+    return model_names[0]
+
+def generate_text(system_prompt, user_prompt, model_candidates, generation_config=None, text_fn=None,
+                  deadline=None, json_accept=None, label="llm"):
+    """
+    Try healthy model candidates (healthiest first) until one returns text, within a deadline.
+    Returns:
+      (raw_text, used_model, errors)
+    A failed attempt moves on to the next candidate immediately; a slow primary is hedged
+    to the fastest remaining candidate. On deadline expiry (None, None, errors) is returned
+    and abandoned calls finish in the background without blocking the caller.
+
+    With `json_accept` (a predicate on the parsed value) the answer is streamed and the
+    stream is closed at the first complete JSON value it accepts; that JSON is the text returned.
+    Every attempt is recorded in llm_metrics under `label` (the prompt it served).
+    """
+    if not model_registry.backend.available:
+        return None, None, [("genai_missing", "google.generativeai library not available")]
+
+    deadline = LLM_DEADLINE_SECONDS if deadline is None else deadline
+    started = time.monotonic()
+    expires_at = started + deadline
+    contents = [system_prompt, user_prompt]
+    stream_json = LLM_STREAM_JSON and json_accept is not None
+    remaining = list(model_health.order(model_candidates))
+    errors = []
+    pending = {}
+    hedged = False
+
+    def launch(model_name):
+        """Start a call; returns the time to hedge it, or None when the LLM pool is full"""
+        timeout = max(0.1, expires_at - time.monotonic())
+        try:
+            # The copied context keeps the caller's request trace (llm_metrics.request_trace)
+            future = llm_pool.submit(contextvars.copy_context().run, _call_model, model_name, contents,
+                                     generation_config, text_fn, timeout, stream_json, json_accept, label)
+        except Overloaded as e:
+            errors.append(("overloaded", str(e)))
+            return None
+        pending[future] = model_name
+        return time.monotonic() + _hedge_delay(model_name)
+
+    if not remaining:
+        return None, None, errors
+    hedge_at = launch(remaining.pop(0))
+    if hedge_at is None:
+        return None, None, errors
+
+    while pending:
+        now = time.monotonic()
+        if now >= expires_at:
+            break
+        wake_at = expires_at if hedged or not remaining else min(expires_at, hedge_at)
+        done, _ = wait(list(pending), timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            model_name = pending.pop(future)
+            try:
+                text = future.result()
+            except Exception as e:
+                errors.append((model_name, repr(e)))
+                text = None
+            else:
+                if not text:
+                    errors.append((model_name, "empty response"))
+            if text:
+                for other in pending:
+                    other.cancel()
+                return text, model_name, errors
+            # Failed or empty: fall through to the next candidate right away
+            if remaining and not pending:
+                hedge_at = launch(remaining.pop(0))
+
+        if not done and not hedged and remaining and time.monotonic() >= hedge_at:
+            hedge_model = _fastest(remaining)
+            remaining.remove(hedge_model)
+            launch(hedge_model)
+            hedged = True
+
+    for future in pending:
+        future.cancel()
+    if pending or time.monotonic() >= expires_at:
+        errors.append(("deadline", f"LLM deadline of {deadline:.1f}s exceeded"))
+        llm_metrics.record_deadline(label)
+    return None, None, errors
+
+def init_models(api_key=None, warm_specs=()):
+    """
+    Configure the LLM backend (Gemini unless LLM_BACKEND says otherwise) and pre-build model handles at startup.
+    `warm_specs` is an iterable of (model_candidates, generation_config) pairs.
+    Returns True when the backend is configured.
+    """
+    configured = model_registry.configure(api_key)
+    if configured:
+        for model_names, generation_config in warm_specs:
+            model_registry.warm(model_names, generation_config)
+    return configured
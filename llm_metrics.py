@@ -0,0 +1,265 @@
+"""
+LLM Call Instrumentation
+Per-model latency and time-to-first-token histograms, token counts (including
+prompt tokens served from cached context), error classes, parse failures and
+local-fallback rates for every Gemini call, exported in the Prometheus text format
+and as a per-request breakdown (see request_trace())
+"""
+import contextvars
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Histogram buckets (seconds) for LLM call latency
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0)
+# Rough characters-per-token ratio used when the SDK reports no usage metadata
+CHARS_PER_TOKEN = 4
+
+_current_trace = contextvars.ContextVar("llm_request_trace", default=None)
+
+def estimate_tokens(text):
+    """Token estimate for a prompt or answer (used when the response carries no usage)"""
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def response_usage(resp):
+    """(prompt_tokens, response_tokens) from a Gemini response or stream chunk, or None"""
+    usage = getattr(resp, "usage_metadata", None)
+    if usage is None:
+        return None
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    response_tokens = getattr(usage, "candidates_token_count", None)
+    if not prompt_tokens and not response_tokens:
+        return None
+    return int(prompt_tokens or 0), int(response_tokens or 0)
+
+def cached_token_count(resp):
+    """Prompt tokens the backend served from cached context (0 when not reported)"""
+    usage = getattr(resp, "usage_metadata", None)
+    return int(getattr(usage, "cached_content_token_count", 0) or 0)
+
+def error_class(error):
+    """Short class name for a failed call ("DeadlineExceeded", "ResourceExhausted", ...)"""
+    return type(error).__name__
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(upper bound, cumulative count)] including +Inf"""
+        total = 0
+        out = []
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-quantile (None without observations)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+class LLMMetrics:
+    """Thread-safe counters and histograms keyed by (prompt label, model)"""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = defaultdict(lambda: Histogram(self.buckets))
+            self.ttft = defaultdict(lambda: Histogram(self.buckets))
+            self.calls = defaultdict(int)             # (prompt, model, outcome)
+            self.errors = defaultdict(int)            # (prompt, model, error_class)
+            self.prompt_tokens = defaultdict(int)     # (prompt, model)
+            self.response_tokens = defaultdict(int)   # (prompt, model)
+            self.cached_tokens = defaultdict(int)     # (prompt, model), included in prompt_tokens
+            self.estimated_token_calls = defaultdict(int)
+            self.deadlines = defaultdict(int)         # prompt
+            self.extractions = defaultdict(int)       # prompt
+            self.parse_failures = defaultdict(int)    # prompt
+            self.fallbacks = defaultdict(int)         # prompt
+
+    def record_call(self, prompt, model, latency, error=None, prompt_tokens=0, response_tokens=0,
+                    tokens_estimated=False, cached_tokens=0, ttft=None):
+        """One model attempt (success, empty answer or exception); `ttft` only for answered calls"""
+        if error is None:
+            outcome, klass = "success", None
+        elif error == "empty":
+            outcome, klass = "empty", "EmptyResponse"
+        else:
+            outcome, klass = "error", error_class(error)
+        with self._lock:
+            self.latency[(prompt, model)].observe(latency)
+            self.calls[(prompt, model, outcome)] += 1
+            if klass:
+                self.errors[(prompt, model, klass)] += 1
+            self.prompt_tokens[(prompt, model)] += prompt_tokens
+            self.response_tokens[(prompt, model)] += response_tokens
+            self.cached_tokens[(prompt, model)] += cached_tokens
+            if ttft is not None:
+                self.ttft[(prompt, model)].observe(ttft)
+            if tokens_estimated:
+                self.estimated_token_calls[(prompt, model)] += 1
+        _trace_append({
+            "type": "call", "prompt": prompt, "model": model, "latency_ms": round(latency * 1000, 1),
+            "outcome": outcome, "error_class": klass, "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens, "response_tokens": response_tokens, "tokens_estimated": tokens_estimated,
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None
+        })
+
+    def record_deadline(self, prompt):
+        """generate_text() gave up after its overall deadline"""
+        with self._lock:
+            self.deadlines[prompt] += 1
+        _trace_append({"type": "deadline", "prompt": prompt})
+
+    def record_extraction(self, prompt, parse_failed, used_fallback):
+        """
+        Outcome of one extraction built on an LLM answer: whether the model text could
+        not be used (unparseable or invalid fields) and whether a local fallback answered
+        """
+        with self._lock:
+            self.extractions[prompt] += 1
+            if parse_failed:
+                self.parse_failures[prompt] += 1
+            if used_fallback:
+                self.fallbacks[prompt] += 1
+        _trace_append({"type": "extraction", "prompt": prompt, "parse_failed": bool(parse_failed),
+                       "used_fallback": bool(used_fallback)})
+
+    def snapshot(self):
+        """JSON-friendly summary: per prompt/model latency quantiles, calls, tokens and rates"""
+        with self._lock:
+            models = {}
+            for (prompt, model), hist in self.latency.items():
+                ttft = self.ttft.get((prompt, model))
+                models[f"{prompt}/{model}"] = {
+                    "calls": hist.count,
+                    "errors": sum(n for (p, m, _), n in self.errors.items() if (p, m) == (prompt, model)),
+                    "latency_p50_le_s": hist.quantile(0.5),
+                    "latency_p95_le_s": hist.quantile(0.95),
+                    "latency_mean_s": round(hist.sum / hist.count, 3) if hist.count else None,
+                    "ttft_mean_s": round(ttft.sum / ttft.count, 3) if ttft and ttft.count else None,
+                    "prompt_tokens": self.prompt_tokens[(prompt, model)],
+                    "prompt_tokens_per_call": round(self.prompt_tokens[(prompt, model)] / hist.count, 1) if hist.count else None,
+                    "cached_prompt_tokens": self.cached_tokens[(prompt, model)],
+                    "response_tokens": self.response_tokens[(prompt, model)],
+                }
+            prompts = {
+                prompt: {
+                    "extractions": count,
+                    "parse_failure_rate": round(self.parse_failures[prompt] / count, 3),
+                    "fallback_rate": round(self.fallbacks[prompt] / count, 3),
+                    "deadlines": self.deadlines[prompt],
+                }
+                for prompt, count in self.extractions.items()
+            }
+            return {"models": models, "prompts": prompts}
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def labels(**values):
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in values.items()) + "}"
+
+        with self._lock:
+            family("llm_call_duration_seconds", "histogram", "Latency of single LLM model attempts")
+            for (prompt, model), hist in sorted(self.latency.items()):
+                for bound, total in hist.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"llm_call_duration_seconds_bucket{labels(prompt=prompt, model=model, le=le)} {total}")
+                lines.append(f"llm_call_duration_seconds_sum{labels(prompt=prompt, model=model)} {hist.sum:.6f}")
+                lines.append(f"llm_call_duration_seconds_count{labels(prompt=prompt, model=model)} {hist.count}")
+
+            family("llm_time_to_first_token_seconds", "histogram", "Time to the first answer chunk of LLM model attempts")
+            for (prompt, model), hist in sorted(self.ttft.items()):
+                for bound, total in hist.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"llm_time_to_first_token_seconds_bucket{labels(prompt=prompt, model=model, le=le)} {total}")
+                lines.append(f"llm_time_to_first_token_seconds_sum{labels(prompt=prompt, model=model)} {hist.sum:.6f}")
+                lines.append(f"llm_time_to_first_token_seconds_count{labels(prompt=prompt, model=model)} {hist.count}")
+
+            family("llm_calls_total", "counter", "LLM model attempts by outcome")
+            for (prompt, model, outcome), n in sorted(self.calls.items()):
+                lines.append(f"llm_calls_total{labels(prompt=prompt, model=model, outcome=outcome)} {n}")
+
+            family("llm_call_errors_total", "counter", "Failed LLM model attempts by error class")
+            for (prompt, model, klass), n in sorted(self.errors.items()):
+                lines.append(f"llm_call_errors_total{labels(prompt=prompt, model=model, error_class=klass)} {n}")
+
+            family("llm_prompt_tokens_total", "counter", "Prompt tokens sent (estimated when the SDK reports no usage)")
+            for (prompt, model), n in sorted(self.prompt_tokens.items()):
+                lines.append(f"llm_prompt_tokens_total{labels(prompt=prompt, model=model)} {n}")
+
+            family("llm_cached_prompt_tokens_total", "counter", "Prompt tokens served from cached context")
+            for (prompt, model), n in sorted(self.cached_tokens.items()):
+                lines.append(f"llm_cached_prompt_tokens_total{labels(prompt=prompt, model=model)} {n}")
+
+            family("llm_response_tokens_total", "counter", "Response tokens received (estimated when the SDK reports no usage)")
+            for (prompt, model), n in sorted(self.response_tokens.items()):
+                lines.append(f"llm_response_tokens_total{labels(prompt=prompt, model=model)} {n}")
+
+            family("llm_deadline_exceeded_total", "counter", "LLM requests abandoned at the overall deadline")
+            for prompt, n in sorted(self.deadlines.items()):
+                lines.append(f"llm_deadline_exceeded_total{labels(prompt=prompt)} {n}")
+
+            family("llm_extractions_total", "counter", "Extractions that asked the LLM")
+            for prompt, n in sorted(self.extractions.items()):
+                lines.append(f"llm_extractions_total{labels(prompt=prompt)} {n}")
+
+            family("llm_parse_failures_total", "counter", "LLM answers that could not be parsed or validated")
+            for prompt, n in sorted(self.parse_failures.items()):
+                lines.append(f"llm_parse_failures_total{labels(prompt=prompt)} {n}")
+
+            family("llm_local_fallbacks_total", "counter", "Extractions answered by a local fallback after the LLM")
+            for prompt, n in sorted(self.fallbacks.items()):
+                lines.append(f"llm_local_fallbacks_total{labels(prompt=prompt)} {n}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+llm_metrics = LLMMetrics()
+
+# --- Per-request breakdown ---
+def _trace_append(entry):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append(entry)
+
+@contextmanager
+def request_trace():
+    """
+    Collect every LLM event of the current request into a list. Work handed to other
+    threads keeps reporting into it when run through contextvars.copy_context().run
+    """
+    trace = []
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
@@ -0,0 +1,289 @@
+"""
+Local-First Trip Extraction
+Confidence-scored local matching of destination and duration that answers simple
+queries ("5 days in Dubai") without a Gemini call. Ambiguous queries escalate to the
+cached LLM extractors. Every answer records the path that produced it, and a sample
+of local answers is shadow-checked against the LLM to track agreement.
+"""
+import os
+import random
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from core import stated_duration_days, local_trip_dates, resolve_trip_dates, get_trip_dates
+from iata_extractor import extract_iata_from_query
+from gazetteer import gazetteer
+from fuzzy_index import fuzzy_index
+from trip_extractor import extract_trip, extract_trips_batch, TRIP_BATCH_PROMPT_VERSION
+from query_cache import (
+    normalize_query, cached_extract_trip, cached_extract_iata, cached_get_trip_dates,
+    cached_trip_lookup, store_trip_result, query_cache
+)
+
+# Minimum score for a local answer to skip the LLM
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", "0.9"))
+# Fraction of local answers re-checked by the LLM in the background
+LOCAL_SHADOW_SAMPLE_RATE = float(os.getenv("LOCAL_SHADOW_SAMPLE_RATE", "0.05"))
+LOCAL_SHADOW_MAX_PENDING = int(os.getenv("LOCAL_SHADOW_MAX_PENDING", "4"))
+# Batch extraction: queries per multi-item prompt, and concurrent prompts across all batches
+TRIP_BATCH_SIZE = int(os.getenv("TRIP_BATCH_SIZE", "10"))
+TRIP_BATCH_MAX_PARALLEL = int(os.getenv("TRIP_BATCH_MAX_PARALLEL", "4"))
+
+def local_match_destination(user_query, origin_text=None):
+    """
+    Destination mentioned in the query (exact aliases first, then typo-tolerant;
+    the origin itself is ignored). Returns
+    {"destination_city", "iata_code", "iata_codes", "confidence", "score"} where score is 0 when
+    nothing matched and low when several distinct destinations are mentioned
+    """
+    match = gazetteer.resolve(user_query, origin=origin_text)
+    if not match["iata_code"]:
+        match = fuzzy_index.resolve(user_query, origin=origin_text)
+    return {
+        "destination_city": match["destination_city"],
+        "iata_code": match["iata_code"],
+        "iata_codes": match["iata_codes"],
+        "confidence": match["confidence"],
+        "score": match["score"]
+    }
+
+def local_match_duration(user_query, max_duration=365):
+    """
+    Duration in days stated in the query, or spanned by its explicit dates. Returns
+    {"duration_days", "score"}; score is 0 for missing, conflicting, ranged or out-of-bounds durations
+    """
+    dates = local_trip_dates(user_query, max_duration)
+    days = dates[0] if dates else stated_duration_days(user_query, max_duration)
+    if days is None:
+        return {"duration_days": None, "score": 0.0}
+    return {"duration_days": days, "score": 0.95}
+
+def local_extract_trip(user_query, max_duration=365, origin_text=None):
+    """
+    Local destination + duration match. Returns a dict shaped like extract_trip()
+    (plus "score"), or None when the query is ambiguous
+    """
+    if not user_query:
+        return None
+    destination = local_match_destination(user_query, origin_text)
+    duration = local_match_duration(user_query, max_duration)
+    score = min(destination["score"], duration["score"])
+    if score < LOCAL_CONFIDENCE_THRESHOLD:
+        return None
+
+    _, departure, return_date = resolve_trip_dates(user_query, duration["duration_days"], max_duration)
+    return {
+        "destination_city": destination["destination_city"],
+        "iata_code": destination["iata_code"],
+        "iata_codes": destination["iata_codes"],
+        "confidence": destination["confidence"],
+        "iata_used_fallback": False,
+        "duration_days": duration["duration_days"],
+        "departure_date": departure,
+        "return_date": return_date,
+        "raw_model_output": None,
+        "model_used": "local",
+        "used_fallback": False,
+        "error": None,
+        "score": score
+    }
+
+# --- Path accounting and shadow evaluation ---
+class ExtractionPathStats:
+    """Counts which path answered each request and how often local answers agreed with the LLM"""
+    def __init__(self, max_disagreements=20):
+        self._lock = threading.Lock()
+        self.answered_by = {"local": 0, "cache": 0, "llm": 0, "fallback": 0}
+        self.shadow = {"sampled": 0, "dropped": 0, "compared": 0, "destination_agree": 0,
+                       "duration_agree": 0, "both_agree": 0}
+        self.disagreements = deque(maxlen=max_disagreements)
+        self.pending = 0
+
+    def record(self, path):
+        with self._lock:
+            self.answered_by[path] = self.answered_by.get(path, 0) + 1
+
+    def record_shadow(self, query, local, llm):
+        """Compare the fields the local answer produced with the LLM answer"""
+        dest_agree = None
+        if local.get("iata_code") and llm.get("iata_code"):
+            local_codes = set(local.get("iata_codes") or [local["iata_code"]])
+            dest_agree = bool(local_codes & set(llm.get("iata_codes") or [llm["iata_code"]]))
+        days_agree = None
+        if local.get("duration_days") is not None and llm.get("duration_days") is not None:
+            days_agree = local["duration_days"] == llm["duration_days"]
+        with self._lock:
+            self.shadow["compared"] += 1
+            self.shadow["destination_agree"] += dest_agree is not False
+            self.shadow["duration_agree"] += days_agree is not False
+            if dest_agree is not False and days_agree is not False:
+                self.shadow["both_agree"] += 1
+            else:
+                self.disagreements.append({
+                    "query": query,
+                    "local": [local.get("iata_code"), local.get("duration_days")],
+                    "llm": [llm.get("iata_code"), llm.get("duration_days")]
+                })
+
+    def snapshot(self):
+        with self._lock:
+            compared = self.shadow["compared"]
+            return {
+                "answered_by": dict(self.answered_by),
+                "shadow": dict(self.shadow),
+                "shadow_agreement_rate": round(self.shadow["both_agree"] / compared, 4) if compared else None,
+                "recent_disagreements": list(self.disagreements)
+            }
+
+path_stats = ExtractionPathStats()
+shadow_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="shadow")
+batch_executor = ThreadPoolExecutor(max_workers=TRIP_BATCH_MAX_PARALLEL, thread_name_prefix="trip-batch")
+
+def _shadow_check(query, local, llm_fn, stats):
+    try:
+        llm = llm_fn()
+        # Only model-derived fields are worth comparing against
+        if llm.get("iata_used_fallback") or llm.get("used_fallback"):
+            llm = {**llm, "iata_code": None if llm.get("iata_used_fallback") else llm.get("iata_code"),
+                   "duration_days": None if llm.get("used_fallback") else llm.get("duration_days")}
+        if llm.get("iata_code") is None and llm.get("duration_days") is None:
+            return
+        stats.record_shadow(query, local, llm)
+    except Exception as e:
+        print(f"WARNING: Shadow extraction failed: {e}")
+    finally:
+        with stats._lock:
+            stats.pending -= 1
+
+def _maybe_shadow(query, local, llm_fn, stats, sample_rate):
+    """Re-run a sample of local answers through the LLM in the background"""
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return
+    with stats._lock:
+        if stats.pending >= LOCAL_SHADOW_MAX_PENDING:
+            stats.shadow["dropped"] += 1
+            return
+        stats.pending += 1
+        stats.shadow["sampled"] += 1
+    shadow_executor.submit(_shadow_check, query, local, llm_fn, stats)
+
+def _llm_path(result, *fallback_flags):
+    if result.get("model_used") == "local":
+        return "local"
+    if result.get("cached"):
+        return "cache"
+    if any(result.get(flag) for flag in fallback_flags):
+        return "fallback"
+    return "llm"
+
+# --- Local-first extractors ---
+def fast_extract_trip(origin_text, user_query, fallback_days=7, max_duration=365,
+                      stats=path_stats, sample_rate=LOCAL_SHADOW_SAMPLE_RATE):
+    """
+    cached_extract_trip() behind the local matcher. The result gains
+    "answered_by": "local" | "cache" | "llm" | "fallback"
+    """
+    local = local_extract_trip(user_query, max_duration, origin_text)
+    if local is not None:
+        stats.record("local")
+        _maybe_shadow(user_query, local, lambda: extract_trip(origin_text, user_query, fallback_days, max_duration),
+                      stats, sample_rate)
+        return {**local, "cached": False, "answered_by": "local"}
+
+    result = cached_extract_trip(origin_text, user_query, fallback_days=fallback_days, max_duration=max_duration)
+    path = _llm_path(result, "iata_used_fallback", "used_fallback")
+    stats.record(path)
+    return {**result, "answered_by": path}
+
+def fast_extract_iata(user_query, origin_text=None, stats=path_stats, sample_rate=LOCAL_SHADOW_SAMPLE_RATE):
+    """cached_extract_iata() behind the local destination matcher (split extraction mode)"""
+    local = local_match_destination(user_query or "", origin_text)
+    if local["score"] >= LOCAL_CONFIDENCE_THRESHOLD:
+        stats.record("local")
+        _maybe_shadow(user_query, local, lambda: extract_iata_from_query(user_query), stats, sample_rate)
+        return {
+            "destination_city": local["destination_city"], "iata_code": local["iata_code"],
+            "iata_codes": local["iata_codes"], "confidence": local["confidence"], "raw_output": None, "model_used": "local",
+            "used_fallback": False, "error": None, "cached": False, "answered_by": "local"
+        }
+
+    result = cached_extract_iata(user_query)
+    path = _llm_path(result, "used_fallback")
+    stats.record(path)
+    return {**result, "answered_by": path}
+
+def fast_get_trip_dates(origin_text, user_query, fallback_days=7, max_duration=365,
+                        stats=path_stats, sample_rate=LOCAL_SHADOW_SAMPLE_RATE):
+    """cached_get_trip_dates() behind the local duration matcher (split extraction mode)"""
+    local = local_match_duration(user_query or "", max_duration)
+    if local["score"] >= LOCAL_CONFIDENCE_THRESHOLD:
+        stats.record("local")
+        _maybe_shadow(user_query, local, lambda: get_trip_dates(origin_text, user_query, fallback_days, max_duration),
+                      stats, sample_rate)
+        _, departure, return_date = resolve_trip_dates(user_query, local["duration_days"], max_duration)
+        return {
+            "duration_days": local["duration_days"], "departure_date": departure, "return_date": return_date,
+            "raw_model_output": None, "model_used": "local", "used_fallback": False, "error": None,
+            "cached": False, "answered_by": "local"
+        }
+
+    result = cached_get_trip_dates(origin_text, user_query, fallback_days=fallback_days, max_duration=max_duration)
+    path = _llm_path(result, "used_fallback")
+    stats.record(path)
+    return {**result, "answered_by": path}
+
+def fast_extract_trips(origin_text, user_queries, fallback_days=7, max_duration=365,
+                       batch_size=TRIP_BATCH_SIZE, stats=path_stats, sample_rate=LOCAL_SHADOW_SAMPLE_RATE,
+                       cache=query_cache):
+    """
+    Batch version of fast_extract_trip(). Queries are de-duplicated by normalized text;
+    local and cached answers return immediately, the rest are packed `batch_size` per
+    prompt and sent with bounded parallelism. Batch answers are cached under the batch
+    prompt version. Returns (results in input order, summary)
+    """
+    unique = {}
+    for query in user_queries:
+        unique.setdefault(normalize_query(query), query)
+
+    answers = {}
+    pending = []
+    for key, query in unique.items():
+        local = local_extract_trip(query, max_duration, origin_text)
+        if local is not None:
+            stats.record("local")
+            _maybe_shadow(query, local, lambda q=query: extract_trip(origin_text, q, fallback_days, max_duration),
+                          stats, sample_rate)
+            answers[key] = {**local, "cached": False, "answered_by": "local"}
+            continue
+        cached = cached_trip_lookup(origin_text, query, max_duration, cache, TRIP_BATCH_PROMPT_VERSION)
+        if cached is not None:
+            stats.record("cache")
+            answers[key] = {**cached, "answered_by": "cache"}
+            continue
+        pending.append(key)
+
+    chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    futures = [
+        # Copied context: batch calls still report into the caller's request trace
+        batch_executor.submit(contextvars.copy_context().run, extract_trips_batch, origin_text,
+                              [unique[key] for key in chunk], fallback_days, max_duration)
+        for chunk in chunks
+    ]
+    for chunk, future in zip(chunks, futures):
+        for key, result in zip(chunk, future.result()):
+            store_trip_result(origin_text, unique[key], result, cache, TRIP_BATCH_PROMPT_VERSION)
+            path = _llm_path(result, "iata_used_fallback", "used_fallback")
+            stats.record(path)
+            answers[key] = {**result, "cached": False, "answered_by": path}
+
+    results = [answers[normalize_query(query)] for query in user_queries]
+    summary = {
+        "queries": len(user_queries),
+        "unique_queries": len(unique),
+        "llm_calls": len(chunks),
+        "answered_by": {path: sum(1 for a in answers.values() if a["answered_by"] == path)
+                        for path in ("local", "cache", "llm", "fallback")}
+    }
+    return results, summary
@@ -0,0 +1,152 @@
+"""
+Prompt Registry
+Versioned system prompts for every extraction, in a full form (the original few-shot
+prompts) and a compact form (same rules, one example). PROMPT_STYLE picks the form.
+System prompts are static text; per-request context (origin, query) goes in the user
+message, so a backend that supports context caching can hold the system prompt once
+and reuse it across requests (see llm_client.ModelRegistry.handle_for).
+"""
+import os
+
+from llm_metrics import estimate_tokens
+
+# "full" (default) or "compact"; compact stays opt-in until a Gemini run shows no accuracy loss
+PROMPT_STYLE = os.getenv("PROMPT_STYLE", "full")
+
+class SystemPrompt:
+    """One version of a system prompt; `key` ("iata-v2") goes into extraction cache keys"""
+    def __init__(self, name, version, text):
+        self.name = name
+        self.version = version
+        self.text = text
+        self.key = f"{name}-{version}"
+        self.tokens = estimate_tokens(text)
+
+# --- Full prompts (v1; v3 where the Japan example moved to HND, the airport the gazetteer ranks first) ---
+_IATA_FULL = """You are an expert travel assistant that extracts destination information from natural language queries.
+
+Your task: Extract the DESTINATION city/country/airport from the user's trip query and return its IATA airport code.
+
+RETURN ONLY a JSON object with these fields:
+{
+  "destination_city": "<city or country name>",
+  "iata_code": "<3-letter IATA code>",
+  "confidence": "<high|medium|low>"
+}
+
+Examples:
+Input: "plan trip to swiss for 7 days" => {"destination_city": "Zurich", "iata_code": "ZRH", "confidence": "high"}
+Input: "weekend in paris" => {"destination_city": "Paris", "iata_code": "CDG", "confidence": "high"}
+Input: "vacation in Dubai" => {"destination_city": "Dubai", "iata_code": "DXB", "confidence": "high"}
+Input: "trip to Thailand" => {"destination_city": "Bangkok", "iata_code": "BKK", "confidence": "medium"}
+Input: "visiting London" => {"destination_city": "London", "iata_code": "LHR", "confidence": "high"}
+
+Rules:
+- For countries, use the main/capital airport
+- For Switzerland: ZRH (Zurich)
+- For Thailand: BKK (Bangkok)
+- For UK/England: LHR (London)
+- For Japan: HND (Tokyo)
+- Always return valid 3-letter IATA codes
+- If unsure, set confidence to "medium" or "low"
+
+Return ONLY valid JSON, no markdown, no commentary."""
+
+_DURATION_FULL = (
+    "You are a short and strict extractor. The user has a trip request in plain English "
+    "and an origin provided separately. Your job: infer the trip DURATION (in days) the user intends.\n\n"
+    "RETURN ONLY a JSON object and NOTHING ELSE. The JSON must contain a single key:\n"
+    '  "duration_days": <integer number of days>\n'
+    "If you cannot determine it with confidence, still return a reasonable integer or the string 'UNKNOWN' for duration_days.\n\n"
+    "Examples:\n"
+    'Input: "plan trip to swiss for 7 days" => {"duration_days":7}\n'
+    'Input: "trip for a week" => {"duration_days":7}\n'
+    'Input: "weekend in paris" => {"duration_days":2}\n'
+    "Do NOT include commentary, markdown, or extra fields. Return valid JSON only."
+)
+
+_TRIP_FULL = """You are a short and strict travel query extractor.
+
+From the user's trip query extract the DESTINATION and the trip DURATION in days.
+
+RETURN ONLY a JSON object with these fields:
+{
+  "destination_city": "<city or country name>",
+  "iata_code": "<3-letter IATA code of the main airport>",
+  "alternate_iata_codes": ["<other relevant airports, may be empty>"],
+  "confidence": "<high|medium|low>",
+  "duration_days": <integer number of days, or "UNKNOWN">
+}
+
+Examples:
+Input: "plan trip to swiss for 7 days" => {"destination_city": "Zurich", "iata_code": "ZRH", "alternate_iata_codes": ["GVA"], "confidence": "high", "duration_days": 7}
+Input: "weekend in paris" => {"destination_city": "Paris", "iata_code": "CDG", "alternate_iata_codes": ["ORY"], "confidence": "high", "duration_days": 2}
+Input: "trip to Thailand for a week" => {"destination_city": "Bangkok", "iata_code": "BKK", "alternate_iata_codes": ["HKT"], "confidence": "medium", "duration_days": 7}
+Input: "visiting London" => {"destination_city": "London", "iata_code": "LHR", "alternate_iata_codes": ["LGW"], "confidence": "high", "duration_days": "UNKNOWN"}
+
+Rules:
+- For countries, use the main/capital airport (Switzerland: ZRH, UK/England: LHR, Japan: HND)
+- A weekend is 2 days, a week is 7 days
+- Always return valid 3-letter IATA codes
+- If unsure about the destination, set confidence to "medium" or "low"
+
+Return ONLY valid JSON, no markdown, no commentary."""
+
+_TRIP_BATCH_FULL = _TRIP_FULL + """
+
+BATCH MODE: the user message is a JSON list of {"id": <number>, "query": "<trip query>"}.
+Apply the rules above to EACH query and return ONLY a JSON array with one object per query,
+in the format above plus the matching "id" field. Example:
+[{"id": 0, "destination_city": "Dubai", "iata_code": "DXB", "alternate_iata_codes": [], "confidence": "high", "duration_days": 5}]"""
+
+# --- Compact prompts (v2; v4 with the HND Japan example): the same fields and rules, one example each ---
+_IATA_COMPACT = """Extract the trip DESTINATION from the user query. Reply with JSON only:
+{"destination_city": "<city or country>", "iata_code": "<3-letter IATA code>", "confidence": "high|medium|low"}
+Countries: main/capital airport (Switzerland ZRH, Thailand BKK, UK LHR, Japan HND). Unsure: confidence medium or low.
+Example: "weekend in paris" => {"destination_city": "Paris", "iata_code": "CDG", "confidence": "high"}"""
+
+_DURATION_COMPACT = """Extract the trip DURATION in days from the user query. Reply with JSON only:
+{"duration_days": <integer, or "UNKNOWN">}
+A weekend is 2 days, a week 7. Example: "trip for a week" => {"duration_days": 7}"""
+
+_TRIP_COMPACT = """Extract the trip DESTINATION and DURATION in days from the user query. Reply with JSON only:
+{"destination_city": "<city or country>", "iata_code": "<3-letter IATA code of the main airport>", "alternate_iata_codes": ["<other airports, may be empty>"], "confidence": "high|medium|low", "duration_days": <integer, or "UNKNOWN">}
+Countries: main/capital airport (Switzerland ZRH, UK LHR, Japan HND). A weekend is 2 days, a week 7. Unsure destination: confidence medium or low.
+Example: "weekend in paris" => {"destination_city": "Paris", "iata_code": "CDG", "alternate_iata_codes": ["ORY"], "confidence": "high", "duration_days": 2}"""
+
+_TRIP_BATCH_COMPACT = _TRIP_COMPACT + """
+BATCH MODE: the user message is a JSON list of {"id", "query"} items. Reply with ONLY a JSON array holding one object per query, as above plus its "id"."""
+
+PROMPTS = {
+    "full": {
+        "iata": SystemPrompt("iata", "v3", _IATA_FULL),
+        "duration": SystemPrompt("duration", "v1", _DURATION_FULL),
+        "trip": SystemPrompt("trip", "v3", _TRIP_FULL),
+        "trip_batch": SystemPrompt("trip_batch", "v3", _TRIP_BATCH_FULL),
+    },
+    "compact": {
+        "iata": SystemPrompt("iata", "v4", _IATA_COMPACT),
+        "duration": SystemPrompt("duration", "v2", _DURATION_COMPACT),
+        "trip": SystemPrompt("trip", "v4", _TRIP_COMPACT),
+        "trip_batch": SystemPrompt("trip_batch", "v4", _TRIP_BATCH_COMPACT),
+    },
+}
+
+def get_prompt(name, style=None):
+    """SystemPrompt for an extraction ("iata", "duration", "trip", "trip_batch") in the configured style"""
+    style = style or PROMPT_STYLE
+    if style not in PROMPTS:
+        print(f"WARNING: Unknown PROMPT_STYLE {style!r}, using full")
+        style = "full"
+    return PROMPTS[style][name]
+
+def user_message(body, origin_text=None):
+    """User message: per-request context first, then the query text ("User query: ..." / "Queries: [...]")"""
+    return f"Origin: {origin_text}\n{body}" if origin_text else body
+
+def prompt_sizes():
+    """Estimated system prompt tokens per extraction, full vs compact"""
+    return {
+        name: {style: PROMPTS[style][name].tokens for style in PROMPTS}
+        for name in PROMPTS["full"]
+    }
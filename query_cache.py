@@ -0,0 +1,186 @@
+"""
+Extraction Query Cache
+Caches LLM extraction results keyed by prompt version, origin (for prompts that include
+it) and normalized query text. Entries live in an in-memory LRU backed by a SQLite file
+(query_cache.sqlite3 next to this module) so they survive restarts; set QUERY_CACHE_DB to
+another path, or to an empty value to keep the cache in memory only.
+Trip dates are never cached: they are recomputed from the cached duration at read time.
+"""
+import os
+import re
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from core import (
+    get_trip_dates, resolve_trip_dates, words_to_number, NUMBER_WORDS, DURATION_PROMPT_VERSION
+)
+from iata_extractor import extract_iata_from_query, IATA_PROMPT_VERSION
+from trip_extractor import extract_trip, TRIP_PROMPT_VERSION, TRIP_BATCH_PROMPT_VERSION
+
+# SQLite file for persistence; an empty value keeps the cache in memory only
+QUERY_CACHE_DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_cache.sqlite3")
+QUERY_CACHE_DB = os.getenv("QUERY_CACHE_DB", QUERY_CACHE_DEFAULT_DB)
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "5000"))
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# --- Query normalization ---
+_TOKEN_RE = re.compile(r"[a-z]+|\d+")
+
+def normalize_query(text):
+    """
+    Normalize a query for cache keys: lowercase, punctuation and extra whitespace removed,
+    number words folded into digits ("Seven Days in Dubai!" -> "7 days in dubai")
+    """
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    out = []
+    number_run = []
+    for token in tokens + [None]:
+        if token is not None and token in NUMBER_WORDS:
+            number_run.append(token)
+            continue
+        if number_run:
+            out.append(str(words_to_number(" ".join(number_run)) or 0))
+            number_run = []
+        if token is not None:
+            out.append(token)
+    return " ".join(out)
+
+def cache_key(kind, prompt_version, query, origin_text=None):
+    """
+    Cache key for one extraction. Prompts that carry "Origin: X" (duration, trip) pass
+    origin_text, so an answer given for one origin is not served to another.
+    """
+    origin = (origin_text or "").strip().upper()
+    return f"{kind}|{prompt_version}|{origin}|{normalize_query(query)}"
+
+# --- Two-level cache ---
+class QueryCache:
+    """In-memory LRU in front of an optional SQLite table (an empty db_path disables persistence)"""
+    def __init__(self, db_path=QUERY_CACHE_DB, max_entries=QUERY_CACHE_MAX_ENTRIES, ttl_seconds=QUERY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except Exception as e:
+                print(f"WARNING: Query cache persistence disabled ({db_path}): {e}")
+                self._db = None
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM extraction_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    entry = (json.loads(row[0]), row[1])
+                    self._remember(key, *entry)
+            if entry is None or now - entry[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, value, created_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO extraction_cache (key, value, created_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), created_at)
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    print(f"WARNING: Could not persist cache entry: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries_in_memory": len(self._memory),
+                "hits": self.hits,
+                "misses": self.misses,
+                "persistent": self._db is not None
+            }
+
+query_cache = QueryCache()
+
+def _with_dates(cached, user_query, max_duration):
+    duration_days, departure, return_date = resolve_trip_dates(user_query, cached["duration_days"], max_duration)
+    return {**cached, "duration_days": duration_days, "departure_date": departure, "return_date": return_date,
+            "cached": True}
+
+# --- Cached extractors ---
+def cached_extract_iata(user_query, cache=query_cache):
+    """extract_iata_from_query() with caching of model-derived answers"""
+    key = cache_key("iata", IATA_PROMPT_VERSION, user_query)
+    cached = cache.get(key)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    result = extract_iata_from_query(user_query)
+    if result.get("iata_code") and not result.get("used_fallback") and result.get("model_used") != "local":
+        cache.set(key, result)
+    return {**result, "cached": False}
+
+def cached_get_trip_dates(origin_text, user_query, fallback_days=7, max_duration=365, cache=query_cache):
+    """get_trip_dates() with caching of the model-derived duration (dates recomputed on read)"""
+    key = cache_key("duration", DURATION_PROMPT_VERSION, user_query, origin_text)
+    cached = cache.get(key)
+    if cached is not None and 1 <= cached["duration_days"] <= max_duration:
+        return _with_dates(cached, user_query, max_duration)
+
+    result = get_trip_dates(origin_text, user_query, fallback_days=fallback_days, max_duration=max_duration)
+    if not result.get("used_fallback") and result.get("model_used") != "local":
+        cache.set(key, {k: v for k, v in result.items() if k not in ("departure_date", "return_date")})
+    return {**result, "cached": False}
+
+def cached_trip_lookup(origin_text, user_query, max_duration=365, cache=query_cache,
+                       prompt_version=TRIP_PROMPT_VERSION):
+    """
+    Cached trip answer for a query from an origin (dates recomputed), or None.
+    prompt_version is TRIP_BATCH_PROMPT_VERSION for answers from extract_trips_batch()
+    """
+    cached = cache.get(cache_key("trip", prompt_version, user_query, origin_text))
+    if cached is not None and 1 <= cached["duration_days"] <= max_duration:
+        return _with_dates(cached, user_query, max_duration)
+    return None
+
+def store_trip_result(origin_text, user_query, result, cache=query_cache, prompt_version=TRIP_PROMPT_VERSION):
+    """Cache a trip result if the model supplied both fields, under the prompt that produced it"""
+    if result.get("iata_code") and not result.get("iata_used_fallback") and not result.get("used_fallback"):
+        cache.set(cache_key("trip", prompt_version, user_query, origin_text),
+                  {k: v for k, v in result.items() if k not in ("departure_date", "return_date")})
+
+def cached_extract_trip(origin_text, user_query, fallback_days=7, max_duration=365, cache=query_cache):
+    """extract_trip() with caching; only answers where the model supplied both fields are stored"""
+    cached = cached_trip_lookup(origin_text, user_query, max_duration, cache)
+    if cached is not None:
+        return cached
+
+    result = extract_trip(origin_text, user_query, fallback_days=fallback_days, max_duration=max_duration)
+    store_trip_result(origin_text, user_query, result, cache)
+    return {**result, "cached": False}
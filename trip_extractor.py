@@ -0,0 +1,188 @@
+"""
+Combined Trip Extraction
+One Gemini call returns destination (city, IATA code(s), confidence) and duration together,
+with the existing local fallbacks applied per field
+"""
+import os
+import json
+
+from core import (
+    call_gemini_json, extract_json_object, extract_json_array, coerce_duration_value,
+    extract_duration_days_full, resolve_trip_dates
+)
+from llm_client import LLM_DEADLINE_SECONDS, json_generation_config
+from llm_metrics import llm_metrics
+from iata_extractor import MODEL_CANDIDATES, parse_iata_fields, local_iata_fallback
+from prompts import get_prompt, user_message
+
+TRIP_GENERATION_CONFIG = json_generation_config(max_output_tokens=384)
+# Batch answers grow with the number of queries (batch sizes are bounded, so few distinct configs)
+TRIP_BATCH_TOKENS_PER_ITEM = 96
+
+# Versioned system prompts (prompts.py); the key is part of extraction cache keys
+TRIP_PROMPT = get_prompt("trip")
+TRIP_PROMPT_VERSION = TRIP_PROMPT.key
+SYSTEM_PROMPT_TRIP = TRIP_PROMPT.text
+# Batch mode: the same rules, applied to a numbered list of queries
+TRIP_BATCH_PROMPT = get_prompt("trip_batch")
+TRIP_BATCH_PROMPT_VERSION = TRIP_BATCH_PROMPT.key
+SYSTEM_PROMPT_TRIP_BATCH = TRIP_BATCH_PROMPT.text
+# Extra deadline per query in a batch call (longer answers take longer to generate)
+TRIP_BATCH_SECONDS_PER_ITEM = float(os.getenv("TRIP_BATCH_SECONDS_PER_ITEM", "0.5"))
+
+def _parse_alternate_codes(value, primary):
+    """Validated, de-duplicated alternate IATA codes (excluding the primary code)"""
+    codes = []
+    if isinstance(value, list):
+        for code in value:
+            if isinstance(code, str) and len(code) == 3 and code.isalpha():
+                code = code.upper()
+                if code != primary and code not in codes:
+                    codes.append(code)
+    return codes
+
+def _trip_result(user_query, parsed, raw_text, used_model, error, fallback_days, max_duration, label="trip"):
+    """Build an extract_trip() result from one parsed model object (or None), with local fallbacks"""
+    destination_city, iata_code, confidence = None, None, "low"
+    alternates = []
+    duration_days = None
+
+    if parsed is not None:
+        try:
+            if not isinstance(parsed, dict):
+                raise ValueError("model output is not a JSON object")
+            destination_city, iata_code, confidence, error = parse_iata_fields(parsed)
+            alternates = _parse_alternate_codes(parsed.get("alternate_iata_codes"), iata_code)
+            duration_days, duration_error = coerce_duration_value(parsed.get("duration_days"), max_duration)
+            if duration_error:
+                error = (error or "") + duration_error
+        except Exception as e:
+            error = f"Model JSON parse error: {repr(e)}"
+
+    llm_metrics.record_extraction(label, parse_failed=bool(raw_text) and (not iata_code or duration_days is None),
+                                  used_fallback=not iata_code or duration_days is None)
+
+    # Per-field local fallbacks
+    iata_used_fallback = False
+    if not iata_code:
+        iata_used_fallback = True
+        fallback = local_iata_fallback(user_query)
+        if fallback["iata_code"]:
+            destination_city = fallback["destination_city"]
+            iata_code = fallback["iata_code"]
+            confidence = fallback["confidence"]
+            alternates = fallback["iata_codes"][1:]
+
+    used_fallback = False
+    if duration_days is None:
+        used_fallback = True
+        duration_days = extract_duration_days_full(user_query, fallback=fallback_days)
+
+    duration_days, departure, return_date = resolve_trip_dates(user_query, duration_days, max_duration)
+
+    return {
+        "destination_city": destination_city,
+        "iata_code": iata_code,
+        "iata_codes": ([iata_code] + alternates) if iata_code else [],
+        "confidence": confidence,
+        "iata_used_fallback": iata_used_fallback,
+        "duration_days": int(duration_days),
+        "departure_date": departure,
+        "return_date": return_date,
+        "raw_model_output": raw_text,
+        "model_used": used_model,
+        "used_fallback": used_fallback,
+        "error": error
+    }
+
+def extract_trip(origin_text, user_query, fallback_days=7, max_duration=365):
+    """
+    Extract destination and duration with a single Gemini call. Returns:
+      {
+        "destination_city": str|None,
+        "iata_code": str|None,
+        "iata_codes": [str],          # primary code first, then alternates
+        "confidence": str,
+        "iata_used_fallback": bool,
+        "duration_days": int,
+        "departure_date": date,
+        "return_date": date,
+        "raw_model_output": str|None,
+        "model_used": str|None,
+        "used_fallback": bool,        # True when the local duration extractor was used
+        "error": str|None
+      }
+    """
+    raw_text, used_model, errors = call_gemini_json(
+        SYSTEM_PROMPT_TRIP, user_message(f"User query: {user_query}", origin_text),
+        model_candidates=MODEL_CANDIDATES, generation_config=TRIP_GENERATION_CONFIG,
+        json_accept=lambda value: isinstance(value, dict) and "iata_code" in value, label="trip"
+    )
+
+    parsed, error = None, None
+    if raw_text:
+        try:
+            parsed = extract_json_object(raw_text)
+        except Exception as e:
+            error = f"Model JSON parse error: {repr(e)}"
+    else:
+        error = "No model text returned"
+
+    return _trip_result(user_query, parsed, raw_text, used_model, error, fallback_days, max_duration)
+
+def extract_trips_batch(origin_text, user_queries, fallback_days=7, max_duration=365):
+    """
+    Extract several queries with one Gemini call. Returns one extract_trip()-shaped
+    result per query, in order; items the model skipped get the local fallbacks.
+    """
+    if not user_queries:
+        return []
+    items = [{"id": i, "query": query} for i, query in enumerate(user_queries)]
+    deadline = LLM_DEADLINE_SECONDS + TRIP_BATCH_SECONDS_PER_ITEM * len(items)
+    generation_config = json_generation_config(
+        max_output_tokens=TRIP_GENERATION_CONFIG["max_output_tokens"] + TRIP_BATCH_TOKENS_PER_ITEM * len(items)
+    )
+    raw_text, used_model, errors = call_gemini_json(
+        SYSTEM_PROMPT_TRIP_BATCH, user_message("Queries: " + json.dumps(items), origin_text),
+        model_candidates=MODEL_CANDIDATES, generation_config=generation_config, deadline=deadline,
+        json_accept=lambda value: isinstance(value, list), label="trip_batch"
+    )
+
+    by_id, error = {}, None
+    if raw_text:
+        try:
+            parsed = extract_json_array(raw_text)
+            if not isinstance(parsed, list):
+                raise ValueError("model output is not a JSON array")
+            for obj in parsed:
+                if isinstance(obj, dict) and isinstance(obj.get("id"), int):
+                    by_id.setdefault(obj["id"], obj)
+        except Exception as e:
+            error = f"Model JSON parse error: {repr(e)}"
+    else:
+        error = "No model text returned"
+
+    results = []
+    for item in items:
+        parsed = by_id.get(item["id"])
+        item_error = error or (None if parsed is not None else "Query missing from batch answer")
+        item_raw = json.dumps(parsed) if parsed is not None else raw_text
+        results.append(_trip_result(item["query"], parsed, item_raw, used_model, item_error, fallback_days, max_duration,
+                                    label="trip_batch"))
+    return results
+
+# Test function
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from llm_client import init_models
+    load_dotenv()
+
+    if init_models(os.getenv("GOOGLE_API_KEY"), [(MODEL_CANDIDATES, TRIP_GENERATION_CONFIG)]):
+        print("Gemini configured\n")
+
+    for query in ["plan trip to swiss for 7 days", "weekend in Dubai", "two weeks in Thailand"]:
+        result = extract_trip("Mumbai", query)
+        print(f"Query: {query}")
+        print(f"  Destination: {result['destination_city']} ({', '.join(result['iata_codes'])})")
+        print(f"  Duration: {result['duration_days']} days (fallback: {result['used_fallback']})")
+        print()
@@ -0,0 +1,188 @@
+"""
+Bounded Worker Pools
+One thread pool per blocking dependency (LLM extraction, Amadeus search) with a bounded
+queue. Work is admitted only while fewer than workers + queue slots are taken, in this pool
+and in the upstream pools its work feeds (API extraction -> LLM calls); beyond that submit()
+raises Overloaded right away (the API answers 503 with Retry-After) instead of letting
+requests pile up. Occupancy, queue wait and run time are exported per pool.
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_metrics import Histogram, _escape
+
+# Histogram buckets (seconds) for time spent waiting in a pool queue and running in a worker
+QUEUE_WAIT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RUN_TIME_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+# Retry-After bounds (seconds) and the service time assumed before a pool has measured one
+RETRY_AFTER_MIN_SECONDS = 1
+RETRY_AFTER_MAX_SECONDS = 30
+DEFAULT_SERVICE_SECONDS = 1.0
+SERVICE_EWMA_ALPHA = 0.2
+
+class Overloaded(Exception):
+    """A pool refused work because every worker and queue slot is taken"""
+    def __init__(self, pool, retry_after):
+        super().__init__(f"{pool} is at capacity, retry in {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+class WorkerPool:
+    """ThreadPoolExecutor with queue-depth admission control and occupancy metrics"""
+    def __init__(self, name, max_workers, max_queue, upstream=()):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        # Pools this pool's tasks submit to; work is refused while any of them is full
+        self.upstream = list(upstream)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.queue_wait = Histogram(QUEUE_WAIT_BUCKETS)
+        self.run_time = Histogram(RUN_TIME_BUCKETS)
+        self.service_ewma = None
+
+    def _retry_after(self):
+        """Seconds until a queue slot is likely free: queued work spread over the workers"""
+        service = self.service_ewma if self.service_ewma is not None else DEFAULT_SERVICE_SECONDS
+        seconds = math.ceil((self.queued + 1) * service / self.max_workers)
+        return max(RETRY_AFTER_MIN_SECONDS, min(RETRY_AFTER_MAX_SECONDS, seconds))
+
+    def _full(self):
+        return self.running + self.queued >= self.max_workers + self.max_queue
+
+    def overloaded(self):
+        """Overloaded for this pool if it has no free slot, else None"""
+        with self._lock:
+            return Overloaded(self.name, self._retry_after()) if self._full() else None
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) and return its Future, or raise Overloaded when this or an upstream pool is full"""
+        for pool in self.upstream:
+            error = pool.overloaded()
+            if error is not None:
+                with self._lock:
+                    self.rejected += 1
+                raise error
+        with self._lock:
+            if self._full():
+                self.rejected += 1
+                raise Overloaded(self.name, self._retry_after())
+            self.queued += 1
+            self.admitted += 1
+        enqueued_at = time.monotonic()
+        state = {"started": False}
+
+        def run():
+            started_at = time.monotonic()
+            with self._lock:
+                state["started"] = True
+                self.queued -= 1
+                self.running += 1
+                self.queue_wait.observe(started_at - enqueued_at)
+            ok = False
+            try:
+                result = fn(*args)
+                ok = True
+                return result
+            finally:
+                elapsed = time.monotonic() - started_at
+                with self._lock:
+                    self.running -= 1
+                    self.completed += ok
+                    self.failed += not ok
+                    self.run_time.observe(elapsed)
+                    self.service_ewma = elapsed if self.service_ewma is None else (
+                        (1 - SERVICE_EWMA_ALPHA) * self.service_ewma + SERVICE_EWMA_ALPHA * elapsed)
+
+        def release_if_cancelled(future):
+            if future.cancelled():
+                with self._lock:
+                    if not state["started"]:
+                        state["started"] = True
+                        self.queued -= 1
+
+        future = self._executor.submit(run)
+        future.add_done_callback(release_if_cancelled)
+        return future
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_limit": self.max_queue,
+                "running": self.running,
+                "queued": self.queued,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "queue_wait_p95_le_s": self.queue_wait.quantile(0.95),
+                "run_time_p95_le_s": self.run_time.quantile(0.95),
+            }
+
+class WorkerPools:
+    """Registry of the process's worker pools, for /health and /metrics"""
+    def __init__(self):
+        self.pools = {}
+        self._lock = threading.Lock()
+
+    def create(self, name, max_workers, max_queue, upstream=()):
+        pool = WorkerPool(name, max_workers, max_queue, upstream)
+        with self._lock:
+            self.pools[name] = pool
+        return pool
+
+    def snapshot(self):
+        with self._lock:
+            pools = list(self.pools.values())
+        return {pool.name: pool.snapshot() for pool in pools}
+
+    def render_prometheus(self):
+        """Pool gauges, counters and histograms in the Prometheus text exposition format"""
+        with self._lock:
+            pools = sorted(self.pools.values(), key=lambda p: p.name)
+        lines = []
+        gauges = [
+            ("worker_pool_workers", "Worker threads per pool", "max_workers"),
+            ("worker_pool_queue_limit", "Queue slots per pool", "max_queue"),
+            ("worker_pool_running", "Tasks running in a worker", "running"),
+            ("worker_pool_queued", "Tasks waiting for a worker", "queued"),
+        ]
+        counters = [
+            ("worker_pool_admitted_total", "Tasks admitted", "admitted"),
+            ("worker_pool_rejected_total", "Tasks refused because the pool was full (answered 503)", "rejected"),
+            ("worker_pool_completed_total", "Tasks that finished", "completed"),
+            ("worker_pool_failed_total", "Tasks that raised", "failed"),
+        ]
+        for kind, families in (("gauge", gauges), ("counter", counters)):
+            for name, help_text, attr in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for pool in pools:
+                    lines.append(f'{name}{{pool="{_escape(pool.name)}"}} {getattr(pool, attr)}')
+        for name, help_text, attr in (
+            ("worker_pool_queue_wait_seconds", "Time tasks waited for a worker", "queue_wait"),
+            ("worker_pool_run_seconds", "Time tasks ran in a worker", "run_time"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for pool in pools:
+                with pool._lock:
+                    hist = getattr(pool, attr)
+                    label = _escape(pool.name)
+                    for bound, total in hist.cumulative():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{name}_bucket{{pool="{label}",le="{le}"}} {total}')
+                    lines.append(f'{name}_sum{{pool="{label}"}} {hist.sum:.6f}')
+                    lines.append(f'{name}_count{{pool="{label}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+worker_pools = WorkerPools()